@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindmate.settings')
+# Serve the read-heavy views with their async versions
+os.environ.setdefault('MINDMATE_ROOT_URLCONF', 'mindmate.asgi_urls')
 
 application = get_asgi_application()
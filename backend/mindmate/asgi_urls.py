@@ -0,0 +1,28 @@
+"""
+URL configuration used when the project is served over ASGI.
+
+Routes the dashboard and the read-only API actions to their async versions
+in mood_tracker.async_views and everything else to mindmate.urls. asgi.py
+selects it through MINDMATE_ROOT_URLCONF; WSGI keeps mindmate.urls.
+"""
+from django.urls import path
+
+from mood_tracker import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Listed first, so they take precedence over the sync routes for the same paths
+urlpatterns = [
+    path('dashboard/', async_views.dashboard, name='dashboard'),
+    path('api/achievements/user_achievements/', async_views.user_achievements),
+]
+
+# Both router prefixes of MoodEntryViewSet
+for prefix in ('moods', 'mood-entries'):
+    urlpatterns += [
+        path(f'api/{prefix}/recent/', async_views.recent),
+        path(f'api/{prefix}/history/', async_views.history),
+        path(f'api/{prefix}/stats/', async_views.stats),
+    ]
+
+urlpatterns += sync_urlpatterns
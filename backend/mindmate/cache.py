@@ -0,0 +1,430 @@
+"""
+Two-tier cache for user-scoped data with tag-based invalidation.
+
+Reads check a small in-process LRU first and fall back to the shared
+Django cache (``TIERED_CACHE_ALIAS``; locmem, file based or Redis depending
+on settings). Entries carry tags such as ``user:<uid>:moods`` and a write
+invalidates every entry with its tag in one call, without knowing the keys.
+
+Each tag has a version stored in the shared cache and every shared entry
+records the versions of its tags when it was written, so invalidating a tag
+(replacing its version) makes all of its entries miss in every process.
+Local entries keep the same versions and a local hit is checked against
+the shared tag versions with one ``get_many``, so a copy held by another
+process is never served after its tags are invalidated: ETags derived from
+the data version must not be paired with an older body. The local tier
+saves fetching and unpickling the value, and entries are kept for at most
+``TIERED_CACHE_LOCAL_TTL`` seconds. Local hits return the cached object
+itself, so callers must not mutate what they get back.
+
+Hit, miss, eviction and invalidation counters are kept per process and
+can be read with ``tiered_cache.stats()`` or, by staff, as JSON from
+``/admin/cache-stats/``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Placeholder distinguishing a cached None from a miss
+_MISSING = object()
+
+MOODS = 'moods'
+JOURNALS = 'journals'
+REMINDERS = 'reminders'
+ACHIEVEMENTS = 'achievements'
+
+
+def user_tag(user_id, kind):
+    """
+    Build the tag for one kind of a user's data.
+
+    Args:
+        user_id: Primary key of the user.
+        kind: One of MOODS, JOURNALS, REMINDERS or ACHIEVEMENTS.
+
+    Returns:
+        str: Tag such as ``user:<uid>:moods``.
+    """
+    return f'user:{user_id}:{kind}'
+
+
+class LocalLRU:
+    """
+    Thread-safe in-process LRU with a size cap and per-entry time to live.
+
+    Attributes:
+        evictions: Entries dropped to stay within max_size.
+        expirations: Entries dropped because their TTL passed.
+        generation: Incremented by every tag invalidation, so writers can
+            tell whether one happened while they computed a value.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._tag_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a cached value and its tag versions, or _MISSING.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            tuple: (value, tag versions), or _MISSING if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, tag_versions, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value, tag_versions
+
+    def set(self, key, value, tag_versions=None):
+        """
+        Cache a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+            tag_versions: Optional dict of the tags the entry is
+                invalidated by to the versions it was built from.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        tag_versions = dict(tag_versions or {})
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, tag_versions, time.monotonic() + self.ttl)
+            for tag in tag_versions:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Drop one entry.
+
+        Args:
+            key: Cache key.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def delete_tags(self, tags):
+        """
+        Drop every entry carrying any of the tags.
+
+        Args:
+            tags: Iterable of tags.
+        """
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self._tag_keys.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def __len__(self):
+        """
+        Return the number of cached entries, including expired ones not yet dropped.
+        """
+        return len(self._entries)
+
+    def _remove(self, key):
+        """
+        Drop an entry and its tag index references. The lock must be held.
+
+        Args:
+            key: Cache key.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+
+class TieredCache:
+    """
+    In-process LRU in front of a shared Django cache, with tag invalidation.
+    """
+
+    def __init__(self, alias=None, local_size=None, local_ttl=None, timeout=None):
+        self.alias = alias or getattr(settings, 'TIERED_CACHE_ALIAS', 'default')
+        self.timeout = timeout if timeout is not None else getattr(settings, 'TIERED_CACHE_TIMEOUT', 300)
+        self.local = LocalLRU(
+            local_size if local_size is not None else getattr(settings, 'TIERED_CACHE_LOCAL_SIZE', 1024),
+            local_ttl if local_ttl is not None else getattr(settings, 'TIERED_CACHE_LOCAL_TTL', 5),
+        )
+        self._counts = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        Return the shared Django cache backend.
+
+        Returns:
+            BaseCache: Backend for this cache's alias.
+        """
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        """
+        Return a cached value from the nearest tier that holds a valid copy.
+
+        Args:
+            key: Cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            object: The cached value, or default.
+        """
+        entry = self.local.get(key)
+        if entry is not _MISSING:
+            value, tag_versions = entry
+            if not tag_versions or self._current_versions(tag_versions) == tag_versions:
+                self._count('local_hits')
+                return value
+            # Invalidated by another process; the shared copy is stale too
+            self.local.delete(key)
+            self._count('misses')
+            return default
+
+        entry = self.shared.get(self._key(key))
+        if entry is not None:
+            value, tag_versions = entry
+            if self._current_versions(tag_versions) == tag_versions:
+                self.local.set(key, value, tag_versions)
+                self._count('shared_hits')
+                return value
+
+        self._count('misses')
+        return default
+
+    def set(self, key, value, tags=(), timeout=None):
+        """
+        Store a value in both tiers.
+
+        Args:
+            key: Cache key.
+            value: Picklable value to cache.
+            tags: Tags the entry is invalidated by.
+            timeout: Seconds the shared copy is kept, defaulting to
+                TIERED_CACHE_TIMEOUT.
+        """
+        self._store(key, value, self._current_versions(tags, create=True), self.local.generation, timeout)
+
+    def get_or_set(self, key, compute, tags=(), timeout=None):
+        """
+        Return a cached value, computing and caching it on a miss.
+
+        Tag versions are read before computing, so an invalidation that
+        lands while the value is being built leaves it already stale
+        rather than cached as current.
+
+        Args:
+            key: Cache key.
+            compute: Function called without arguments to build the value.
+            tags: Tags the entry is invalidated by.
+            timeout: Seconds the shared copy is kept.
+
+        Returns:
+            object: The cached or freshly computed value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            tag_versions = self._current_versions(tags, create=True)
+            generation = self.local.generation
+            value = compute()
+            self._store(key, value, tag_versions, generation, timeout)
+        return value
+
+    async def aget_or_set(self, key, acompute, tags=(), timeout=None):
+        """
+        Async version of get_or_set for async views.
+
+        Local hits on untagged entries are served without leaving the
+        event loop; tag versions and the shared tier are read through the
+        sync cache API on a worker thread.
+
+        Args:
+            key: Cache key.
+            acompute: Coroutine function called without arguments to build
+                the value.
+            tags: Tags the entry is invalidated by.
+            timeout: Seconds the shared copy is kept.
+
+        Returns:
+            object: The cached or freshly computed value.
+        """
+        entry = self.local.get(key)
+        if entry is not _MISSING and not entry[1]:
+            self._count('local_hits')
+            return entry[0]
+        value = await sync_to_async(self.get)(key, _MISSING)
+        if value is _MISSING:
+            tag_versions = await sync_to_async(self._current_versions)(tags, create=True)
+            generation = self.local.generation
+            value = await acompute()
+            await sync_to_async(self._store)(key, value, tag_versions, generation, timeout)
+        return value
+
+    def delete(self, key):
+        """
+        Drop one entry from both tiers.
+
+        Args:
+            key: Cache key.
+        """
+        self.local.delete(key)
+        self.shared.delete(self._key(key))
+
+    def invalidate_tags(self, *tags):
+        """
+        Invalidate every entry carrying any of the tags, in every process.
+
+        Args:
+            *tags: Tags to invalidate.
+        """
+        if not tags:
+            return
+        self.local.delete_tags(tags)
+        version = time.time_ns()
+        self.shared.set_many({self._tag_key(tag): version for tag in tags}, None)
+        self._count('invalidations', len(tags))
+
+    def invalidate_tags_on_commit(self, *tags):
+        """
+        Invalidate tags now and again when the current transaction commits.
+
+        Used by writers inside a transaction: the second invalidation drops
+        anything another request cached from the old rows before the write
+        became visible.
+
+        Args:
+            *tags: Tags to invalidate.
+        """
+        self.invalidate_tags(*tags)
+        transaction.on_commit(lambda: self.invalidate_tags(*tags))
+
+    def clear(self):
+        """
+        Drop the in-process tier and reset the counters.
+
+        The shared tier is left alone, since other processes use it.
+        """
+        self.local.clear()
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+            self.local.evictions = self.local.expirations = 0
+
+    def stats(self):
+        """
+        Return this process's cache counters.
+
+        Returns:
+            dict: local_hits, shared_hits, misses, sets, invalidations,
+                evictions, expirations, local_size and hit_ratio.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        counts['evictions'] = self.local.evictions
+        counts['expirations'] = self.local.expirations
+        counts['local_size'] = len(self.local)
+        lookups = counts['local_hits'] + counts['shared_hits'] + counts['misses']
+        counts['hit_ratio'] = round((counts['local_hits'] + counts['shared_hits']) / lookups, 4) if lookups else None
+        return counts
+
+    def _store(self, key, value, tag_versions, generation, timeout):
+        """
+        Write a value to the shared tier, and locally unless tags changed.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+            tag_versions: Tag versions read before the value was built.
+            generation: Local invalidation generation read at the same time.
+            timeout: Seconds the shared copy is kept, or None for the default.
+        """
+        self.shared.set(self._key(key), (value, tag_versions), self.timeout if timeout is None else timeout)
+        if self.local.generation == generation:
+            self.local.set(key, value, tag_versions)
+        self._count('sets')
+
+    def _count(self, name, amount=1):
+        """
+        Increment a counter.
+        """
+        with self._lock:
+            self._counts[name] += amount
+
+    def _key(self, key):
+        """
+        Return the shared tier key for an entry.
+        """
+        return f'tiered:{key}'
+
+    def _tag_key(self, tag):
+        """
+        Return the shared tier key holding a tag's version.
+        """
+        return f'tag:{tag}'
+
+    def _current_versions(self, tags, create=False):
+        """
+        Read the current version of each tag from the shared tier.
+
+        Args:
+            tags: Iterable of tags.
+            create: Whether to give tags without a version a new one.
+
+        Returns:
+            dict: Tag to version; tags without a version map to None
+                unless create is set.
+        """
+        tags = list(tags)
+        if not tags:
+            return {}
+        found = self.shared.get_many([self._tag_key(tag) for tag in tags])
+        versions = {tag: found.get(self._tag_key(tag)) for tag in tags}
+        if create:
+            for tag, version in versions.items():
+                if version is None:
+                    # add() keeps a version another process set in the meantime
+                    self.shared.add(self._tag_key(tag), time.time_ns(), None)
+                    versions[tag] = self.shared.get(self._tag_key(tag))
+        return versions
+
+
+tiered_cache = TieredCache()
@@ -0,0 +1,29 @@
+import json
+import logging
+
+# Attributes present on every LogRecord, which are not structured extras
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Format log records as single-line JSON objects.
+
+    The rendered message, level, logger name and timestamp are always
+    included, along with any attributes passed through ``extra=`` (such as
+    the request timing fields), so records can be shipped to a log pipeline
+    without parsing free text.
+    """
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
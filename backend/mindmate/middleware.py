@@ -1,5 +1,15 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.http import HttpResponse
 
+timing_logger = logging.getLogger('mindmate.timing')
+
 class ViteClientMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -11,4 +21,170 @@ class ViteClientMiddleware:
             return HttpResponse('', content_type='application/javascript')
         
         # Process the request normally for all other requests
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+
+class SessionRefreshMiddleware:
+    """
+    Keep session expiry sliding without saving the session on every request.
+
+    With SESSION_SAVE_EVERY_REQUEST off, Django only saves sessions that
+    changed, so an active user's session would expire SESSION_COOKIE_AGE
+    after login. This marks a non-empty session as modified when it was
+    last saved more than SESSION_REFRESH_INTERVAL seconds ago, so it is
+    written at most once per interval. Must run after SessionMiddleware.
+
+    The middleware removes itself at startup when SESSION_SAVE_EVERY_REQUEST
+    is on, since every session is saved anyway. Under ASGI it runs in async
+    mode, so async views are not pushed onto a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    # Session key holding the time the session was last refreshed
+    REFRESHED_AT_KEY = '_refreshed_at'
+
+    def __init__(self, get_response):
+        if getattr(settings, 'SESSION_SAVE_EVERY_REQUEST', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 3600)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and not session.modified:
+            self.refresh(session, session.get(self.REFRESHED_AT_KEY, 0))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and not session.modified:
+            self.refresh(session, await session.aget(self.REFRESHED_AT_KEY, 0))
+        return response
+
+    def refresh(self, session, refreshed_at):
+        """
+        Mark a loaded session for saving if its refresh interval has passed.
+
+        Args:
+            session: The request's session.
+            refreshed_at: Time stored under REFRESHED_AT_KEY, or 0.
+        """
+        now = int(time.time())
+        # Loading clears the key of a session that no longer exists, which must not be recreated
+        if session.session_key and now - refreshed_at >= self.interval:
+            session[self.REFRESHED_AT_KEY] = now
+
+
+class CurrentUserMiddleware:
+    """
+    Resolve the session's MindMate user once and attach it as ``request.mm_user``.
+
+    Must run after SessionMiddleware. Lookups go through the per-process user
+    cache in mood_tracker.auth, so a warm request needs no user query at all.
+    Under ASGI the session and user are loaded with the async ORM.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        from mood_tracker.auth import get_request_user
+
+        get_request_user(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        from mood_tracker.auth import aget_request_user
+
+        await aget_request_user(request)
+        return await self.get_response(request)
+
+
+class QueryStats:
+    """
+    Database execute wrapper that counts queries and their wall time.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestTimingMiddleware:
+    """
+    Record per-view wall time, database query count and database time.
+
+    Each request emits one structured record on the ``mindmate.timing``
+    logger, with the measurements attached as record attributes (view,
+    method, path, status, duration_ms, db_queries, db_ms). When
+    REQUEST_TIMING_HEADER is enabled the same figures are also returned in a
+    ``Server-Timing`` response header for browser dev tools.
+
+    The middleware removes itself at startup unless REQUEST_TIMING_ENABLED
+    is set, so it costs nothing when disabled. It is sync only, so under
+    ASGI enabling it runs every view on a worker thread.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.send_header = getattr(settings, 'REQUEST_TIMING_HEADER', False)
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+
+        if timing_logger.isEnabledFor(logging.INFO):
+            timing_logger.info(
+                '%s %s -> %s in %.1fms (%d queries, %.1fms db) [%s]',
+                request.method, request.path, response.status_code,
+                duration_ms, stats.count, db_ms, view_name,
+                extra={
+                    'view': view_name,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(duration_ms, 2),
+                    'db_queries': stats.count,
+                    'db_ms': round(db_ms, 2),
+                },
+            )
+
+        if self.send_header:
+            response['Server-Timing'] = (
+                f'app;dur={duration_ms:.1f}, '
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries"'
+            )
+
+        return response
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .firebase_config import firebase_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,9 +48,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mindmate.middleware.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'mindmate.middleware.SessionRefreshMiddleware',
+    'mindmate.middleware.CurrentUserMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -55,7 +61,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'mindmate.urls'
+# asgi.py switches to mindmate.asgi_urls, which routes read views to async versions
+ROOT_URLCONF = os.environ.get('MINDMATE_ROOT_URLCONF', 'mindmate.urls')
 
 TEMPLATES = [
     {
@@ -86,6 +93,75 @@ DATABASES = {
     }
 }
 
+# 'production' switches SQLite to write-ahead logging, so readers no longer
+# block the writer, waits on a locked database instead of failing, takes the
+# write lock at BEGIN so concurrent transactions cannot deadlock upgrading
+# from a read lock, and keeps connections open between requests
+DB_PROFILE = os.environ.get('MINDMATE_DB_PROFILE', 'development')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('MINDMATE_SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# Run by Django on every new connection
+SQLITE_WAL_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL; '
+    'PRAGMA synchronous=NORMAL; '
+    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+)
+
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('MINDMATE_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_WAL_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Shared by every process: Redis when MINDMATE_REDIS_URL is set (needs the
+# redis package), a cache directory when MINDMATE_CACHE_DIR is set, and
+# otherwise per-process local memory for development
+if os.environ.get('MINDMATE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['MINDMATE_REDIS_URL'],
+        }
+    }
+elif os.environ.get('MINDMATE_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['MINDMATE_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mindmate',
+        }
+    }
+
+# Two-tier cache for user-scoped data (mindmate.cache): an in-process LRU in
+# front of the shared cache above
+TIERED_CACHE_ALIAS = 'default'
+TIERED_CACHE_TIMEOUT = 300  # Seconds entries stay in the shared tier
+TIERED_CACHE_LOCAL_SIZE = 1024
+TIERED_CACHE_LOCAL_TTL = 5  # Seconds a local copy is kept; hits are still checked against the tag versions
+
+# Per-process cache of session users resolved by CurrentUserMiddleware
+CURRENT_USER_CACHE_SIZE = 1024
+CURRENT_USER_CACHE_TTL = 30  # Seconds; 0 disables the cache
+
+# Seconds a per-user dashboard snapshot stays cached (writes invalidate it sooner)
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds a per-user data version stamp stays cached (writes invalidate it sooner)
+DATA_VERSION_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +205,14 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Profile pictures are stored as square WebP and JPEG variants of these sizes (see
+# mood_tracker.images); the original upload, capped and stripped of metadata, is only kept
+# when PROFILE_PICTURE_KEEP_ORIGINAL is on
+PROFILE_PICTURE_SIZES = (48, 128, 256)
+PROFILE_PICTURE_MAX_DIMENSION = 1024
+PROFILE_PICTURE_QUALITY = {'webp': 80, 'jpeg': 85}
+PROFILE_PICTURE_KEEP_ORIGINAL = os.environ.get('MINDMATE_KEEP_ORIGINAL_PICTURES', '').lower() in ('1', 'true', 'yes')
+
 # Ignore Vite client requests
 APPEND_SLASH = False
 
@@ -144,7 +228,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
+        'mood_tracker.auth.SessionUserAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -170,10 +254,100 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', '*']
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
-SESSION_SAVE_EVERY_REQUEST = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_COOKIE_SAMESITE = 'Lax'
 
 # Ensure each session is unique
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_NAME = 'mindmate_sessionid'
+
+# Session storage: 'db', 'cached_db' (reads served from CACHES, writes go
+# through to the database) or 'signed_cookies' (no server-side storage, so
+# sessions cannot be revoked before they expire)
+SESSION_STORE = os.environ.get('MINDMATE_SESSION_STORE', 'cached_db' if DB_PROFILE == 'production' else 'db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_STORE}'
+
+# Saving on every request keeps the expiry sliding but writes django_session
+# each time. Otherwise sessions are only saved when they change, and
+# SessionRefreshMiddleware keeps the expiry sliding by re-saving an
+# unchanged session at most once per SESSION_REFRESH_INTERVAL seconds
+SESSION_SAVE_EVERY_REQUEST = os.environ.get(
+    'MINDMATE_SESSION_SAVE_EVERY_REQUEST', '0' if DB_PROFILE == 'production' else '1'
+) == '1'
+SESSION_REFRESH_INTERVAL = 3600
+
+# Request timing
+# Per-view wall time, query count and DB time, logged on 'mindmate.timing'
+REQUEST_TIMING_ENABLED = os.environ.get('MINDMATE_REQUEST_TIMING', '') == '1'
+# Also expose the timings in a Server-Timing response header
+REQUEST_TIMING_HEADER = os.environ.get('MINDMATE_SERVER_TIMING', '') == '1'
+
+# Reminder notifications
+# Backend used by run_reminder_scheduler; FileNotifier and LogNotifier are local stand-ins for
+# mood_tracker.notifications.FCMNotifier. FCMNotifier and PushNotifier take the PushDispatcher
+# options (workers, queue_size, batch_size, linger, max_attempts, backoff); PushNotifier also
+# takes a transport path and transport_options, e.g. mood_tracker.push.FakeTransport
+REMINDER_NOTIFIER = os.environ.get('MINDMATE_REMINDER_NOTIFIER', 'mood_tracker.notifications.LogNotifier')
+REMINDER_NOTIFIER_OPTIONS = {}
+REMINDER_BATCH_SIZE = 500
+
+# Background jobs (exports and recomputes), run by `manage.py run_workers`
+# With JOBS_EAGER on, jobs run inside the request that queues them, so exports work under a plain
+# runserver; it defaults to DEBUG, and deployments running workers leave it off
+JOBS_EAGER = os.environ.get('MINDMATE_JOBS_EAGER', str(DEBUG)).lower() in ('1', 'true', 'yes')
+JOB_RETRY_DELAY = 30  # Seconds before the first retry; doubles per attempt
+JOB_STALE_AFTER = 3600  # Running jobs older than this are assumed abandoned and requeued
+JOB_RESULT_TTL = 7 * 24 * 3600  # Finished jobs and their files are purged after this many seconds
+# Private directory for result files such as exports; never under MEDIA_ROOT, which is served publicly
+JOB_RESULTS_ROOT = os.environ.get('MINDMATE_JOB_RESULTS_ROOT', str(BASE_DIR / 'job_results'))
+
+# Firebase ID token verification
+# Tokens are checked locally against Google's published signing keys;
+# mood_tracker.tokens.LocalKeySource is an in-process stand-in key set for tests
+# Defaults to the project the web client signs in to: firebase_config, or the
+# 'mindmate-app' fallback in base.html. A system check refuses to start without one.
+FIREBASE_PROJECT_ID = (
+    os.environ.get('MINDMATE_FIREBASE_PROJECT_ID') or firebase_config['projectId'] or 'mindmate-app'
+)
+FIREBASE_KEY_SOURCE = os.environ.get('MINDMATE_FIREBASE_KEY_SOURCE', 'mood_tracker.tokens.GoogleKeySource')
+FIREBASE_KEY_SOURCE_OPTIONS = {}
+# Verified tokens whose claims are kept in memory until they expire
+FIREBASE_TOKEN_CACHE_SIZE = 4096
+# Seconds of clock skew tolerated on exp, iat and auth_time
+FIREBASE_TOKEN_LEEWAY = 5
+
+# Journal and mood note search
+# 'fts5' (SQLite FTS5 table), 'python' (in-memory per-user index) or 'auto'
+SEARCH_BACKEND = os.environ.get('MINDMATE_SEARCH_BACKEND', 'auto')
+# Per-user indexes kept in memory by the python backend
+SEARCH_INDEX_CACHE_SIZE = 128
+
+# Bulk mood entry uploads
+# Most entries accepted by one POST /moods/bulk/ request
+BULK_MAX_ENTRIES = 10000
+
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'mindmate.log.StructuredFormatter',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'mindmate': {
+            'handlers': ['console'],
+            'level': os.environ.get('MINDMATE_LOG_LEVEL', 'INFO'),
+        },
+        'mood_tracker': {
+            'handlers': ['console'],
+            'level': os.environ.get('MINDMATE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
@@ -19,8 +19,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from . import views
+
 urlpatterns = [
+    path('admin/cache-stats/', views.cache_stats, name='cache_stats'),
     path('admin/', admin.site.urls),
+    path('api/', include('mood_tracker.api_urls')),
     path('', include('mood_tracker.urls')),
 ]
 
@@ -0,0 +1,18 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .cache import tiered_cache
+
+
+@staff_member_required
+def cache_stats(request):
+    """
+    Export this process's tiered cache counters as JSON.
+
+    Args:
+        request: Django HttpRequest object from a staff user.
+
+    Returns:
+        JsonResponse: Counters from tiered_cache.stats().
+    """
+    return JsonResponse(tiered_cache.stats())
@@ -0,0 +1,300 @@
+"""
+Achievement unlock evaluation and progress reporting.
+
+Unlocks are evaluated from model signal hooks whenever a user writes a mood
+entry, journal or reminder, and in bulk from the evaluate_achievements
+management command. Each event only checks the achievement types it can
+affect, and only the stats those types need are computed.
+"""
+from asgiref.sync import sync_to_async
+from django.db import models
+from django.utils import timezone
+
+from mindmate.cache import tiered_cache, user_tag, MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS
+
+from .models import DailyMoodRollup, Journal, Reminder, Achievement, UserAchievement, UserStreak
+from . import streaks, versioning
+
+# Achievement types whose progress can change for each kind of write
+EVENT_ACHIEVEMENT_TYPES = {
+    'mood': ('mood_count', 'mood_streak', 'consistency', 'milestone'),
+    'journal': ('journal_count', 'milestone'),
+    'reminder': ('milestone',),
+}
+
+# Streak achievements unlock on the best streak ever reached, while the
+# progress bar shows the streak that is currently running
+UNLOCK_STAT = {
+    'mood_streak': 'longest_streak',
+}
+
+
+def collect_stats(user_id, achievement_types):
+    """
+    Compute the progress stats needed for the given achievement types.
+
+    Args:
+        user_id: Primary key of the user.
+        achievement_types: Iterable of Achievement.achievement_type values.
+
+    Returns:
+        dict: Stat values keyed by achievement type, plus longest_streak
+            when streak achievements are requested.
+    """
+    achievement_types = set(achievement_types)
+    stats = {}
+
+    if achievement_types & {'mood_count', 'milestone'}:
+        stats['mood_count'] = DailyMoodRollup.objects.filter(user_id=user_id).aggregate(
+            total=models.Sum('entry_count')
+        )['total'] or 0
+
+    if achievement_types & {'journal_count', 'milestone'}:
+        stats['journal_count'] = Journal.objects.filter(user_id=user_id).count()
+
+    if achievement_types & {'mood_streak', 'consistency'}:
+        streak_stats = streaks.get_streak_stats(user_id)
+        stats['mood_streak'] = streak_stats['current_streak']
+        stats['longest_streak'] = streak_stats['longest_streak']
+        stats['consistency'] = streak_stats['consistency']
+
+    if 'milestone' in achievement_types:
+        # Number of main features used: mood tracking, journaling and reminders
+        stats['milestone'] = (
+            (stats['mood_count'] > 0)
+            + (stats['journal_count'] > 0)
+            + Reminder.objects.filter(user_id=user_id).exists()
+        )
+
+    return stats
+
+
+def evaluate(user, event):
+    """
+    Unlock any achievements a user has earned after a write event.
+
+    Args:
+        user: User object (or primary key).
+        event: Kind of write, one of the EVENT_ACHIEVEMENT_TYPES keys.
+
+    Returns:
+        list: Achievement objects unlocked by this evaluation.
+    """
+    user_id = getattr(user, 'pk', user)
+    locked = list(
+        Achievement.objects.filter(
+            is_active=True,
+            achievement_type__in=EVENT_ACHIEVEMENT_TYPES[event],
+        ).exclude(userachievement__user_id=user_id)
+    )
+    if not locked:
+        return []
+
+    stats = collect_stats(user_id, {achievement.achievement_type for achievement in locked})
+    unlocked = [achievement for achievement in locked if _is_earned(achievement, stats)]
+
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(user_id=user_id, achievement=achievement) for achievement in unlocked],
+        ignore_conflicts=True,
+    )
+    if unlocked:
+        versioning.bump(user_id)
+        tiered_cache.invalidate_tags_on_commit(user_tag(user_id, ACHIEVEMENTS))
+    return unlocked
+
+
+def evaluate_all(user_ids, batch_size=500):
+    """
+    Unlock earned achievements for many users using grouped aggregates.
+
+    Stats for each batch of users are loaded with one grouped query per stat
+    instead of per-user queries.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+        batch_size: Number of users evaluated per round of queries.
+
+    Returns:
+        int: Number of UserAchievement rows created.
+    """
+    achievements = list(Achievement.objects.filter(is_active=True))
+    created = 0
+    batch = []
+
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            created += _evaluate_batch(batch, achievements)
+            batch = []
+
+    if batch:
+        created += _evaluate_batch(batch, achievements)
+
+    return created
+
+
+def build_progress(user):
+    """
+    Build the achievement progress listing for a user.
+
+    Unlock status and timestamps come from a single annotated query over
+    the active achievements rather than one lookup per achievement.
+
+    Args:
+        user: User object (or primary key).
+
+    Returns:
+        dict: achievement_data (list of per-achievement progress dicts),
+            total_achievements and unlocked_count.
+    """
+    user_id = getattr(user, 'pk', user)
+    unlocked_at = UserAchievement.objects.filter(
+        user_id=user_id,
+        achievement=models.OuterRef('pk'),
+    ).values('unlocked_at')[:1]
+    all_achievements = list(
+        Achievement.objects.filter(is_active=True).annotate(unlocked_at=models.Subquery(unlocked_at))
+    )
+
+    stats = collect_stats(user_id, {achievement.achievement_type for achievement in all_achievements})
+
+    achievement_data = []
+    unlocked_count = 0
+    for achievement in all_achievements:
+        is_unlocked = achievement.unlocked_at is not None
+        unlocked_count += is_unlocked
+        current_progress = stats.get(achievement.achievement_type, 0)
+        progress_percentage = min(100, (current_progress / achievement.requirement_value) * 100) if achievement.requirement_value > 0 else 0
+
+        achievement_data.append({
+            'achievement': achievement,
+            'is_unlocked': is_unlocked,
+            'current_progress': current_progress,
+            'progress_percentage': progress_percentage,
+            'unlocked_at': achievement.unlocked_at,
+        })
+
+    return {
+        'achievement_data': achievement_data,
+        'total_achievements': len(all_achievements),
+        'unlocked_count': unlocked_count,
+    }
+
+
+def cached_progress(user, today=None):
+    """
+    Return a user's achievement progress from the tiered cache.
+
+    Progress depends on every kind of write, so the entry is tagged with all
+    of the user's data; streak progress also changes at midnight, so the
+    key includes the date.
+
+    Args:
+        user: User object (or primary key).
+        today: Optional reference date, defaults to the current date.
+
+    Returns:
+        dict: See build_progress.
+    """
+    user_id = getattr(user, 'pk', user)
+    today = today or timezone.now().date()
+    return tiered_cache.get_or_set(
+        f'achievement-progress:{user_id}:{today.isoformat()}',
+        lambda: build_progress(user_id),
+        tags=[user_tag(user_id, kind) for kind in (MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS)],
+    )
+
+
+async def acached_progress(user, today=None):
+    """
+    Async version of cached_progress for async views.
+
+    Cache hits are served on the event loop; a miss builds the progress
+    with the sync ORM on a worker thread.
+
+    Args:
+        user: User object (or primary key).
+        today: Optional reference date, defaults to the current date.
+
+    Returns:
+        dict: See build_progress.
+    """
+    user_id = getattr(user, 'pk', user)
+    today = today or timezone.now().date()
+    return await tiered_cache.aget_or_set(
+        f'achievement-progress:{user_id}:{today.isoformat()}',
+        sync_to_async(lambda: build_progress(user_id)),
+        tags=[user_tag(user_id, kind) for kind in (MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS)],
+    )
+
+
+def _is_earned(achievement, stats):
+    """
+    Check whether stats satisfy an achievement's requirement.
+
+    Args:
+        achievement: Achievement to check.
+        stats: Stat values as returned by collect_stats.
+
+    Returns:
+        bool: True if the achievement should be unlocked.
+    """
+    stat_key = UNLOCK_STAT.get(achievement.achievement_type, achievement.achievement_type)
+    return stats.get(stat_key, 0) >= achievement.requirement_value
+
+
+def _evaluate_batch(user_ids, achievements):
+    """
+    Evaluate all achievements for one batch of users.
+
+    Args:
+        user_ids: List of user primary keys.
+        achievements: List of active Achievement objects.
+
+    Returns:
+        int: Number of UserAchievement rows created.
+    """
+    mood_counts = dict(
+        DailyMoodRollup.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            total=models.Sum('entry_count')
+        ).values_list('user_id', 'total')
+    )
+    journal_counts = dict(
+        Journal.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            total=models.Count('id')
+        ).values_list('user_id', 'total')
+    )
+    reminder_users = set(
+        Reminder.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True).distinct()
+    )
+    streak_rows = {streak.user_id: streak for streak in UserStreak.objects.filter(user_id__in=user_ids)}
+    already_unlocked = set(
+        UserAchievement.objects.filter(user_id__in=user_ids).values_list('user_id', 'achievement_id')
+    )
+
+    new_rows = []
+    for user_id in user_ids:
+        streak = streak_rows.get(user_id) or streaks.rebuild(user_id)
+        streak_stats = streaks.streak_stats(streak)
+        mood_count = mood_counts.get(user_id, 0)
+        journal_count = journal_counts.get(user_id, 0)
+        stats = {
+            'mood_count': mood_count,
+            'journal_count': journal_count,
+            'mood_streak': streak_stats['current_streak'],
+            'longest_streak': streak_stats['longest_streak'],
+            'consistency': streak_stats['consistency'],
+            'milestone': (mood_count > 0) + (journal_count > 0) + (user_id in reminder_users),
+        }
+        for achievement in achievements:
+            if (user_id, achievement.id) in already_unlocked:
+                continue
+            if _is_earned(achievement, stats):
+                new_rows.append(UserAchievement(user_id=user_id, achievement=achievement))
+
+    UserAchievement.objects.bulk_create(new_rows, batch_size=500, ignore_conflicts=True)
+    unlocked_users = {row.user_id for row in new_rows}
+    versioning.bump_many(unlocked_users)
+    tiered_cache.invalidate_tags_on_commit(*(user_tag(user_id, ACHIEVEMENTS) for user_id in unlocked_users))
+    return len(new_rows)
+
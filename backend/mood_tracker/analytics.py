@@ -0,0 +1,221 @@
+"""
+Vectorized mood analytics over a user's raw mood entries.
+
+Entries are loaded once as columnar arrays with ``values_list`` (no model
+instances) and every statistic is computed with NumPy/pandas array
+operations: rolling intensity averages, a weekday x hour heatmap, a mood
+transition matrix and the intensity trend. Cost is one query plus a few
+passes in C over the arrays, so it stays fast for users with years of
+entries.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.db import models
+from django.db.models.functions import Cast
+
+from .models import MoodEntry
+
+MOOD_KEYS = [key for key, _ in MoodEntry.MOOD_CHOICES]
+MOOD_DISPLAY_NAMES = dict(MoodEntry.MOOD_CHOICES)
+
+ROLLING_WINDOWS = (7, 30)
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Trends flatter than this many intensity points per week count as stable
+STABLE_SLOPE_PER_WEEK = 0.05
+
+
+def load_entries(user, start_date=None, end_date=None):
+    """
+    Load a user's mood entries as a columnar DataFrame.
+
+    Args:
+        user: User object (or primary key).
+        start_date: Optional first date to include.
+        end_date: Optional last date to include.
+
+    Returns:
+        DataFrame: One row per entry, oldest first, with ``timestamp``
+            (datetime64), ``mood`` (categorical over the mood keys) and
+            ``intensity`` (int) columns.
+    """
+    queryset = MoodEntry.objects.filter(user=user)
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    # Dates and times are read as text so the driver does not build a
+    # Python date and time object per row; pandas parses the whole column
+    rows = list(queryset.order_by('date', 'time').values_list(
+        Cast('date', models.CharField()), Cast('time', models.CharField()), 'mood', 'intensity'
+    ))
+
+    if not rows:
+        return pd.DataFrame({
+            'timestamp': pd.Series(dtype='datetime64[ns]'),
+            'mood': pd.Categorical([], categories=MOOD_KEYS),
+            'intensity': pd.Series(dtype='int64'),
+        })
+
+    dates, times, moods, intensities = zip(*rows)
+    timestamps = pd.to_datetime(pd.Series(dates) + ' ' + pd.Series(times), format='ISO8601')
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'mood': pd.Categorical(moods, categories=MOOD_KEYS),
+        'intensity': np.fromiter(intensities, dtype='int64', count=len(rows)),
+    })
+
+
+def rolling_averages(frame, windows=ROLLING_WINDOWS):
+    """
+    Compute trailing average intensity per calendar day.
+
+    Averages are weighted by entry, so a day with five entries counts five
+    times. Days without entries are included, with a null daily average,
+    so charts keep an even time axis.
+
+    Args:
+        frame: DataFrame from load_entries.
+        windows: Window lengths in days.
+
+    Returns:
+        list: One dict per day with ``date``, ``entries``, ``average`` and
+            ``rolling_<n>`` keys, oldest first.
+    """
+    if frame.empty:
+        return []
+
+    days = frame['timestamp'].dt.normalize()
+    daily = frame.groupby(days)['intensity'].agg(['sum', 'count'])
+    daily = daily.reindex(pd.date_range(daily.index.min(), daily.index.max(), freq='D'), fill_value=0)
+
+    series = {'average': daily['sum'] / daily['count'].replace(0, np.nan)}
+    for window in windows:
+        sums = daily['sum'].rolling(window, min_periods=1).sum()
+        counts = daily['count'].rolling(window, min_periods=1).sum()
+        series[f'rolling_{window}'] = sums / counts.replace(0, np.nan)
+    result = pd.DataFrame(series).round(2)
+
+    records = []
+    for day, entries, values in zip(daily.index, daily['count'].tolist(), result.itertuples(index=False)):
+        records.append({
+            'date': day.strftime('%Y-%m-%d'),
+            'entries': entries,
+            **{name: (None if np.isnan(value) else value) for name, value in zip(result.columns, values)},
+        })
+    return records
+
+
+def weekday_hour_heatmap(frame):
+    """
+    Compute entry counts and mean intensity for each weekday and hour.
+
+    Args:
+        frame: DataFrame from load_entries.
+
+    Returns:
+        dict: ``weekdays`` labels, ``hours`` (0-23), and 7x24 ``counts``
+            and ``average_intensity`` matrices (null where there are no
+            entries), rows Monday first.
+    """
+    cells = (frame['timestamp'].dt.weekday * 24 + frame['timestamp'].dt.hour).to_numpy()
+    counts = np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+    sums = np.bincount(cells, weights=frame['intensity'].to_numpy(), minlength=7 * 24).reshape(7, 24)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = np.round(sums / counts, 2)
+
+    return {
+        'weekdays': WEEKDAY_NAMES,
+        'hours': list(range(24)),
+        'counts': counts.tolist(),
+        'average_intensity': [[None if np.isnan(value) else value for value in row] for row in averages.tolist()],
+    }
+
+
+def transition_matrix(frame):
+    """
+    Count how often each mood is followed by each other mood.
+
+    Transitions are taken between consecutive entries in time order.
+
+    Args:
+        frame: DataFrame from load_entries.
+
+    Returns:
+        dict: ``moods`` labels, and ``counts`` and row-normalized
+            ``probabilities`` matrices indexed [from mood][to mood].
+    """
+    size = len(MOOD_KEYS)
+    codes = frame['mood'].cat.codes.to_numpy().astype('int64')
+    codes = codes[codes >= 0]
+    pairs = codes[:-1] * size + codes[1:]
+    counts = np.bincount(pairs, minlength=size * size).reshape(size, size)
+    totals = counts.sum(axis=1, keepdims=True)
+    probabilities = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+    return {
+        'moods': [MOOD_DISPLAY_NAMES[key] for key in MOOD_KEYS],
+        'counts': counts.tolist(),
+        'probabilities': np.round(probabilities, 3).tolist(),
+    }
+
+
+def intensity_trend(frame):
+    """
+    Fit a least-squares line through intensity over time.
+
+    Args:
+        frame: DataFrame from load_entries.
+
+    Returns:
+        dict: ``slope_per_day``, ``slope_per_week`` and ``direction``
+            (improving, declining, stable, or None with fewer than two
+            distinct entry times).
+    """
+    if len(frame) < 2:
+        return {'slope_per_day': None, 'slope_per_week': None, 'direction': None}
+
+    timestamps = frame['timestamp'].to_numpy()
+    days = (timestamps - timestamps[0]) / np.timedelta64(1, 'D')
+    if np.ptp(days) == 0:
+        return {'slope_per_day': None, 'slope_per_week': None, 'direction': None}
+
+    intensities = frame['intensity'].to_numpy(dtype='float64')
+    centered = days - days.mean()
+    slope = float(np.dot(centered, intensities - intensities.mean()) / np.dot(centered, centered))
+
+    if abs(slope * 7) < STABLE_SLOPE_PER_WEEK:
+        direction = 'stable'
+    else:
+        direction = 'improving' if slope > 0 else 'declining'
+    return {
+        'slope_per_day': round(slope, 4),
+        'slope_per_week': round(slope * 7, 3),
+        'direction': direction,
+    }
+
+
+def build_analytics(user, start_date=None, end_date=None):
+    """
+    Compute every analytics series for a user's date range.
+
+    Args:
+        user: User object (or primary key).
+        start_date: Optional first date to include.
+        end_date: Optional last date to include.
+
+    Returns:
+        dict: Entry count, rolling averages, heatmap, transitions and trend.
+    """
+    frame = load_entries(user, start_date, end_date)
+    return {
+        'start_date': start_date.strftime('%Y-%m-%d') if isinstance(start_date, datetime.date) else start_date,
+        'end_date': end_date.strftime('%Y-%m-%d') if isinstance(end_date, datetime.date) else end_date,
+        'total_entries': len(frame),
+        'rolling_averages': rolling_averages(frame),
+        'heatmap': weekday_hour_heatmap(frame),
+        'transitions': transition_matrix(frame),
+        'trend': intensity_trend(frame),
+    }
@@ -6,11 +6,15 @@ from . import api_views
 router = DefaultRouter()
 router.register(r'users', api_views.UserViewSet, basename='user')
 router.register(r'moods', api_views.MoodEntryViewSet, basename='mood')
+# Path used by the React client
+router.register(r'mood-entries', api_views.MoodEntryViewSet, basename='mood-entry')
 router.register(r'journals', api_views.JournalViewSet, basename='journal')
 router.register(r'reminders', api_views.ReminderViewSet, basename='reminder')
 router.register(r'achievements', api_views.AchievementViewSet, basename='achievement')
+router.register(r'jobs', api_views.JobViewSet, basename='job')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
+    path('search/', api_views.search_entries, name='search'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
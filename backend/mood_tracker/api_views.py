@@ -1,19 +1,26 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db import models
-from django.http import HttpResponse
+from django.http import FileResponse
+from django.utils.decorators import method_decorator
 import datetime
 import json
-import csv
 
-from .models import User, MoodEntry, Journal, Reminder, Achievement, UserAchievement
+from .models import User, MoodEntry, DailyMoodRollup, Journal, Reminder, Achievement, Job
 from .serializers import (
     UserSerializer, MoodEntrySerializer, JournalSerializer, 
-    ReminderSerializer, MoodStatsSerializer, MoodHistorySerializer
+    ReminderSerializer, MoodStatsSerializer, MoodHistorySerializer, JobSerializer
 )
+from . import streaks, exports, jobs, search, ingest, analytics, downsampling, achievements as achievement_progress
+from .pagination import CursorOrPageNumberPagination, MOOD_ENTRY_ORDERING, JOURNAL_ORDERING
+from .versioning import conditional
+from mindmate.cache import tiered_cache, user_tag, MOODS
+
+# Most journals a search filter on JournalViewSet returns
+SEARCH_MAX_RESULTS = 200
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
@@ -31,10 +38,10 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         Filter queryset to return only the current user's data.
         
         Returns:
-            QuerySet: User objects filtered by current session user_id.
+            QuerySet: User objects filtered by the authenticated session user.
         """
         # Users can only see their own data
-        return User.objects.filter(uid=self.request.session.get('user_id'))
+        return User.objects.filter(uid=self.request.user.pk)
     
     @action(detail=False, methods=['get'])
     def me(self, request):
@@ -45,25 +52,25 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             request: Django REST framework Request object.
             
         Returns:
-            Response: Serialized user data or error message.
+            Response: Serialized user data.
         """
-        try:
-            user = User.objects.get(uid=request.session.get('user_id'))
-            serializer = self.get_serializer(user)
-            return Response(serializer.data)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = self.get_serializer(request.user)
+        return Response(serializer.data)
 
 
+@method_decorator(conditional, name='list')
 class MoodEntryViewSet(viewsets.ModelViewSet):
     """
     API endpoint for mood entries.
     
     Provides full CRUD operations for mood entries, with additional
-    actions for statistics, history, and data export.
+    actions for statistics, history, and data export. Lists are paged by
+    page number, or by keyset when a ``cursor`` parameter is given.
     """
     serializer_class = MoodEntrySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = MOOD_ENTRY_ORDERING
     
     def get_queryset(self):
         """
@@ -72,8 +79,8 @@ class MoodEntryViewSet(viewsets.ModelViewSet):
         Returns:
             QuerySet: MoodEntry objects ordered by date and time (newest first).
         """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
-        return MoodEntry.objects.filter(user=user).order_by('-date', '-time')
+        user = self.request.user
+        return MoodEntry.objects.filter(user=user).order_by(*MOOD_ENTRY_ORDERING)
     
     def perform_create(self, serializer):
         """
@@ -82,145 +89,82 @@ class MoodEntryViewSet(viewsets.ModelViewSet):
         Args:
             serializer: MoodEntrySerializer instance with validated data.
         """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
+        user = self.request.user
         serializer.save(user=user)
-
-
-class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
-    """
-    API endpoint for achievements.
     
-    Provides read-only access to achievements with user progress tracking
-    and unlock status information.
-    """
-    permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
         """
-        Get all active achievements.
+        Create many mood entries in one request.
         
-        Returns:
-            QuerySet: Active Achievement objects.
-        """
-        return Achievement.objects.filter(is_active=True)
-    
-    @action(detail=False, methods=['get'])
-    def user_achievements(self, request):
-        """
-        Get all achievements with user's unlock status and progress.
-        
-        Calculates current progress toward each achievement and returns
-        comprehensive achievement data including unlock status.
+        Accepts a JSON list (or ``{"entries": [...]}``), NDJSON or CSV in
+        the shape the export produces, chosen by the ``type`` query
+        parameter or the Content-Type header. Rows carrying a
+        ``client_key`` already uploaded by this user are skipped, so
+        offline clients can safely retry. Unless ``skip_invalid`` is set,
+        any invalid row rejects the whole upload.
         
         Args:
             request: Django REST framework Request object.
             
         Returns:
-            Response: Achievement data with progress and unlock information.
+            Response: Created and duplicate counts, row errors, and the
+                entry id for each client key.
         """
-        try:
-            user = User.objects.get(uid=request.session.get('user_id'))
-            
-            # Get all achievements
-            all_achievements = Achievement.objects.filter(is_active=True)
-            
-            # Get user's unlocked achievements
-            user_achievements = UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True)
-            
-            # Calculate user's current progress for each achievement type
-            user_stats = {
-                'mood_count': MoodEntry.objects.filter(user=user).count(),
-                'journal_count': Journal.objects.filter(user=user).count(),
-                'mood_streak': self.calculate_mood_streak(user),
-                'consistency': self.calculate_consistency(user),
-            }
-            
-            # Prepare achievement data with unlock status and progress
-            achievement_data = []
-            for achievement in all_achievements:
-                is_unlocked = achievement.id in user_achievements
-                current_progress = user_stats.get(achievement.achievement_type, 0)
-                progress_percentage = min(100, (current_progress / achievement.requirement_value) * 100) if achievement.requirement_value > 0 else 0
-                
-                unlocked_at = None
-                if is_unlocked:
-                    user_achievement = UserAchievement.objects.filter(user=user, achievement=achievement).first()
-                    unlocked_at = user_achievement.unlocked_at if user_achievement else None
-                
-                achievement_data.append({
-                    'achievement': {
-                        'id': str(achievement.id),
-                        'name': achievement.name,
-                        'description': achievement.description,
-                        'icon': achievement.icon,
-                        'achievement_type': achievement.achievement_type,
-                        'requirement_value': achievement.requirement_value,
-                        'points': achievement.points,
-                    },
-                    'is_unlocked': is_unlocked,
-                    'current_progress': current_progress,
-                    'progress_percentage': progress_percentage,
-                    'unlocked_at': unlocked_at
-                })
-            
-            response_data = {
-                'achievement_data': achievement_data,
-                'total_achievements': len(all_achievements),
-                'unlocked_count': len(user_achievements),
-            }
-            
-            return Response(response_data)
-            
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def calculate_mood_streak(self, user):
-        """
-        Calculate the current consecutive day streak of mood entries.
-        
-        Args:
-            user: User object to calculate streak for.
-            
-        Returns:
-            int: Number of consecutive days with mood entries.
-        """
-        mood_entries = MoodEntry.objects.filter(user=user).order_by('-date')
-        if not mood_entries:
-            return 0
-        
-        streak = 0
-        current_date = timezone.now().date()
+        content_type = request.content_type.split(';')[0].strip()
+        ingest_format = request.query_params.get('type') or ingest.CONTENT_TYPE_FORMATS.get(content_type)
+        if ingest_format not in ingest.INGEST_FORMATS:
+            return Response(
+                {'error': f'Unsupported upload type; use one of {", ".join(ingest.INGEST_FORMATS)}'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
         
-        for entry in mood_entries:
-            if entry.date == current_date:
-                streak += 1
-                current_date -= datetime.timedelta(days=1)
-            else:
-                break
-        
-        return streak
+        try:
+            records = ingest.parse_records(request.body, ingest_format)
+        except ingest.IngestError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > ingest.max_entries():
+            return Response(
+                {'error': f'At most {ingest.max_entries()} entries can be uploaded at once'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        
+        skip_invalid = request.query_params.get('skip_invalid', '').lower() in ('1', 'true', 'yes')
+        summary = ingest.ingest_mood_entries(request.user, records, skip_invalid=skip_invalid)
+        if summary['errors'] and not skip_invalid:
+            return Response(summary, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
     
-    def calculate_consistency(self, user):
+    @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
+    def analytics(self, request):
         """
-        Calculate user's mood tracking consistency over the last 30 days.
+        Get rolling averages, heatmap, mood transitions and trend for a date range.
         
         Args:
-            user: User object to calculate consistency for.
+            request: Django REST framework Request object with optional
+                    start_date and end_date (YYYY-MM-DD) or days query
+                    parameters. Defaults to the last 365 days.
             
         Returns:
-            int: Number of unique days with mood entries in the last 30 days.
+            Response: Daily average intensity with 7 and 30 day rolling
+                averages, a weekday x hour heatmap, a mood transition
+                matrix and the intensity trend.
         """
-        thirty_days_ago = timezone.now().date() - datetime.timedelta(days=30)
-        mood_dates = MoodEntry.objects.filter(
-            user=user, 
-            date__gte=thirty_days_ago
-        ).values_list('date', flat=True).distinct()
-        
-        return len(mood_dates)
+        try:
+            start_date, end_date = _date_range(request.query_params, default_days=365)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        user = request.user
+        return Response(tiered_cache.get_or_set(
+            f'analytics:{user.pk}:{start_date.isoformat()}:{end_date.isoformat()}',
+            lambda: analytics.build_analytics(user, start_date, end_date),
+            tags=[user_tag(user.pk, MOODS)],
+        ))
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
     def recent(self, request):
         """
         Get recent mood entries from the last 7 days.
@@ -231,7 +175,7 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
         Returns:
             Response: Serialized recent mood entries (up to 10 entries).
         """
-        user = User.objects.get(uid=request.session.get('user_id'))
+        user = request.user
         week_ago = timezone.now().date() - datetime.timedelta(days=7)
         
         recent_moods = MoodEntry.objects.filter(
@@ -243,75 +187,72 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
     def history(self, request):
         """
         Get mood history with formatted data for charts and visualization.
         
         Supports date range filtering via query parameters and returns
-        data formatted for line charts and mood distribution charts.
+        data formatted for line charts and mood distribution charts. The
+        line series is downsampled on the server so it never holds more
+        than ``points`` values, however long the range.
         
         Args:
             request: Django REST framework Request object with optional
-                    start_date and end_date query parameters.
+                    start_date, end_date (or days), resolution (auto,
+                    entry, day, week or month) and points query parameters.
             
         Returns:
             Response: Mood history data formatted for charts.
         """
-        user = User.objects.get(uid=request.session.get('user_id'))
-        
-        # Get date range from request or default to last 30 days
-        end_date = timezone.now().date()
-        start_date = request.query_params.get('start_date')
-        end_date_param = request.query_params.get('end_date')
-        
-        if start_date:
-            start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
-        else:
-            start_date = end_date - datetime.timedelta(days=30)
-        
-        if end_date_param:
-            end_date = datetime.datetime.strptime(end_date_param, '%Y-%m-%d').date()
+        user = request.user
+        try:
+            start_date, end_date = _date_range(request.query_params)
+            resolution, max_points = _resolution_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Calculate mood distribution from the daily rollups
+        summary = DailyMoodRollup.objects.filter(user=user).summary(start_date, end_date)
+        resolution, points = downsampling.history_points(
+            user, start_date, end_date, resolution, max_points, summary['total_entries']
+        )
         
-        # Get mood entries for the date range
-        mood_entries = MoodEntry.objects.filter(
-            user=user,
-            date__gte=start_date,
-            date__lte=end_date
-        ).order_by('date', 'time')
-        
-        # Format data for charts
-        dates = [entry.date.strftime('%Y-%m-%d') for entry in mood_entries]
-        intensities = [entry.intensity for entry in mood_entries]
-        moods = [entry.get_mood_display() for entry in mood_entries]
-        
-        # Calculate mood distribution
-        mood_counts = mood_entries.values('mood').annotate(
-            count=models.Count('mood')
-        ).order_by('mood')
-        
-        mood_labels = []
-        mood_count_values = []
-        
-        for mood_count in mood_counts:
-            mood_key = mood_count['mood']
-            mood_display = dict(MoodEntry.MOOD_CHOICES).get(mood_key, mood_key)
-            mood_labels.append(mood_display)
-            mood_count_values.append(mood_count['count'])
-        
-        data = {
-            'dates': dates,
-            'intensities': intensities,
-            'moods': moods,
-            'mood_labels': mood_labels,
-            'mood_counts': mood_count_values,
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d')
-        }
+        data = _history_data(summary, resolution, points, start_date, end_date)
         
         serializer = MoodHistorySerializer(data)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
+    def mood_history(self, request):
+        """
+        Get downsampled mood history points for the React history chart.
+        
+        Args:
+            request: Django REST framework Request object with optional
+                    days (default 30) or start_date/end_date, resolution
+                    and points query parameters.
+            
+        Returns:
+            Response: List of points, oldest first, each with date, time,
+                entries, average_mood (mean intensity), min_intensity,
+                max_intensity and the dominant mood. The resolution used
+                is returned in the X-Resolution header.
+        """
+        try:
+            start_date, end_date = _date_range(request.query_params)
+            resolution, max_points = _resolution_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resolution, points = downsampling.history_points(request.user, start_date, end_date, resolution, max_points)
+        response = Response(points)
+        response['X-Resolution'] = resolution
+        return response
+    
+    @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
     def stats(self, request):
         """
         Get comprehensive mood statistics for a date range.
@@ -321,104 +262,178 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
         
         Args:
             request: Django REST framework Request object with optional
-                    start_date query parameter.
+                    start_date (or days) query parameter.
             
         Returns:
             Response: Mood statistics including distribution and averages.
         """
-        user = User.objects.get(uid=request.session.get('user_id'))
-        
-        # Get date range
-        end_date = timezone.now().date()
-        start_date = request.query_params.get('start_date')
-        if start_date:
-            start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
-        else:
-            start_date = end_date - datetime.timedelta(days=30)
-        
-        mood_entries = MoodEntry.objects.filter(
-            user=user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # Calculate statistics
-        mood_distribution = {}
-        for choice in MoodEntry.MOOD_CHOICES:
-            count = mood_entries.filter(mood=choice[0]).count()
-            mood_distribution[choice[1]] = count
-        
-        avg_intensity = mood_entries.aggregate(
-            avg=models.Avg('intensity')
-        )['avg'] or 0
-        
-        data = {
-            'mood_distribution': mood_distribution,
-            'average_intensity': round(avg_intensity, 2),
-            'total_entries': mood_entries.count(),
-            'date_range': {
-                'start': start_date.strftime('%Y-%m-%d'),
-                'end': end_date.strftime('%Y-%m-%d')
-            }
-        }
+        try:
+            start_date, end_date = _date_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = MoodStatsSerializer(data)
+        serializer = MoodStatsSerializer(_mood_stats(request.user, start_date, end_date))
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
+    def mood_stats(self, request):
+        """
+        Get mood statistics with streak figures for the React dashboard.
+        
+        Args:
+            request: Django REST framework Request object with optional
+                    days (default 30) or start_date/end_date query parameters.
+            
+        Returns:
+            Response: The stats fields plus average_mood, most_common_mood
+                (mood key), streak and longest_streak.
+        """
+        try:
+            start_date, end_date = _date_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = _mood_stats(request.user, start_date, end_date)
+        streak = streaks.get_streak_stats(request.user)
+        counts = {key: count for key, count in data['mood_counts'].items() if count}
+        data.update({
+            'average_mood': data['average_intensity'] if data['total_entries'] else None,
+            'most_common_mood': max(counts, key=counts.get) if counts else None,
+            'streak': streak['current_streak'],
+            'longest_streak': streak['longest_streak'],
+        })
+        return Response(data)
+    
+    @action(detail=False, methods=['get', 'post'])
     def export(self, request):
         """
-        Export all user's mood data as a CSV file.
+        Export all user's mood data as a streaming CSV or NDJSON download.
         
-        Creates a downloadable CSV file containing all mood entries
-        with date, time, mood, intensity, and notes.
+        A POST queues the export as a background job instead and answers
+        202 with the job to poll.
         
         Args:
-            request: Django REST framework Request object.
+            request: Django REST framework Request object with optional
+                    type query parameter (csv or ndjson).
             
         Returns:
-            HttpResponse: CSV file download response.
+            StreamingHttpResponse: File download response, or the queued
+                job for a POST.
         """
-        user = User.objects.get(uid=request.session.get('user_id'))
-        mood_entries = MoodEntry.objects.filter(user=user).order_by('date', 'time')
+        return _export_response(request, 'mood')
+    
+    @action(detail=False, methods=['get', 'post'])
+    def export_data(self, request):
+        """
+        Export the user's mood data; the URL the React client calls.
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="mood_data_{timezone.now().strftime("%Y%m%d")}.csv"'
+        Args:
+            request: Django REST framework Request object with optional
+                    type query parameter (csv or ndjson).
+            
+        Returns:
+            StreamingHttpResponse: File download response, or the queued
+                job for a POST.
+        """
+        return _export_response(request, 'mood')
+
+
+class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for achievements.
+    
+    Provides read-only access to achievements with user progress tracking
+    and unlock status information.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """
+        Get all active achievements.
         
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Time', 'Mood', 'Intensity', 'Notes'])
+        Returns:
+            QuerySet: Active Achievement objects.
+        """
+        return Achievement.objects.filter(is_active=True)
+    
+    @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
+    def user_achievements(self, request):
+        """
+        Get all achievements with user's unlock status and progress.
         
-        for entry in mood_entries:
-            writer.writerow([
-                entry.date,
-                entry.time,
-                entry.get_mood_display(),
-                entry.intensity,
-                entry.notes or ''
-            ])
+        Calculates current progress toward each achievement and returns
+        comprehensive achievement data including unlock status.
         
-        return response
+        Args:
+            request: Django REST framework Request object.
+            
+        Returns:
+            Response: Achievement data with progress and unlock information.
+        """
+        try:
+            user = request.user
+            
+            progress = achievement_progress.cached_progress(user)
+            
+            return Response(_achievements_data(progress))
+            
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional, name='list')
 class JournalViewSet(viewsets.ModelViewSet):
     """
     API endpoint for journal entries.
     
     Provides full CRUD operations for journal entries with
-    data export functionality.
+    data export functionality. Lists are paged by page number, or by
+    keyset when a ``cursor`` parameter is given.
     """
     serializer_class = JournalSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
+    
+    @property
+    def keyset_ordering(self):
+        """
+        Ordering used for keyset pages.
+        
+        Search results are ranked rather than date ordered, so they are
+        always paged by page number.
+        
+        Returns:
+            tuple: Ordering fields, or None while searching.
+        """
+        if self.request.query_params.get('search', '').strip():
+            return None
+        return JOURNAL_ORDERING
     
     def get_queryset(self):
         """
         Filter queryset to return only the current user's journal entries.
         
+        With a ``search`` query parameter, only matching journals are
+        returned, best match first.
+        
         Returns:
-            QuerySet: Journal objects ordered by creation date (newest first).
-        """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
-        return Journal.objects.filter(user=user).order_by('-created_at')
+            QuerySet: Journal objects ordered by creation date (newest first)
+                or by search rank.
+        """
+        user = self.request.user
+        queryset = Journal.objects.filter(user=user)
+        query = self.request.query_params.get('search', '').strip()
+        if not query:
+            return queryset.order_by(*JOURNAL_ORDERING)
+        
+        hits = search.search(user, query, kinds=[search.KIND_JOURNAL], limit=SEARCH_MAX_RESULTS)
+        ranking = models.Case(
+            *[models.When(pk=hit['id'], then=position) for position, hit in enumerate(hits)],
+            output_field=models.IntegerField(),
+        )
+        return queryset.filter(pk__in=[hit['id'] for hit in hits]).order_by(ranking) if hits else queryset.none()
     
     def perform_create(self, serializer):
         """
@@ -427,40 +442,26 @@ class JournalViewSet(viewsets.ModelViewSet):
         Args:
             serializer: JournalSerializer instance with validated data.
         """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
+        user = self.request.user
         serializer.save(user=user)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get', 'post'])
     def export(self, request):
         """
-        Export all user's journal data as a CSV file.
+        Export all user's journal data as a streaming CSV or NDJSON download.
         
-        Creates a downloadable CSV file containing all journal entries
-        with date, title, and content.
+        A POST queues the export as a background job instead and answers
+        202 with the job to poll.
         
         Args:
-            request: Django REST framework Request object.
+            request: Django REST framework Request object with optional
+                    type query parameter (csv or ndjson).
             
         Returns:
-            HttpResponse: CSV file download response.
+            StreamingHttpResponse: File download response, or the queued
+                job for a POST.
         """
-        user = User.objects.get(uid=request.session.get('user_id'))
-        journals = Journal.objects.filter(user=user).order_by('created_at')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="journal_data_{timezone.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Title', 'Content'])
-        
-        for journal in journals:
-            writer.writerow([
-                journal.created_at.date(),
-                journal.title or '',
-                journal.content
-            ])
-        
-        return response
+        return _export_response(request, 'journal')
 
 
 class ReminderViewSet(viewsets.ModelViewSet):
@@ -480,7 +481,7 @@ class ReminderViewSet(viewsets.ModelViewSet):
         Returns:
             QuerySet: Reminder objects ordered by time.
         """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
+        user = self.request.user
         return Reminder.objects.filter(user=user).order_by('time')
     
     def perform_create(self, serializer):
@@ -490,5 +491,328 @@ class ReminderViewSet(viewsets.ModelViewSet):
         Args:
             serializer: ReminderSerializer instance with validated data.
         """
-        user = User.objects.get(uid=self.request.session.get('user_id'))
-        serializer.save(user=user)
\ No newline at end of file
+        user = self.request.user
+        serializer.save(user=user)
+
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for background jobs.
+    
+    Lists the user's jobs newest first and reports a job's status for
+    polling. A POST with ``kind`` (export, achievements or rollups) and
+    optional ``params`` queues a job; finished exports are downloaded from
+    the ``download`` action.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """
+        Filter queryset to return only the current user's jobs.
+        
+        Returns:
+            QuerySet: Job objects, newest first.
+        """
+        return Job.objects.filter(user=self.request.user).order_by('-created_at')
+    
+    def create(self, request):
+        """
+        Queue a job for the user.
+        
+        Args:
+            request: Django REST framework Request object with ``kind`` and
+                    optional ``params`` (``data`` and ``format`` for an
+                    export).
+            
+        Returns:
+            Response: 202 with the job, or 400 for an unknown kind or bad
+                parameters.
+        """
+        kind = request.data.get('kind')
+        spec = jobs.KINDS.get(kind)
+        if spec is None or not spec.user_enqueueable:
+            return Response({'error': f'Unsupported job kind: {kind}'}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.data.get('params') or {}
+        if not isinstance(params, dict):
+            return Response({'error': 'params must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        if kind == 'export':
+            params = {'data': params.get('data', 'mood'), 'format': params.get('format', 'csv')}
+        else:
+            params = {}
+        try:
+            return _enqueue(request, kind, params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Download a finished job's result file.
+        
+        Args:
+            request: Django REST framework Request object.
+            pk: Primary key of the job.
+            
+        Returns:
+            FileResponse: The file as an attachment, or 409 while the job
+                has no file.
+        """
+        job = self.get_object()
+        if job.status != Job.DONE or not job.result_file:
+            return Response(
+                {'error': 'Job has no result file yet', 'status': job.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=job.result['filename'],
+            content_type=job.result['content_type'],
+        )
+
+def _date_range(params, default_days=30):
+    """
+    Read the date range of a statistics or history request.
+    
+    Args:
+        params: Query parameters, with optional start_date and end_date
+                (YYYY-MM-DD) or days.
+        default_days: Days covered when no start is given.
+        
+    Returns:
+        tuple: (start date, end date).
+        
+    Raises:
+        ValueError: If a parameter is malformed.
+    """
+    try:
+        end_date = timezone.now().date()
+        if params.get('end_date'):
+            end_date = datetime.datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+        if params.get('start_date'):
+            start_date = datetime.datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+        else:
+            days = int(params.get('days', default_days))
+            if days < 1:
+                raise ValueError
+            start_date = end_date - datetime.timedelta(days=days)
+    except (ValueError, OverflowError):
+        raise ValueError('Dates must be formatted as YYYY-MM-DD and days must be a positive integer')
+    return start_date, end_date
+
+
+def _resolution_params(params):
+    """
+    Read the downsampling parameters of a history request.
+    
+    Args:
+        params: Query parameters, with optional resolution and points.
+        
+    Returns:
+        tuple: (resolution, maximum number of points).
+        
+    Raises:
+        ValueError: If a parameter is not supported.
+    """
+    resolution = params.get('resolution', 'auto')
+    if resolution not in downsampling.RESOLUTIONS:
+        raise ValueError(f'resolution must be one of {", ".join(downsampling.RESOLUTIONS)}')
+    try:
+        max_points = int(params.get('points', downsampling.DEFAULT_MAX_POINTS))
+    except ValueError:
+        raise ValueError('points must be an integer')
+    return resolution, min(max(max_points, 3), downsampling.MAX_POINTS_LIMIT)
+
+
+def _history_data(summary, resolution, points, start_date, end_date):
+    """
+    Shape a history range's summary and chart points for the history endpoint.
+    
+    Args:
+        summary: Rollup summary of the range.
+        resolution: Resolution the points were built at.
+        points: Downsampled chart points.
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        
+    Returns:
+        dict: Chart series, mood distribution and range, as expected by
+            MoodHistorySerializer.
+    """
+    mood_labels = []
+    mood_count_values = []
+    
+    for mood_key, count in summary['mood_counts'].items():
+        mood_display = dict(MoodEntry.MOOD_CHOICES).get(mood_key, mood_key)
+        mood_labels.append(mood_display)
+        mood_count_values.append(count)
+    
+    return {
+        'dates': [point['date'] for point in points],
+        'intensities': [point['average_mood'] for point in points],
+        'moods': [point['mood_display'] for point in points],
+        'mood_labels': mood_labels,
+        'mood_counts': mood_count_values,
+        'resolution': resolution,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d')
+    }
+
+
+def _achievements_data(progress):
+    """
+    Shape achievement progress for the user achievements endpoint.
+    
+    Args:
+        progress: Progress as returned by achievements.cached_progress.
+        
+    Returns:
+        dict: achievement_data (achievement, unlock status and progress
+            for each achievement), total_achievements and unlocked_count.
+    """
+    achievement_data = []
+    for item in progress['achievement_data']:
+        achievement = item['achievement']
+        achievement_data.append({
+            'achievement': {
+                'id': str(achievement.id),
+                'name': achievement.name,
+                'description': achievement.description,
+                'icon': achievement.icon,
+                'achievement_type': achievement.achievement_type,
+                'requirement_value': achievement.requirement_value,
+                'points': achievement.points,
+            },
+            'is_unlocked': item['is_unlocked'],
+            'current_progress': item['current_progress'],
+            'progress_percentage': item['progress_percentage'],
+            'unlocked_at': item['unlocked_at']
+        })
+    
+    return {
+        'achievement_data': achievement_data,
+        'total_achievements': progress['total_achievements'],
+        'unlocked_count': progress['unlocked_count'],
+    }
+
+
+def _mood_stats(user, start_date, end_date):
+    """
+    Summarize a user's mood entries over a date range from the daily rollups.
+    
+    Args:
+        user: User object.
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        
+    Returns:
+        dict: See _stats_data.
+    """
+    summary = DailyMoodRollup.objects.filter(user=user).summary(start_date, end_date)
+    return _stats_data(summary, start_date, end_date)
+
+
+def _stats_data(summary, start_date, end_date):
+    """
+    Shape a rollup summary as mood statistics.
+    
+    Args:
+        summary: Rollup summary of the range.
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        
+    Returns:
+        dict: mood_distribution (by display name), mood_counts (by key),
+            average_intensity, total_entries and date_range.
+    """
+    mood_distribution = {}
+    for choice in MoodEntry.MOOD_CHOICES:
+        mood_distribution[choice[1]] = summary['mood_counts'].get(choice[0], 0)
+    
+    return {
+        'mood_distribution': mood_distribution,
+        'mood_counts': dict(summary['mood_counts']),
+        'average_intensity': round(summary['average_intensity'], 2),
+        'total_entries': summary['total_entries'],
+        'date_range': {
+            'start': start_date.strftime('%Y-%m-%d'),
+            'end': end_date.strftime('%Y-%m-%d')
+        }
+    }
+
+
+def _export_response(request, data_type):
+    """
+    Build a streaming export for the authenticated user, or queue one.
+    
+    Args:
+        request: Django REST framework Request object; a POST queues the
+                export as a background job.
+        data_type: Kind of data to export (mood, journal or all).
+        
+    Returns:
+        StreamingHttpResponse: File download, the queued job for a POST, or
+            a 400 Response for an unsupported export type.
+    """
+    export_format = request.query_params.get('type', 'csv')
+    try:
+        if request.method == 'POST':
+            return _enqueue(request, 'export', {'data': data_type, 'format': export_format})
+        return exports.export_response(request.user, data_type, export_format)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _enqueue(request, kind, params):
+    """
+    Queue a job for the authenticated user and describe it.
+    
+    Args:
+        request: Django REST framework Request object.
+        kind: Registered job kind.
+        params: Handler parameters.
+        
+    Returns:
+        Response: 202 with the job (the one already queued for a
+            duplicate request) and its status URL as Location.
+        
+    Raises:
+        ValueError: If the parameters are not valid for the kind.
+    """
+    if kind == 'export':
+        exports.validate(params['data'], params['format'])
+    job, _ = jobs.enqueue(kind, request.user, params)
+    data = JobSerializer(job, context={'request': request}).data
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['status_url']})
+
+
+@api_view(['GET'])
+def search_entries(request):
+    """
+    Full-text search over the user's journals and mood notes.
+    
+    Args:
+        request: Django REST framework Request object with a ``q`` query
+                parameter, plus optional ``type`` (journal, mood or all)
+                and ``limit`` (at most 50).
+        
+    Returns:
+        Response: The query and ranked hits with highlighted title and
+            snippet HTML.
+    """
+    query = request.query_params.get('q', '').strip()
+    kind = request.query_params.get('type', 'all')
+    if kind not in ('all',) + search.KINDS:
+        return Response({'error': f'Unsupported search type: {kind}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    kinds = search.KINDS if kind == 'all' else [kind]
+    return Response({
+        'query': query,
+        'results': search.search(request.user, query, kinds=kinds, limit=limit),
+    })
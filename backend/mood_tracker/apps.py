@@ -10,3 +10,14 @@ class MoodTrackerConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mood_tracker'
+    
+    def ready(self):
+        """
+        Register model signal handlers and system checks once the app registry is ready.
+        """
+        from django.core import checks
+
+        from . import signals  # noqa: F401
+        from .tokens import check_project_id
+
+        checks.register(check_project_id)
@@ -0,0 +1,283 @@
+"""
+Async views for the JSON endpoints and read-heavy pages.
+
+These run on the event loop when the project is served over ASGI: the
+session, user and data version stamp are loaded with the async ORM,
+independent queries are awaited together and cache hits never leave the
+loop. Django still runs each query on a database thread, so the gain over
+the sync views under ASGI is fewer thread hops per request, and slow
+CPU-bound work such as token signature checks no longer ties up the loop.
+
+The Firebase endpoints are routed here for every server. The dashboard and
+the API reads replace their sync counterparts only in ``mindmate.asgi_urls``;
+under WSGI each async view would need its own event loop, so WSGI keeps the
+sync views. Responses match the sync views field for field.
+"""
+import datetime
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import MoodEntry, DailyMoodRollup, DeviceToken
+from .serializers import MoodEntrySerializer, MoodStatsSerializer, MoodHistorySerializer
+from . import downsampling, tokens, achievements as achievement_progress
+from .api_views import _date_range, _resolution_params, _history_data, _stats_data, _achievements_data
+from .auth import aget_request_user
+from .dashboard import DashboardSnapshot
+from .versioning import conditional
+
+# Number of entries returned by the recent moods endpoint
+RECENT_MOOD_LIMIT = 10
+
+
+def auth_required(view_func):
+    """
+    Decorator that redirects async page views to login without a session.
+
+    Args:
+        view_func: The async view function to be decorated.
+
+    Returns:
+        function: Wrapped view function that checks authentication.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if await request.session.aget('user_id') is None:
+            return redirect('login')
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def api_auth_required(view_func):
+    """
+    Decorator that rejects async API views without a session user.
+
+    Answers like DRF's session authentication does, with 403 and a detail
+    message.
+
+    Args:
+        view_func: The async view function to be decorated.
+
+    Returns:
+        function: Wrapped view function that checks authentication.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if await aget_request_user(request) is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def api_response(data, status=200):
+    """
+    Return JSON encoded the way DRF encodes API responses.
+
+    Args:
+        data: Serializable data.
+        status: HTTP status code.
+
+    Returns:
+        JsonResponse: The response.
+    """
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+@csrf_exempt
+@require_POST
+async def verify_token(request):
+    """
+    Verify Firebase ID token and create user session.
+
+    The token is verified locally against Firebase's signing keys (see
+    tokens), on a worker thread unless its claims are already cached.
+
+    Args:
+        request: Django HttpRequest object with JSON body containing token.
+
+    Returns:
+        JsonResponse: Success/failure status with error details.
+    """
+    try:
+        data = json.loads(request.body)
+        id_token = data.get('token')
+
+        if not id_token:
+            return JsonResponse({'success': False, 'error': 'No token provided'}, status=400)
+
+        claims = await tokens.averify(id_token)
+        user_id = claims['sub']
+
+        # Store token in session
+        await request.session.aset('id_token', id_token)
+        await request.session.aset('user_id', user_id)
+
+        return JsonResponse({'success': True})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@csrf_exempt
+@require_POST
+@auth_required
+async def save_fcm_token(request):
+    """
+    Register the browser's Firebase Cloud Messaging token for push notifications.
+
+    Each device gets its own row, so reminders reach every device the user
+    has enabled notifications on. Saving a known token refreshes its
+    last-seen time, and moves it to this user if another account used the
+    device before.
+
+    Args:
+        request: Django HttpRequest object with JSON body containing token.
+
+    Returns:
+        JsonResponse: Success/failure status with error details.
+    """
+    try:
+        data = json.loads(request.body)
+        token = data.get('token')
+
+        if not token:
+            return JsonResponse({'success': False, 'error': 'No token provided'}, status=400)
+        if not isinstance(token, str) or len(token) > DeviceToken._meta.get_field('token').max_length:
+            return JsonResponse({'success': False, 'error': 'Invalid token'}, status=400)
+
+        user = await aget_request_user(request)
+        if not user:
+            return JsonResponse({'success': False, 'error': 'User not found'}, status=404)
+
+        await DeviceToken.objects.aupdate_or_create(
+            token=token,
+            defaults={'user': user, 'last_seen_at': timezone.now()},
+        )
+
+        return JsonResponse({'success': True})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@auth_required
+@conditional
+async def dashboard(request):
+    """
+    Display the main dashboard from the user's cached snapshot.
+
+    Args:
+        request: Django HttpRequest object.
+
+    Returns:
+        HttpResponse: Rendered dashboard page or redirect to logout.
+    """
+    user = await aget_request_user(request)
+    if not user:
+        return redirect('logout')
+
+    snapshot = await DashboardSnapshot.afor_user(user)
+    return render(request, 'mood_tracker/dashboard.html', {'user': user, **snapshot.as_context()})
+
+
+@require_GET
+@api_auth_required
+@conditional
+async def recent(request):
+    """
+    Get recent mood entries from the last 7 days.
+
+    Args:
+        request: Django HttpRequest object.
+
+    Returns:
+        JsonResponse: Serialized recent mood entries (up to 10 entries).
+    """
+    week_ago = timezone.now().date() - datetime.timedelta(days=7)
+    queryset = MoodEntry.objects.filter(
+        user=request.mm_user,
+        date__gte=week_ago
+    ).order_by('-date', '-time')[:RECENT_MOOD_LIMIT]
+
+    recent_moods = [entry async for entry in queryset]
+    return api_response(MoodEntrySerializer(recent_moods, many=True).data)
+
+
+@require_GET
+@api_auth_required
+@conditional
+async def history(request):
+    """
+    Get downsampled mood history with the mood distribution for charts.
+
+    Args:
+        request: Django HttpRequest object with optional start_date,
+            end_date (or days), resolution and points query parameters.
+
+    Returns:
+        JsonResponse: Mood history data formatted for charts.
+    """
+    user = request.mm_user
+    try:
+        start_date, end_date = _date_range(request.GET)
+        resolution, max_points = _resolution_params(request.GET)
+    except ValueError as e:
+        return api_response({'error': str(e)}, status=400)
+
+    summary = await DailyMoodRollup.objects.filter(user=user).asummary(start_date, end_date)
+    resolution, points = await sync_to_async(downsampling.history_points)(
+        user, start_date, end_date, resolution, max_points, summary['total_entries']
+    )
+    data = _history_data(summary, resolution, points, start_date, end_date)
+    return api_response(MoodHistorySerializer(data).data)
+
+
+@require_GET
+@api_auth_required
+@conditional
+async def stats(request):
+    """
+    Get mood distribution, average intensity and total entries for a range.
+
+    Args:
+        request: Django HttpRequest object with optional start_date (or
+            days) query parameter.
+
+    Returns:
+        JsonResponse: Mood statistics including distribution and averages.
+    """
+    try:
+        start_date, end_date = _date_range(request.GET)
+    except ValueError as e:
+        return api_response({'error': str(e)}, status=400)
+
+    summary = await DailyMoodRollup.objects.filter(user=request.mm_user).asummary(start_date, end_date)
+    return api_response(MoodStatsSerializer(_stats_data(summary, start_date, end_date)).data)
+
+
+@require_GET
+@api_auth_required
+@conditional
+async def user_achievements(request):
+    """
+    Get all achievements with user's unlock status and progress.
+
+    Progress is served from the tiered cache without leaving the event
+    loop, and rebuilt on a worker thread after a write.
+
+    Args:
+        request: Django HttpRequest object.
+
+    Returns:
+        JsonResponse: Achievement data with progress and unlock information.
+    """
+    try:
+        progress = await achievement_progress.acached_progress(request.mm_user)
+        return api_response(_achievements_data(progress))
+    except Exception as e:
+        return api_response({'error': str(e)}, status=500)
@@ -0,0 +1,193 @@
+"""
+Request-scoped resolution of the logged-in MindMate user.
+
+The session stores the user's uid; this module turns it into a User row at
+most once per request, backed by a small per-process LRU cache with a TTL
+so repeat requests from the same user can skip the lookup entirely. The
+cache is invalidated whenever a User row is saved or deleted.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import SessionAuthentication
+
+from .models import User
+
+
+class UserCache:
+    """
+    Thread-safe LRU cache of User rows with a per-entry time to live.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, uid):
+        """
+        Return a copy of the cached user, or None if missing or expired.
+
+        Args:
+            uid: Primary key of the user.
+
+        Returns:
+            User: A private copy of the cached row, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[uid]
+                return None
+            self._entries.move_to_end(uid)
+        # Callers may mutate the instance (e.g. profile forms), so never share it
+        return copy.copy(user)
+
+    def set(self, user):
+        """
+        Cache a user row, evicting the least recently used entry if full.
+
+        Args:
+            user: User instance to cache.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user.pk] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, uid):
+        """
+        Drop a user from the cache.
+
+        Args:
+            uid: Primary key of the user.
+        """
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def clear(self):
+        """
+        Drop every cached user.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'CURRENT_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'CURRENT_USER_CACHE_TTL', 30),
+)
+
+
+def resolve_user(uid):
+    """
+    Look up a user by uid, consulting the process-local cache first.
+
+    Args:
+        uid: Primary key of the user.
+
+    Returns:
+        User: The user, or None if no such user exists.
+    """
+    user = user_cache.get(uid)
+    if user is not None:
+        return user
+    user = User.objects.filter(uid=uid).first()
+    if user is not None:
+        user_cache.set(user)
+    return user
+
+
+def get_request_user(request):
+    """
+    Return the MindMate user for a request, resolving it at most once.
+
+    The result is stored on the request as ``mm_user``; CurrentUserMiddleware
+    normally sets it up front, but this also works for requests that did not
+    pass through the middleware.
+
+    Args:
+        request: Django HttpRequest object containing session data.
+
+    Returns:
+        User: The logged-in user, or None if the session has no valid user.
+    """
+    if not hasattr(request, 'mm_user'):
+        uid = request.session.get('user_id')
+        request.mm_user = resolve_user(uid) if uid else None
+    return request.mm_user
+
+
+async def aresolve_user(uid):
+    """
+    Async version of resolve_user for async views and middleware.
+
+    Args:
+        uid: Primary key of the user.
+
+    Returns:
+        User: The user, or None if no such user exists.
+    """
+    user = user_cache.get(uid)
+    if user is not None:
+        return user
+    user = await User.objects.filter(uid=uid).afirst()
+    if user is not None:
+        user_cache.set(user)
+    return user
+
+
+async def aget_request_user(request):
+    """
+    Async version of get_request_user for async views and middleware.
+
+    Loads the session without blocking the event loop, after which the
+    session can also be read synchronously for the rest of the request.
+
+    Args:
+        request: Django HttpRequest object containing session data.
+
+    Returns:
+        User: The logged-in user, or None if the session has no valid user.
+    """
+    if not hasattr(request, 'mm_user'):
+        uid = await request.session.aget('user_id')
+        request.mm_user = await aresolve_user(uid) if uid else None
+    return request.mm_user
+
+
+class SessionUserAuthentication(SessionAuthentication):
+    """
+    DRF authentication backed by the MindMate session user.
+
+    Authenticates API requests as the mood_tracker User stored in the
+    session, so ``request.user`` in viewsets is the application user rather
+    than Django's auth user, while still enforcing CSRF like DRF's own
+    SessionAuthentication.
+    """
+
+    def authenticate(self, request):
+        """
+        Authenticate the request from the session's user_id.
+
+        Args:
+            request: DRF Request object.
+
+        Returns:
+            tuple: (user, None) if authenticated, otherwise None.
+        """
+        user = get_request_user(request._request)
+        if user is None:
+            return None
+        self.enforce_csrf(request)
+        return (user, None)
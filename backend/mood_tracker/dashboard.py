@@ -0,0 +1,229 @@
+"""
+Dashboard context builder with a per-user result cache.
+
+A DashboardSnapshot fetches the user's 7-day mood window once and derives
+every dashboard widget from that in-memory list. Snapshots are cached per
+user and day in the tiered cache, tagged with the user's moods and
+journals so writes to either invalidate them, and repeat dashboard loads
+cost no queries for this data. Async views build snapshots with the async
+ORM, awaiting the window, journal count and streak queries together with
+asyncio.gather; the event loop serves other requests while they run.
+"""
+import asyncio
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from mindmate.cache import tiered_cache, user_tag, MOODS, JOURNALS
+
+from .models import MoodEntry, Journal
+from . import streaks
+
+# Number of recent mood entries shown on the dashboard
+RECENT_MOOD_LIMIT = 5
+
+
+class DashboardSnapshot:
+    """
+    Precomputed data for every widget on the dashboard page.
+
+    Attributes:
+        recent_moods: Latest mood entries in the window, newest first.
+        chart_dates: JSON encoded list of entry dates for the trend chart.
+        chart_intensities: JSON encoded list of entry intensities.
+        chart_moods: JSON encoded list of mood display names.
+        entries_this_week: Number of mood entries since Monday.
+        total_journals: Number of journal entries the user has written.
+        day_streak: Consecutive days with mood entries ending today.
+        weekly_goal: Percentage of this week's days with a mood entry.
+    """
+
+    def __init__(self, recent_moods, chart_dates, chart_intensities, chart_moods,
+                 entries_this_week, total_journals, day_streak, weekly_goal):
+        self.recent_moods = recent_moods
+        self.chart_dates = chart_dates
+        self.chart_intensities = chart_intensities
+        self.chart_moods = chart_moods
+        self.entries_this_week = entries_this_week
+        self.total_journals = total_journals
+        self.day_streak = day_streak
+        self.weekly_goal = weekly_goal
+
+    @classmethod
+    def build(cls, user, today=None):
+        """
+        Build a snapshot from the database.
+
+        Runs one query for the 7-day mood window, one for the journal count
+        and one for the stored streak state.
+
+        Args:
+            user: User object to build the snapshot for.
+            today: Optional reference date, defaults to the current date.
+
+        Returns:
+            DashboardSnapshot: The freshly computed snapshot.
+        """
+        today = today or timezone.now().date()
+        return cls.from_data(
+            today,
+            list(_window(user, today)),
+            Journal.objects.filter(user=user).count(),
+            streaks.get_streak_stats(user, today)['current_streak'],
+        )
+
+    @classmethod
+    async def abuild(cls, user, today=None):
+        """
+        Async version of build, running its three queries concurrently.
+
+        Args:
+            user: User object to build the snapshot for.
+            today: Optional reference date, defaults to the current date.
+
+        Returns:
+            DashboardSnapshot: The freshly computed snapshot.
+        """
+        today = today or timezone.now().date()
+
+        async def fetch_window():
+            return [entry async for entry in _window(user, today)]
+
+        window, total_journals, streak = await asyncio.gather(
+            fetch_window(),
+            Journal.objects.filter(user=user).acount(),
+            streaks.aget_streak_stats(user, today),
+        )
+        return cls.from_data(today, window, total_journals, streak['current_streak'])
+
+    @classmethod
+    def from_data(cls, today, window, total_journals, day_streak):
+        """
+        Derive every widget from the fetched rows.
+
+        Args:
+            today: Reference date.
+            window: Mood entries of the last 7 days, oldest first.
+            total_journals: Number of journals the user has written.
+            day_streak: Current streak in days.
+
+        Returns:
+            DashboardSnapshot: The snapshot.
+        """
+        recent_moods = window[::-1][:RECENT_MOOD_LIMIT]
+
+        # Calculate weekly goal (percentage of days this week with mood entries).
+        # The window already holds this week's entries, so no summary query is needed
+        days_this_week = today.weekday() + 1  # Monday = 0, so +1 for days passed
+        week_start = today - datetime.timedelta(days=today.weekday())
+        this_week = [entry for entry in window if entry.date >= week_start]
+        mood_days_this_week = len({entry.date for entry in this_week})
+        weekly_goal = round((mood_days_this_week / max(days_this_week, 1)) * 100)
+
+        return cls(
+            recent_moods=recent_moods,
+            chart_dates=json.dumps([entry.date.strftime('%Y-%m-%d') for entry in window]),
+            chart_intensities=json.dumps([entry.intensity for entry in window]),
+            chart_moods=json.dumps([entry.get_mood_display() for entry in window]),
+            entries_this_week=len(this_week),
+            total_journals=total_journals,
+            day_streak=day_streak,
+            weekly_goal=weekly_goal,
+        )
+
+    @classmethod
+    def for_user(cls, user, today=None):
+        """
+        Return the cached snapshot for a user, building it on a cache miss.
+
+        Args:
+            user: User object to fetch the snapshot for.
+            today: Optional reference date, defaults to the current date.
+
+        Returns:
+            DashboardSnapshot: The cached or freshly built snapshot.
+        """
+        today = today or timezone.now().date()
+        return tiered_cache.get_or_set(
+            cache_key(user.pk, today),
+            lambda: cls.build(user, today),
+            tags=[user_tag(user.pk, MOODS), user_tag(user.pk, JOURNALS)],
+            timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300),
+        )
+
+    @classmethod
+    async def afor_user(cls, user, today=None):
+        """
+        Async version of for_user for async views.
+
+        Args:
+            user: User object to fetch the snapshot for.
+            today: Optional reference date, defaults to the current date.
+
+        Returns:
+            DashboardSnapshot: The cached or freshly built snapshot.
+        """
+        today = today or timezone.now().date()
+        return await tiered_cache.aget_or_set(
+            cache_key(user.pk, today),
+            lambda: cls.abuild(user, today),
+            tags=[user_tag(user.pk, MOODS), user_tag(user.pk, JOURNALS)],
+            timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300),
+        )
+
+    def as_context(self):
+        """
+        Return the snapshot as dashboard template context.
+
+        Returns:
+            dict: Template variables for the dashboard page.
+        """
+        return {
+            'recent_moods': self.recent_moods,
+            'chart_dates': self.chart_dates,
+            'chart_intensities': self.chart_intensities,
+            'chart_moods': self.chart_moods,
+            'entries_this_week': self.entries_this_week,
+            'total_journals': self.total_journals,
+            'day_streak': self.day_streak,
+            'weekly_goal': self.weekly_goal,
+        }
+
+
+def _window(user, today):
+    """
+    Return the user's mood entries of the last 7 days, oldest first.
+
+    Args:
+        user: User object.
+        today: Last day of the window.
+
+    Returns:
+        QuerySet: The window's entries.
+    """
+    week_ago = today - datetime.timedelta(days=7)
+    return MoodEntry.objects.filter(
+        user=user,
+        date__gte=week_ago,
+        date__lte=today
+    ).order_by('date', 'time')
+
+
+def cache_key(user_id, today):
+    """
+    Build the cache key for a user's dashboard snapshot on a given day.
+
+    Including the date means streak and window figures roll over at midnight
+    without an explicit invalidation.
+
+    Args:
+        user_id: Primary key of the user.
+        today: Date the snapshot was computed for.
+
+    Returns:
+        str: Cache key.
+    """
+    return f'dashboard:{user_id}:{today.isoformat()}'
+
@@ -0,0 +1,232 @@
+"""
+Server-side downsampling of mood history for charts.
+
+A chart only has a few hundred pixels across, so sending one point per
+mood entry for a year or more of history wastes bandwidth and rendering
+time. History is returned either as per-entry points reduced with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of the
+series, or as day, week or month buckets read from the daily rollups.
+Either way the response holds at most ``max_points`` points.
+"""
+import datetime
+
+import numpy as np
+
+from .models import MoodEntry, DailyMoodRollup
+from . import analytics
+
+RESOLUTIONS = ('auto', 'entry', 'day', 'week', 'month')
+
+# Points returned when the client does not ask for a specific number
+DEFAULT_MAX_POINTS = 366
+# Largest number of points a client may ask for
+MAX_POINTS_LIMIT = 2000
+
+MOOD_DISPLAY_NAMES = dict(MoodEntry.MOOD_CHOICES)
+
+
+def lttb(x, y, threshold):
+    """
+    Pick the points of a series that best preserve its shape.
+
+    Largest-Triangle-Three-Buckets keeps the first and last points and, for
+    each of ``threshold - 2`` equal buckets in between, the point forming
+    the largest triangle with the previously kept point and the average of
+    the next bucket.
+
+    Args:
+        x: Ascending x values.
+        y: y values.
+        threshold: Number of points to keep.
+
+    Returns:
+        ndarray: Indices of the kept points, ascending.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(max(int((bucket + 2) * every) + 1, end + 1), n)
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def choose_resolution(start_date, end_date, total_entries, max_points):
+    """
+    Pick the finest resolution whose point count fits within max_points.
+
+    Args:
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        total_entries: Number of entries in the range.
+        max_points: Largest number of points wanted.
+
+    Returns:
+        str: 'entry', 'day', 'week' or 'month'.
+    """
+    days = (end_date - start_date).days + 1
+    if total_entries <= max_points:
+        return 'entry'
+    if days <= max_points:
+        return 'day'
+    if days / 7 <= max_points:
+        return 'week'
+    return 'month'
+
+
+def bucket_start(date, resolution):
+    """
+    Return the first day of the bucket a date falls in.
+
+    Args:
+        date: Calendar date.
+        resolution: 'day', 'week' (starting Monday) or 'month'.
+
+    Returns:
+        date: First day of the bucket.
+    """
+    if resolution == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if resolution == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def entry_points(user, start_date, end_date, max_points):
+    """
+    Build one point per mood entry, reduced with LTTB if there are too many.
+
+    Args:
+        user: User object (or primary key).
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        max_points: Largest number of points to return.
+
+    Returns:
+        list: Point dicts, oldest first.
+    """
+    frame = analytics.load_entries(user, start_date, end_date)
+    if len(frame) > max_points:
+        seconds = frame['timestamp'].to_numpy().astype('datetime64[s]').astype('int64')
+        frame = frame.iloc[lttb(seconds, frame['intensity'].to_numpy(), max_points)]
+
+    points = []
+    for timestamp, mood, intensity in zip(frame['timestamp'], frame['mood'], frame['intensity'].tolist()):
+        points.append({
+            'date': timestamp.strftime('%Y-%m-%d'),
+            'time': timestamp.strftime('%H:%M'),
+            'entries': 1,
+            'average_mood': float(intensity),
+            'min_intensity': intensity,
+            'max_intensity': intensity,
+            'mood': mood,
+            'mood_display': MOOD_DISPLAY_NAMES.get(mood, mood),
+        })
+    return points
+
+
+def bucket_points(user, start_date, end_date, resolution):
+    """
+    Build one point per day, week or month from the daily rollups.
+
+    Args:
+        user: User object (or primary key).
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        resolution: 'day', 'week' or 'month'.
+
+    Returns:
+        list: Point dicts for buckets with at least one entry, oldest first.
+    """
+    rollups = DailyMoodRollup.objects.filter(
+        user=user, date__gte=start_date, date__lte=end_date
+    ).order_by('date').values_list('date', 'entry_count', 'intensity_sum', 'intensity_min', 'intensity_max', 'mood_counts')
+
+    buckets = {}
+    for date, count, total, low, high, mood_counts in rollups:
+        bucket = buckets.setdefault(bucket_start(date, resolution), {
+            'entries': 0, 'sum': 0, 'min': low, 'max': high, 'moods': {},
+        })
+        bucket['entries'] += count
+        bucket['sum'] += total
+        bucket['min'] = min(bucket['min'], low)
+        bucket['max'] = max(bucket['max'], high)
+        for mood, mood_count in mood_counts.items():
+            bucket['moods'][mood] = bucket['moods'].get(mood, 0) + mood_count
+
+    points = []
+    for date, bucket in buckets.items():
+        mood = max(bucket['moods'], key=bucket['moods'].get) if bucket['moods'] else None
+        points.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'time': None,
+            'entries': bucket['entries'],
+            'average_mood': round(bucket['sum'] / bucket['entries'], 2),
+            'min_intensity': bucket['min'],
+            'max_intensity': bucket['max'],
+            'mood': mood,
+            'mood_display': MOOD_DISPLAY_NAMES.get(mood, mood),
+        })
+    return points
+
+
+def history_points(user, start_date, end_date, resolution='auto', max_points=DEFAULT_MAX_POINTS, total_entries=None):
+    """
+    Return a user's mood history as at most max_points chart points.
+
+    Args:
+        user: User object (or primary key).
+        start_date: First day of the range.
+        end_date: Last day of the range.
+        resolution: One of RESOLUTIONS; 'auto' picks the finest that fits.
+        max_points: Largest number of points to return.
+        total_entries: Number of entries in the range, if already known;
+            only needed for 'auto'.
+
+    Returns:
+        tuple: (resolution used, list of point dicts with date, time,
+            entries, average_mood, min_intensity, max_intensity, mood and
+            mood_display).
+
+    Raises:
+        ValueError: If the resolution is not supported.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'Unsupported resolution: {resolution}')
+
+    if resolution == 'auto':
+        if total_entries is None:
+            total_entries = sum(DailyMoodRollup.objects.filter(
+                user=user, date__gte=start_date, date__lte=end_date
+            ).values_list('entry_count', flat=True))
+        resolution = choose_resolution(start_date, end_date, total_entries, max_points)
+
+    if resolution == 'entry':
+        return resolution, entry_points(user, start_date, end_date, max_points)
+
+    points = bucket_points(user, start_date, end_date, resolution)
+    if len(points) > max_points:
+        # Only reachable with an explicit resolution finer than the range allows
+        keep = lttb(np.arange(len(points)), [point['average_mood'] for point in points], max_points)
+        points = [points[index] for index in keep]
+    return resolution, points
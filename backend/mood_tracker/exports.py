@@ -0,0 +1,259 @@
+"""
+Streaming export of a user's mood and journal data.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+straight into a StreamingHttpResponse, so memory use stays flat no matter how
+many entries a user has. Supported formats are CSV and NDJSON, for mood
+entries, journals, or both merged into one time-ordered stream. The same
+generators write the files of queued exports (see jobs).
+"""
+import csv
+import datetime
+import heapq
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import MoodEntry, Journal
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_DATA_TYPES = ('mood', 'journal', 'all')
+
+MOOD_CSV_HEADER = ['Date', 'Time', 'Mood', 'Intensity', 'Notes']
+JOURNAL_CSV_HEADER = ['Date', 'Title', 'Content']
+COMBINED_CSV_HEADER = ['Type', 'Date', 'Time', 'Mood', 'Intensity', 'Title', 'Text']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+FILENAME_PREFIXES = {
+    'mood': 'mood_data',
+    'journal': 'journal_data',
+    'all': 'mindmate_data',
+}
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value instead of storing it.
+
+    Lets csv.writer format one row at a time for a streaming response.
+    """
+
+    def write(self, value):
+        """
+        Return the written value unchanged.
+
+        Args:
+            value: Formatted text written by csv.writer.
+
+        Returns:
+            str: The same text.
+        """
+        return value
+
+
+def chunk_size():
+    """
+    Return the number of rows fetched from the database per round-trip.
+
+    Returns:
+        int: Configured EXPORT_CHUNK_SIZE, defaulting to 2000.
+    """
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_mood_records(user):
+    """
+    Yield a user's mood entries as plain dicts, oldest first.
+
+    Args:
+        user: User object (or primary key) to export.
+
+    Yields:
+        dict: date, time, mood (display name), intensity and notes.
+    """
+    mood_display_names = dict(MoodEntry.MOOD_CHOICES)
+    rows = MoodEntry.objects.filter(user=user).order_by('date', 'time').values_list(
+        'date', 'time', 'mood', 'intensity', 'notes'
+    ).iterator(chunk_size=chunk_size())
+    for date, time, mood, intensity, notes in rows:
+        yield {
+            'date': date,
+            'time': time,
+            'mood': mood_display_names.get(mood, mood),
+            'intensity': intensity,
+            'notes': notes or '',
+        }
+
+
+def iter_journal_records(user):
+    """
+    Yield a user's journal entries as plain dicts, oldest first.
+
+    Args:
+        user: User object (or primary key) to export.
+
+    Yields:
+        dict: created_at, title and content.
+    """
+    rows = Journal.objects.filter(user=user).order_by('created_at').values_list(
+        'created_at', 'title', 'content'
+    ).iterator(chunk_size=chunk_size())
+    for created_at, title, content in rows:
+        yield {
+            'created_at': created_at,
+            'title': title or '',
+            'content': content,
+        }
+
+
+def iter_combined_records(user):
+    """
+    Yield mood and journal records merged into one time-ordered stream.
+
+    Both underlying iterators are already sorted, so they are merged lazily
+    without buffering either data set.
+
+    Args:
+        user: User object (or primary key) to export.
+
+    Yields:
+        dict: Records with a type key of 'mood' or 'journal'.
+    """
+    def moods():
+        for record in iter_mood_records(user):
+            moment = datetime.datetime.combine(record['date'], record['time'])
+            yield moment, {'type': 'mood', **record}
+
+    def journals():
+        current_tz = timezone.get_current_timezone()
+        for record in iter_journal_records(user):
+            moment = timezone.localtime(record['created_at'], current_tz).replace(tzinfo=None)
+            yield moment, {
+                'type': 'journal',
+                'date': moment.date(),
+                'time': moment.time(),
+                **record,
+            }
+
+    for _, record in heapq.merge(moods(), journals(), key=lambda item: item[0]):
+        yield record
+
+
+def iter_csv(data_type, user):
+    """
+    Yield CSV lines for an export.
+
+    Args:
+        data_type: One of EXPORT_DATA_TYPES.
+        user: User object (or primary key) to export.
+
+    Yields:
+        str: One formatted CSV line per record, after a header line.
+    """
+    writer = csv.writer(Echo())
+
+    if data_type == 'mood':
+        yield writer.writerow(MOOD_CSV_HEADER)
+        for record in iter_mood_records(user):
+            yield writer.writerow([
+                record['date'], record['time'], record['mood'], record['intensity'], record['notes']
+            ])
+    elif data_type == 'journal':
+        yield writer.writerow(JOURNAL_CSV_HEADER)
+        for record in iter_journal_records(user):
+            yield writer.writerow([
+                record['created_at'].date(), record['title'], record['content']
+            ])
+    else:
+        yield writer.writerow(COMBINED_CSV_HEADER)
+        for record in iter_combined_records(user):
+            if record['type'] == 'mood':
+                yield writer.writerow([
+                    'mood', record['date'], record['time'], record['mood'], record['intensity'], '', record['notes']
+                ])
+            else:
+                yield writer.writerow([
+                    'journal', record['date'], record['time'], '', '', record['title'], record['content']
+                ])
+
+
+def iter_ndjson(data_type, user):
+    """
+    Yield newline-delimited JSON lines for an export.
+
+    Args:
+        data_type: One of EXPORT_DATA_TYPES.
+        user: User object (or primary key) to export.
+
+    Yields:
+        str: One JSON object per line.
+    """
+    if data_type == 'mood':
+        records = iter_mood_records(user)
+    elif data_type == 'journal':
+        records = iter_journal_records(user)
+    else:
+        records = iter_combined_records(user)
+
+    for record in records:
+        yield json.dumps(record, default=str) + '\n'
+
+
+def validate(data_type, export_format):
+    """
+    Check that an export's data type and format are supported.
+
+    Args:
+        data_type: One of EXPORT_DATA_TYPES.
+        export_format: One of EXPORT_FORMATS.
+
+    Raises:
+        ValueError: If data_type or export_format is not supported.
+    """
+    if data_type not in EXPORT_DATA_TYPES:
+        raise ValueError(f'Unsupported export data type: {data_type}')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+
+def filename(data_type, export_format):
+    """
+    Return the download filename for an export made today.
+
+    Args:
+        data_type: One of EXPORT_DATA_TYPES.
+        export_format: One of EXPORT_FORMATS.
+
+    Returns:
+        str: For example mood_data_20240101.csv.
+    """
+    return f'{FILENAME_PREFIXES[data_type]}_{timezone.now().strftime("%Y%m%d")}.{export_format}'
+
+
+def export_response(user, data_type='mood', export_format='csv'):
+    """
+    Build a streaming download response for a user's data.
+
+    Args:
+        user: User object (or primary key) to export.
+        data_type: One of EXPORT_DATA_TYPES.
+        export_format: One of EXPORT_FORMATS.
+
+    Returns:
+        StreamingHttpResponse: The streaming file download.
+
+    Raises:
+        ValueError: If data_type or export_format is not supported.
+    """
+    validate(data_type, export_format)
+
+    stream = iter_csv if export_format == 'csv' else iter_ndjson
+    response = StreamingHttpResponse(stream(data_type, user), content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename(data_type, export_format)}"'
+    return response
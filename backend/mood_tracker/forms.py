@@ -1,5 +1,7 @@
 from django import forms
+from django.db import transaction
 from .models import MoodEntry, Journal, Reminder, User
+from . import images
 
 class SignUpForm(forms.Form):
     """
@@ -97,7 +99,7 @@ class ReminderForm(forms.ModelForm):
     
     class Meta:
         model = Reminder
-        fields = ['time', 'days', 'is_active']
+        fields = ['time', 'is_active']
         widgets = {
             'time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
@@ -105,13 +107,26 @@ class ReminderForm(forms.ModelForm):
     
     def clean_days(self):
         """
-        Convert selected days list to comma-separated string.
+        Convert selected days to weekday numbers.
         
         Returns:
-            str: Comma-separated string of selected day numbers.
+            list: Selected weekday numbers (Monday is 0).
         """
         days = self.cleaned_data.get('days')
-        return ','.join(days)
+        return [int(day) for day in days]
+    
+    def save(self, commit=True):
+        """
+        Store the selected days on the reminder's weekday bitmask.
+        
+        Args:
+            commit: Whether to save the reminder to the database.
+            
+        Returns:
+            Reminder: The reminder instance.
+        """
+        self.instance.weekdays = self.cleaned_data['days']
+        return super().save(commit=commit)
     
     def __init__(self, *args, **kwargs):
         """
@@ -122,15 +137,17 @@ class ReminderForm(forms.ModelForm):
             **kwargs: Arbitrary keyword arguments.
         """
         super().__init__(*args, **kwargs)
-        if self.instance.pk and self.instance.days:
-            self.initial['days'] = self.instance.days.split(',')
+        if self.instance.pk and self.instance.days_mask:
+            self.initial['days'] = [str(day) for day in self.instance.weekdays]
 
 class UserProfileForm(forms.ModelForm):
     """
     Form for updating user profile information.
     
     Allows users to update their username, email, and profile picture
-    with validation for image file size and type.
+    with validation for image file size and type. A new picture is decoded
+    while the form is validated and saved as resized, metadata-free
+    variants (see images) instead of the uploaded file.
     """
     class Meta:
         model = User
@@ -152,9 +169,33 @@ class UserProfileForm(forms.ModelForm):
             ValidationError: If file is too large or not an image.
         """
         profile_picture = self.cleaned_data.get('profile_picture')
-        if profile_picture:
+        self.processed_picture = None
+        if profile_picture and 'profile_picture' in self.changed_data:
             if profile_picture.size > 5 * 1024 * 1024:  # 5MB limit
                 raise forms.ValidationError('Image file too large ( > 5MB )')
             if not profile_picture.content_type.startswith('image/'):
                 raise forms.ValidationError('File is not an image')
-        return profile_picture
\ No newline at end of file
+            try:
+                self.processed_picture = images.process(profile_picture)
+            except images.InvalidImage:
+                raise forms.ValidationError('File is not an image')
+        return profile_picture
+    
+    def save(self, commit=True):
+        """
+        Save the profile, storing a new picture as resized variants.
+        
+        Args:
+            commit: Whether to save the user to the database.
+            
+        Returns:
+            User: The updated user.
+        """
+        with transaction.atomic():
+            user = super().save(commit=False)
+            if getattr(self, 'processed_picture', None) is not None:
+                # Old files are deleted when this transaction commits
+                images.save(user, self.processed_picture)
+            if commit:
+                user.save()
+        return user
\ No newline at end of file
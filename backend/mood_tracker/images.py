@@ -0,0 +1,253 @@
+"""
+Profile picture processing.
+
+Uploads are decoded once with Pillow, turned upright from their EXIF
+orientation and capped at PROFILE_PICTURE_MAX_DIMENSION. Square WebP and
+JPEG variants are then written for each of PROFILE_PICTURE_SIZES. Pillow
+only writes metadata it is given, so EXIF (including GPS position), XMP and
+ICC data never reach storage.
+
+Variants are named after a hash of the uploaded bytes, for example
+``profile_pictures/3f2a.../128.webp``, so their URLs change whenever the
+picture does and can be cached indefinitely. The capped, metadata-free
+original is stored in ``User.profile_picture`` only when
+PROFILE_PICTURE_KEEP_ORIGINAL is on.
+"""
+import hashlib
+import io
+import warnings
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import User
+
+# Directory the variants are stored under, within MEDIA_ROOT
+UPLOAD_DIR = 'profile_pictures'
+
+VARIANT_FORMATS = ('webp', 'jpeg')
+
+# Background alpha is flattened onto for JPEG, which has no transparency
+JPEG_BACKGROUND = (255, 255, 255)
+
+
+class InvalidImage(ValueError):
+    """
+    Raised when an upload cannot be decoded as an image.
+    """
+
+
+def sizes():
+    """
+    Return the square variant sizes, smallest first.
+
+    Returns:
+        list: Edge lengths in pixels, from PROFILE_PICTURE_SIZES.
+    """
+    return sorted(getattr(settings, 'PROFILE_PICTURE_SIZES', (48, 128, 256)))
+
+
+def variant_quality(fmt):
+    """
+    Return the encoder quality for a variant format.
+
+    Args:
+        fmt: One of VARIANT_FORMATS.
+
+    Returns:
+        int: Quality from PROFILE_PICTURE_QUALITY.
+    """
+    return getattr(settings, 'PROFILE_PICTURE_QUALITY', {}).get(fmt, 80)
+
+
+def variant_name(key, size, fmt):
+    """
+    Return the storage name of one variant.
+
+    Args:
+        key: Content hash of the picture.
+        size: Edge length in pixels.
+        fmt: One of VARIANT_FORMATS.
+
+    Returns:
+        str: Storage path relative to MEDIA_ROOT.
+    """
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{UPLOAD_DIR}/{key}/{size}.{extension}'
+
+
+class ProcessedPicture:
+    """
+    Encoded variants of one upload, ready to be written to storage.
+
+    Attributes:
+        key: Content hash the variants are named after.
+        variants: dict mapping (size, format) to encoded bytes.
+        original: Capped, metadata-free original as bytes, or None.
+        original_format: Lower-case format of the original.
+    """
+
+    def __init__(self, key, variants, original=None, original_format=None):
+        self.key = key
+        self.variants = variants
+        self.original = original
+        self.original_format = original_format
+
+
+def process(upload, keep_original=None):
+    """
+    Decode an upload and encode its variants.
+
+    Args:
+        upload: File-like object holding the uploaded image.
+        keep_original: Whether to encode the capped original too,
+            defaulting to PROFILE_PICTURE_KEEP_ORIGINAL.
+
+    Returns:
+        ProcessedPicture: The encoded variants.
+
+    Raises:
+        InvalidImage: If the upload is not an image Pillow can decode, or
+            is large enough to be a decompression bomb.
+    """
+    if keep_original is None:
+        keep_original = getattr(settings, 'PROFILE_PICTURE_KEEP_ORIGINAL', False)
+    max_dimension = getattr(settings, 'PROFILE_PICTURE_MAX_DIMENSION', 1024)
+
+    upload.seek(0)
+    data = upload.read()
+    try:
+        with warnings.catch_warnings():
+            # Pillow only warns below twice its pixel limit; treat that as an attack too
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(io.BytesIO(data))
+            source_format = (image.format or 'png').lower()
+            # JPEG can decode at a fraction of full size, which is much cheaper for camera photos
+            image.draft('RGB', (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise InvalidImage(f'Not a valid image: {e}')
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    variants = {}
+    for size in sorted(sizes(), reverse=True):
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            variants[(size, fmt)] = encode(square, fmt)
+
+    original = None
+    original_format = None
+    if keep_original:
+        # Re-encoded without metadata; formats other than JPEG and WebP become PNG
+        original_format = source_format if source_format in ('jpeg', 'webp') else 'png'
+        original = encode(image, original_format, quality=95)
+
+    return ProcessedPicture(hashlib.sha256(data).hexdigest()[:24], variants, original, original_format)
+
+
+def encode(image, fmt, quality=None):
+    """
+    Encode an image without any metadata.
+
+    Args:
+        image: RGB or RGBA PIL image.
+        fmt: 'webp', 'jpeg' or 'png'.
+        quality: Optional encoder quality, defaulting to the format's setting.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    output = io.BytesIO()
+    if fmt == 'jpeg':
+        if image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, JPEG_BACKGROUND)
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(output, 'JPEG', quality=quality or variant_quality(fmt), optimize=True, progressive=True)
+    elif fmt == 'webp':
+        image.save(output, 'WEBP', quality=quality or variant_quality(fmt), method=4)
+    else:
+        image.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def save(user, picture):
+    """
+    Write a processed picture to storage and point the user at it.
+
+    The user is modified but not saved. The previous variants (unless
+    another user uploaded the same picture) and original are deleted once
+    the current transaction commits, so callers should save the user in the
+    same transaction; a failed save then leaves the old files in place.
+
+    Args:
+        user: User whose picture is replaced.
+        picture: ProcessedPicture from process().
+    """
+    # Read from the database: a form has already put the raw upload on the instance
+    previous_original, previous_key = User.objects.filter(pk=user.pk).values_list(
+        'profile_picture', 'profile_picture_key'
+    ).first() or (None, '')
+
+    for (size, fmt), data in picture.variants.items():
+        name = variant_name(picture.key, size, fmt)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+
+    user.profile_picture_key = picture.key
+    if picture.original is not None:
+        extension = 'jpg' if picture.original_format == 'jpeg' else picture.original_format
+        user.profile_picture.save(f'{picture.key}.{extension}', ContentFile(picture.original), save=False)
+    else:
+        user.profile_picture = None
+
+    if previous_key and previous_key != picture.key:
+        transaction.on_commit(lambda: delete_variants(previous_key, exclude_user=user))
+    if previous_original and previous_original != (user.profile_picture.name if user.profile_picture else None):
+        transaction.on_commit(lambda: default_storage.delete(previous_original))
+
+
+def delete_variants(key, exclude_user=None):
+    """
+    Delete a picture's variants if no other user refers to them.
+
+    Args:
+        key: Content hash of the picture.
+        exclude_user: Optional user whose reference is ignored.
+
+    Returns:
+        bool: True if the files were deleted.
+    """
+    others = User.objects.filter(profile_picture_key=key)
+    if exclude_user is not None:
+        others = others.exclude(pk=exclude_user.pk)
+    if others.exists():
+        return False
+    for size in sizes():
+        for fmt in VARIANT_FORMATS:
+            default_storage.delete(variant_name(key, size, fmt))
+    return True
+
+
+def variant_urls(key):
+    """
+    Return the URL of every variant of a picture.
+
+    Args:
+        key: Content hash of the picture.
+
+    Returns:
+        dict: Format to a dict of size (as a string, for template lookups)
+            to URL, e.g. ``urls['webp']['128']``.
+    """
+    return {
+        fmt: {str(size): default_storage.url(variant_name(key, size, fmt)) for size in sizes()}
+        for fmt in VARIANT_FORMATS
+    }
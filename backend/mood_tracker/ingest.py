@@ -0,0 +1,374 @@
+"""
+Bulk ingestion of mood entries from offline clients and data imports.
+
+Uploads are parsed from JSON, NDJSON or CSV in the shapes the export
+produces, validated column by column, deduplicated on a client-supplied
+idempotency key and written with ``bulk_create``. Because bulk inserts
+bypass model signals, the daily rollups, streak, achievements, search
+index, cached user data and data version are then updated once for the
+whole batch instead of once per row.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import MoodEntry
+from mindmate.cache import tiered_cache, user_tag, MOODS
+
+from . import rollups, streaks, achievements, search, versioning
+
+INGEST_FORMATS = ('json', 'ndjson', 'csv')
+
+CONTENT_TYPE_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'text/csv': 'csv',
+}
+
+CLIENT_KEY_MAX_LENGTH = MoodEntry._meta.get_field('client_key').max_length
+
+# Largest number of client keys looked up per query
+KEY_LOOKUP_CHUNK = 500
+
+
+class IngestError(ValueError):
+    """
+    Raised when an upload cannot be parsed at all.
+    """
+
+
+def max_entries():
+    """
+    Return the largest number of entries accepted in one upload.
+
+    Returns:
+        int: Configured BULK_MAX_ENTRIES, defaulting to 10000.
+    """
+    return getattr(settings, 'BULK_MAX_ENTRIES', 10000)
+
+
+def normalize_key(name):
+    """
+    Map a column header or JSON key onto a record field name.
+
+    Args:
+        name: Header such as "Client Key" or "client_key".
+
+    Returns:
+        str: Lower-case, underscore separated field name.
+    """
+    return str(name).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def normalize_record(record):
+    """
+    Normalize one raw record's keys.
+
+    Combined exports label notes as "Text", so that column is mapped back
+    to notes for mood rows.
+
+    Args:
+        record: dict parsed from the upload.
+
+    Returns:
+        dict: Record with normalized keys.
+    """
+    record = {normalize_key(key): value for key, value in record.items()}
+    if 'notes' not in record and 'text' in record:
+        record['notes'] = record.pop('text')
+    return record
+
+
+def iter_records(lines, ingest_format):
+    """
+    Lazily parse CSV or NDJSON lines into raw record dicts.
+
+    Records typed as anything other than mood (journal rows of a combined
+    export) are dropped.
+
+    Args:
+        lines: Iterable of text lines, such as an open file.
+        ingest_format: 'csv' or 'ndjson'.
+
+    Yields:
+        dict: Raw records with normalized keys.
+
+    Raises:
+        IngestError: If a line cannot be parsed.
+    """
+    try:
+        if ingest_format == 'csv':
+            records = csv.DictReader(lines)
+        else:
+            records = (json.loads(line) for line in lines if line.strip())
+        for record in records:
+            if not isinstance(record, dict):
+                raise IngestError('Upload must contain entry objects')
+            record = normalize_record(record)
+            if record.get('type') in ('mood', '', None):
+                yield record
+    except (csv.Error, ValueError) as e:
+        raise IngestError(f'Could not parse {ingest_format} upload: {e}') from e
+
+
+def parse_records(data, ingest_format):
+    """
+    Parse a whole upload into raw record dicts.
+
+    JSON uploads may be a list of objects or an object with an ``entries``
+    list; CSV and NDJSON are parsed with iter_records.
+
+    Args:
+        data: Upload body as str or bytes, or an already decoded JSON value.
+        ingest_format: One of INGEST_FORMATS.
+
+    Returns:
+        list: Raw record dicts with normalized keys.
+
+    Raises:
+        IngestError: If the body cannot be parsed in the given format.
+    """
+    if ingest_format not in INGEST_FORMATS:
+        raise IngestError(f'Unsupported format: {ingest_format}')
+    if isinstance(data, bytes):
+        try:
+            data = data.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            raise IngestError('Upload is not valid UTF-8') from e
+
+    if ingest_format != 'json':
+        return list(iter_records(io.StringIO(data), ingest_format))
+
+    try:
+        records = json.loads(data) if isinstance(data, str) else data
+    except ValueError as e:
+        raise IngestError(f'Could not parse json upload: {e}') from e
+    if isinstance(records, dict):
+        records = records.get('entries')
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise IngestError('Upload must be a list of entry objects')
+
+    records = [normalize_record(record) for record in records]
+    return [record for record in records if record.get('type') in ('mood', '', None)]
+
+
+def content_key(record):
+    """
+    Derive an idempotency key from a record's content.
+
+    Used by imports of exported files, which carry no client keys, so that
+    importing the same file twice does not duplicate entries.
+
+    Args:
+        record: Raw record dict.
+
+    Returns:
+        str: Hex digest identifying the record's values.
+    """
+    values = [str(record.get(field) or '') for field in ('date', 'time', 'mood', 'intensity', 'notes')]
+    return 'sha1:' + hashlib.sha1('\x1f'.join(values).encode()).hexdigest()
+
+
+def _mood_lookup():
+    """
+    Map accepted mood spellings (keys and display names) to mood keys.
+
+    Returns:
+        dict: Lower-case spelling to mood key.
+    """
+    lookup = {}
+    for key, label in MoodEntry.MOOD_CHOICES:
+        lookup[key] = key
+        lookup[label.lower()] = key
+    return lookup
+
+
+def _parser(convert):
+    """
+    Memoize a column converter that returns None for unparseable values.
+
+    Upload columns repeat heavily (many entries share a day, and moods come
+    from a short list), so each distinct value is only parsed once.
+
+    Args:
+        convert: Function converting a string.
+
+    Returns:
+        callable: Memoized, exception-free converter.
+    """
+    @lru_cache(maxsize=4096)
+    def parse(value):
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            return None
+    return parse
+
+
+def validate_records(records):
+    """
+    Validate and convert raw records column by column.
+
+    Each column is converted in one pass over the batch with memoized
+    parsers, rather than running a serializer per row.
+
+    Args:
+        records: Raw record dicts from parse_records.
+
+    Returns:
+        tuple: (list of cleaned dicts, or None for invalid rows; list of
+            {'index', 'errors'} dicts describing the invalid rows).
+    """
+    moods = _mood_lookup()
+    parse_date = _parser(lambda value: datetime.date.fromisoformat(value.strip()))
+    parse_time = _parser(lambda value: datetime.time.fromisoformat(value.strip()))
+    parse_intensity = _parser(lambda value: int(value.strip()))
+
+    columns = {
+        'date': [parse_date(str(record.get('date') or '')) for record in records],
+        'time': [parse_time(str(record.get('time') or '')) for record in records],
+        'mood': [moods.get(str(record.get('mood') or '').strip().lower()) for record in records],
+        'intensity': [parse_intensity(str(record.get('intensity'))) for record in records],
+    }
+    notes = [record.get('notes') or None for record in records]
+    keys = [record.get('client_key') or None for record in records]
+
+    cleaned = []
+    errors = []
+    for index, record in enumerate(records):
+        row_errors = {}
+        for field, values in columns.items():
+            if values[index] is None:
+                row_errors[field] = 'This field is missing or invalid.'
+        intensity = columns['intensity'][index]
+        if intensity is not None and not 1 <= intensity <= 10:
+            row_errors['intensity'] = 'Ensure this value is between 1 and 10.'
+        if notes[index] is not None and not isinstance(notes[index], str):
+            row_errors['notes'] = 'Not a valid string.'
+        key = keys[index]
+        if key is not None and (not isinstance(key, str) or len(key) > CLIENT_KEY_MAX_LENGTH):
+            row_errors['client_key'] = f'Must be a string of at most {CLIENT_KEY_MAX_LENGTH} characters.'
+
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+            cleaned.append(None)
+        else:
+            cleaned.append({
+                'date': columns['date'][index],
+                'time': columns['time'][index],
+                'mood': columns['mood'][index],
+                'intensity': intensity,
+                'notes': notes[index],
+                'client_key': key,
+            })
+    return cleaned, errors
+
+
+def existing_keys(user, keys):
+    """
+    Look up which client keys a user has already uploaded.
+
+    Args:
+        user: User object.
+        keys: Iterable of client keys.
+
+    Returns:
+        dict: Client key to the primary key of the existing entry.
+    """
+    keys = list(keys)
+    found = {}
+    for start in range(0, len(keys), KEY_LOOKUP_CHUNK):
+        found.update(
+            MoodEntry.objects.filter(user=user, client_key__in=keys[start:start + KEY_LOOKUP_CHUNK])
+            .values_list('client_key', 'pk')
+        )
+    return found
+
+
+def apply_derived_updates(user_id, entries):
+    """
+    Update everything signals would have maintained for a batch of new entries.
+
+    Args:
+        user_id: Primary key of the entries' user.
+        entries: Newly inserted MoodEntry instances.
+    """
+    rollups.add_entries(user_id, [(entry.date, entry.mood, entry.intensity) for entry in entries])
+    # One rebuild from the rollup dates covers any mix of new and backdated days
+    streaks.rebuild(user_id)
+    achievements.evaluate(user_id, 'mood')
+    search.index_mood_entries(entries)
+    tiered_cache.invalidate_tags_on_commit(user_tag(user_id, MOODS))
+    versioning.bump(user_id)
+
+
+def ingest_mood_entries(user, records, skip_invalid=False, batch_size=1000, derive_keys=False):
+    """
+    Validate, deduplicate and insert a batch of mood entries for a user.
+
+    Without ``skip_invalid`` the batch is all-or-nothing: any invalid row
+    means nothing is written. Entries whose client key was already used,
+    earlier in the batch or in a previous upload, are reported as
+    duplicates instead of being inserted again.
+
+    Args:
+        user: User object the entries belong to.
+        records: Raw record dicts from parse_records.
+        skip_invalid: Whether to insert the valid rows when some are invalid.
+        batch_size: Rows per INSERT statement.
+        derive_keys: Whether rows without a client key get one derived from
+            their content, making re-imports of the same file idempotent.
+
+    Returns:
+        dict: ``created`` and ``duplicates`` counts, ``errors`` for invalid
+            rows, and ``entries`` mapping each keyed row's client key to the
+            id of its (new or existing) entry.
+    """
+    cleaned, errors = validate_records(records)
+    summary = {'created': 0, 'duplicates': 0, 'errors': errors, 'entries': []}
+    if errors and not skip_invalid:
+        return summary
+
+    rows = [row for row in cleaned if row is not None]
+    if derive_keys:
+        for row, record in zip(cleaned, records):
+            if row is not None and row['client_key'] is None:
+                row['client_key'] = content_key(record)
+
+    # A concurrent upload can claim a key between the lookup and the insert;
+    # the unique constraint catches that and the batch is deduplicated again
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                known = existing_keys(user, {row['client_key'] for row in rows if row['client_key']})
+                seen = {}
+                new_entries = []
+                duplicates = 0
+                for row in rows:
+                    key = row['client_key']
+                    if key is not None and (key in known or key in seen):
+                        duplicates += 1
+                        continue
+                    entry = MoodEntry(user=user, **row)
+                    new_entries.append(entry)
+                    if key is not None:
+                        seen[key] = entry.pk
+
+                MoodEntry.objects.bulk_create(new_entries, batch_size=batch_size)
+                if new_entries:
+                    apply_derived_updates(user.pk, new_entries)
+            break
+        except IntegrityError:
+            if attempt:
+                raise
+
+    summary['created'] = len(new_entries)
+    summary['duplicates'] = duplicates
+    summary['entries'] = [{'client_key': key, 'id': str(pk)} for key, pk in {**known, **seen}.items()]
+    return summary
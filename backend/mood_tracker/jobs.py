@@ -0,0 +1,434 @@
+"""
+Database-backed queue for heavy per-user work.
+
+Views enqueue a Job and return at once; ``run_workers`` claims jobs in
+priority order from a pool of threads, runs the handler registered for the
+job's kind and stores its result on the row for the status endpoints to
+poll. Exports write their file to storage, so a large export is generated
+by a worker and downloaded in one request instead of being streamed from
+the database through a web worker.
+
+Claims are a conditional UPDATE from pending to running, so any number of
+worker processes can share the table. A job whose handler raises is retried
+with exponential backoff until it runs out of attempts, and jobs left
+running by a worker that died are requeued after JOB_STALE_AFTER seconds.
+Each kind can derive a dedup key from its user and parameters; while a job
+with that key is waiting or running, enqueueing the same work returns it.
+
+With JOBS_EAGER set (the default when DEBUG is on), enqueue runs the job
+in the calling thread, so development needs no worker process.
+"""
+import datetime
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, connection, models, transaction
+from django.utils import timezone
+
+from .models import Job
+from . import achievements, exports, rollups, streaks, versioning
+from mindmate.cache import tiered_cache, user_tag, ACHIEVEMENTS, MOODS
+
+logger = logging.getLogger(__name__)
+
+# Times a worker retries a claim that another worker won before giving up
+CLAIM_ATTEMPTS = 5
+
+
+class JobKind:
+    """
+    A registered kind of job: its handler and queueing defaults.
+    """
+
+    def __init__(self, name, handler, priority=0, max_attempts=3, dedup=None, user_enqueueable=False):
+        self.name = name
+        self.handler = handler
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.dedup = dedup
+        self.user_enqueueable = user_enqueueable
+
+
+KINDS = {}
+
+
+def register(name, priority=0, max_attempts=3, dedup=None, user_enqueueable=False):
+    """
+    Decorator that registers a function as the handler for a kind of job.
+
+    The handler is called with the claimed Job and returns a
+    JSON-serializable result.
+
+    Args:
+        name: Kind name stored on the job.
+        priority: Default priority; higher runs first.
+        max_attempts: Runs before the job is marked failed.
+        dedup: Optional callable (user_id, params) returning the dedup key.
+        user_enqueueable: Whether users may enqueue it through the API.
+
+    Returns:
+        function: Decorator returning the handler unchanged.
+    """
+    def decorator(handler):
+        KINDS[name] = JobKind(name, handler, priority, max_attempts, dedup, user_enqueueable)
+        return handler
+    return decorator
+
+
+def enqueue(kind, user=None, params=None, priority=None):
+    """
+    Queue a job, or return the matching job already waiting or running.
+
+    Args:
+        kind: Registered kind name.
+        user: Optional User object (or primary key) the job works for.
+        params: JSON-serializable handler parameters.
+        priority: Optional priority overriding the kind's default.
+
+    Returns:
+        tuple: (Job, created) where created is False for a duplicate.
+
+    Raises:
+        ValueError: If the kind is not registered.
+    """
+    spec = KINDS.get(kind)
+    if spec is None:
+        raise ValueError(f'Unknown job kind: {kind}')
+    user_id = getattr(user, 'pk', user)
+    params = params or {}
+    dedup_key = spec.dedup(user_id, params) if spec.dedup else None
+
+    while True:
+        if dedup_key:
+            existing = Job.objects.active().filter(dedup_key=dedup_key).first()
+            if existing is not None:
+                return existing, False
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    user_id=user_id,
+                    kind=kind,
+                    params=params,
+                    priority=spec.priority if priority is None else priority,
+                    max_attempts=spec.max_attempts,
+                    dedup_key=dedup_key,
+                )
+            break
+        except IntegrityError:
+            # Another request queued the same key between the check and the insert
+            continue
+
+    if getattr(settings, 'JOBS_EAGER', False):
+        job = claim('eager', job_id=job.pk) or job
+        if job.status == Job.RUNNING:
+            run(job)
+    return job, True
+
+
+def claim(worker_id, now=None, job_id=None):
+    """
+    Take the next ready job and mark it as running.
+
+    Args:
+        worker_id: Name recorded on the job as its owner.
+        now: Optional current time, defaults to now.
+        job_id: Optional primary key of a specific pending job to claim.
+
+    Returns:
+        Job: The claimed job, or None if no job is ready.
+    """
+    now = now or timezone.now()
+    for _ in range(CLAIM_ATTEMPTS):
+        if job_id is None:
+            candidate = Job.objects.ready(now).values_list('pk', flat=True).first()
+        else:
+            candidate = job_id
+        if candidate is None:
+            return None
+        claimed = Job.objects.filter(pk=candidate, status=Job.PENDING).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            started_at=now,
+            attempts=models.F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+        if job_id is not None:
+            return None
+    return None
+
+
+def backoff(attempts):
+    """
+    Return how long to wait before retrying a failed job.
+
+    Args:
+        attempts: Number of runs so far.
+
+    Returns:
+        datetime.timedelta: JOB_RETRY_DELAY doubled per earlier attempt,
+            capped at an hour.
+    """
+    base = getattr(settings, 'JOB_RETRY_DELAY', 30)
+    return datetime.timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def run(job):
+    """
+    Run a claimed job's handler and record the outcome.
+
+    Args:
+        job: Job in the running state.
+
+    Returns:
+        bool: True if the handler succeeded.
+    """
+    spec = KINDS.get(job.kind)
+    try:
+        if spec is None:
+            raise ValueError(f'Unknown job kind: {job.kind}')
+        result = spec.handler(job)
+    except Exception as e:
+        logger.exception('Job failed', extra={'job': str(job.pk), 'kind': job.kind, 'attempt': job.attempts})
+        job.error = f'{type(e).__name__}: {e}'
+        if spec is not None and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'run_after', 'finished_at'])
+        return False
+
+    job.status = Job.DONE
+    job.result = result
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'result_file', 'error', 'finished_at'])
+    return True
+
+
+def run_pending(worker_id='inline', limit=None):
+    """
+    Claim and run ready jobs until none are left.
+
+    Args:
+        worker_id: Name recorded on the claimed jobs.
+        limit: Optional maximum number of jobs to run.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker_id)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def requeue_stale(stale_after=None, now=None):
+    """
+    Return jobs left running by a worker that stopped to the queue.
+
+    A job that has used all of its attempts is marked failed instead, so
+    one that kills its worker (say, by running out of memory) is not
+    retried forever.
+
+    Args:
+        stale_after: Seconds after which a running job counts as abandoned,
+            defaulting to JOB_STALE_AFTER.
+        now: Optional current time, defaults to now.
+
+    Returns:
+        int: Number of jobs requeued.
+    """
+    now = now or timezone.now()
+    stale_after = stale_after or getattr(settings, 'JOB_STALE_AFTER', 3600)
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=now - datetime.timedelta(seconds=stale_after),
+    )
+    failed = stale.filter(attempts__gte=models.F('max_attempts')).update(
+        status=Job.FAILED,
+        locked_by='',
+        error='Abandoned by its worker on the last attempt',
+        finished_at=now,
+    )
+    if failed:
+        logger.warning('Failed abandoned jobs out of attempts', extra={'failed': failed})
+    return stale.filter(attempts__lt=models.F('max_attempts')).update(status=Job.PENDING, locked_by='', run_after=now)
+
+
+def purge_finished(max_age=None, now=None):
+    """
+    Delete finished jobs and their files once their results have expired.
+
+    Args:
+        max_age: Seconds a finished job is kept, defaulting to
+            JOB_RESULT_TTL.
+        now: Optional current time, defaults to now.
+
+    Returns:
+        int: Number of jobs deleted.
+    """
+    now = now or timezone.now()
+    max_age = max_age or getattr(settings, 'JOB_RESULT_TTL', 7 * 24 * 3600)
+    expired = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        finished_at__lt=now - datetime.timedelta(seconds=max_age),
+    )
+    for path in expired.exclude(result_file='').values_list('result_file', flat=True).iterator():
+        Job.result_file.field.storage.delete(path)
+    deleted, _ = expired.delete()
+    return deleted
+
+
+class WorkerPool:
+    """
+    Threads that poll the job table and run ready jobs.
+
+    Each thread claims one job at a time and sleeps for ``poll_interval``
+    seconds when the queue is empty. Threads suit the I/O-bound handlers
+    here; run several ``run_workers`` processes for CPU-bound work.
+    """
+
+    def __init__(self, threads=2, poll_interval=1.0, name=None):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = name or f'{os.uname().nodename}:{os.getpid()}'
+        self.processed = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """
+        Start the worker threads.
+        """
+        self._stop.clear()
+        for number in range(self.threads):
+            thread = threading.Thread(target=self._work, args=(f'{self.name}:{number}',), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Ask the threads to stop after their current job and wait for them.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def wait(self, timeout=None):
+        """
+        Block until stop() is called or the timeout passes.
+
+        Args:
+            timeout: Optional seconds to wait.
+
+        Returns:
+            bool: True if the pool was stopped.
+        """
+        return self._stop.wait(timeout)
+
+    def _work(self, worker_id):
+        """
+        Worker thread loop.
+
+        Args:
+            worker_id: Name recorded on the jobs this thread claims.
+        """
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                job = claim(worker_id)
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                run(job)
+                with self._lock:
+                    self.processed += 1
+        finally:
+            connection.close()
+
+
+def _export_key(user_id, params):
+    return f'export:{user_id}:{params.get("data", "mood")}:{params.get("format", "csv")}'
+
+
+@register('export', priority=10, dedup=_export_key, user_enqueueable=True)
+def export_job(job):
+    """
+    Write a user's export to a file attached to the job.
+
+    Args:
+        job: Job with ``data`` (mood, journal or all) and ``format`` (csv
+            or ndjson) parameters.
+
+    Returns:
+        dict: filename, content_type and size in bytes.
+    """
+    data_type = job.params.get('data', 'mood')
+    export_format = job.params.get('format', 'csv')
+    exports.validate(data_type, export_format)
+    stream = exports.iter_csv if export_format == 'csv' else exports.iter_ndjson
+    filename = exports.filename(data_type, export_format)
+
+    with tempfile.TemporaryFile() as output:
+        for line in stream(data_type, job.user_id):
+            output.write(line.encode())
+        size = output.tell()
+        output.seek(0)
+        if job.result_file:
+            job.result_file.delete(save=False)
+        job.result_file.save(f'{job.pk}/{filename}', File(output), save=False)
+
+    return {'filename': filename, 'content_type': exports.CONTENT_TYPES[export_format], 'size': size}
+
+
+@register('achievements', dedup=lambda user_id, params: f'achievements:{user_id}', user_enqueueable=True)
+def achievements_job(job):
+    """
+    Unlock any earned achievements and rebuild the cached progress.
+
+    Args:
+        job: Job for the user to recompute.
+
+    Returns:
+        dict: Newly unlocked, unlocked and total achievement counts.
+    """
+    unlocked = achievements.evaluate_all([job.user_id])
+    tiered_cache.invalidate_tags(user_tag(job.user_id, ACHIEVEMENTS))
+    progress = achievements.cached_progress(job.user_id)
+    return {
+        'newly_unlocked': unlocked,
+        'unlocked_count': progress['unlocked_count'],
+        'total_achievements': progress['total_achievements'],
+    }
+
+
+@register('rollups', priority=-10, dedup=lambda user_id, params: f'rollups:{user_id}', user_enqueueable=True)
+def rollups_job(job):
+    """
+    Rebuild a user's daily rollups and streak from the raw mood entries.
+
+    Args:
+        job: Job for the user to rebuild.
+
+    Returns:
+        dict: Rollup days written and the rebuilt streak lengths.
+    """
+    days = rollups.rebuild_user(job.user_id)
+    streak = streaks.rebuild(job.user_id)
+    # Rebuilt rows are bulk-written without signals, so drop derived data here
+    versioning.bump(job.user_id)
+    tiered_cache.invalidate_tags(user_tag(job.user_id, MOODS), user_tag(job.user_id, ACHIEVEMENTS))
+    return {'days': days, 'current_streak': streak.current_streak, 'longest_streak': streak.longest_streak}
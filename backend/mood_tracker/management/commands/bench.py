@@ -0,0 +1,360 @@
+import datetime
+import json
+import math
+import statistics
+import subprocess
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, resolve, reverse
+
+from mood_tracker import jobs
+from mood_tracker.api_urls import router
+from mood_tracker.auth import user_cache
+from mood_tracker.models import User, MoodEntry, Journal, Reminder, Job
+
+# Server-rendered pages measured for every run, as (name, path) pairs
+PAGE_ENDPOINTS = [
+    ('dashboard', '/dashboard/'),
+    ('mood_history', '/mood-history/'),
+    ('journal_list', '/journals/'),
+    ('journal_search', '/journals/?q=today'),
+    ('reminders', '/reminders/'),
+    ('achievements', '/achievements/'),
+    ('profile', '/profile/'),
+]
+
+# Web exports, timed end to end: queue the job, run it, download the file
+EXPORT_ENDPOINTS = [
+    ('export_mood_csv', '/export/?data=mood&type=csv'),
+    ('export_all_ndjson', '/export/?data=all&type=ndjson'),
+]
+
+# API routes outside the router, as (url name, query string) pairs
+API_ENDPOINTS = [
+    ('search', '?q=today'),
+]
+
+
+def percentile(values, pct):
+    """
+    Return the nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: Non-empty list of numbers.
+        pct: Percentile between 0 and 100.
+
+    Returns:
+        float: The value at the requested percentile.
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the web views and API endpoints.
+
+    Logs in as a (typically seed_bench generated) user and drives the Django
+    test client against the server-rendered pages and every read-only DRF
+    route, recording p50/p95 latency, database queries, response size and
+    peak Python memory per endpoint. Web exports are timed from queueing
+    the job to the end of the download. Results are written as a JSON artifact
+    so runs can be compared across commits.
+
+    Usage:
+        python manage.py bench --output bench.json
+        python manage.py bench --user bench-3 --iterations 50 --cold
+    """
+    help = 'Benchmark views and API endpoints and write the results as JSON'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--user', help='UID to benchmark as. Defaults to the first seed_bench user.')
+        parser.add_argument('--prefix', default='bench', help='uid prefix used to pick the default user.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint.')
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Clear the response and user caches before every request.',
+        )
+        parser.add_argument('--output', help='File to write the JSON results to. Defaults to stdout.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to run the benchmark.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        user = self.get_user(options['user'], options['prefix'])
+
+        client = Client(raise_request_exception=False)
+        session = client.session
+        session['user_id'] = user.uid
+        session.save()
+
+        results = []
+        for name, path in self.endpoints(user):
+            if path is None:
+                results.append({'name': name, 'path': None, 'skipped': 'route is not mounted'})
+                continue
+            results.append(self.measure(client, name, path, options))
+            self.stderr.write(f'{name}: p50 {results[-1]["p50_ms"]}ms')
+
+        existing = set(Job.objects.filter(user=user, kind='export').values_list('pk', flat=True))
+        try:
+            for name, path in EXPORT_ENDPOINTS:
+                results.append(self.measure(client, name, path, options, fetch=self.export))
+                self.stderr.write(f'{name}: p50 {results[-1]["p50_ms"]}ms')
+        finally:
+            self.delete_export_jobs(user, existing)
+
+        artifact = {
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': self.git_commit(),
+            'database': connection.vendor,
+            'user': user.uid,
+            'data': {
+                'mood_entries': MoodEntry.objects.filter(user=user).count(),
+                'journals': Journal.objects.filter(user=user).count(),
+                'reminders': Reminder.objects.filter(user=user).count(),
+            },
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'cold': options['cold'],
+            'endpoints': results,
+        }
+
+        output = json.dumps(artifact, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote results for {len(results)} endpoints to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def get_user(self, uid, prefix):
+        """
+        Return the user to benchmark as.
+
+        Args:
+            uid: Explicit uid, or None to pick the first generated user.
+            prefix: uid prefix of generated users.
+
+        Returns:
+            User: The user to log in as.
+
+        Raises:
+            CommandError: If no matching user exists.
+        """
+        if uid:
+            user = User.objects.filter(uid=uid).first()
+            if user is None:
+                raise CommandError(f'Unknown user: {uid}')
+            return user
+
+        user = User.objects.filter(uid__startswith=f'{prefix}-').order_by('uid').first()
+        if user is None:
+            raise CommandError(f'No "{prefix}" users found; run seed_bench first or pass --user')
+        return user
+
+    def endpoints(self, user):
+        """
+        List the pages and read-only API routes to benchmark.
+
+        API routes are discovered from the router, so new viewsets and
+        actions are picked up automatically. Detail routes use the first
+        object the user can see.
+
+        Args:
+            user: User the benchmark runs as.
+
+        Returns:
+            list: (name, path) pairs; path is None for API routes that
+                cannot be reversed because the API is not mounted.
+        """
+        endpoints = list(PAGE_ENDPOINTS)
+
+        for prefix, viewset, basename in router.registry:
+            for route in router.get_routes(viewset):
+                if 'get' not in route.mapping:
+                    continue
+
+                kwargs = {}
+                if route.detail:
+                    view = viewset()
+                    view.request = SimpleNamespace(user=user, query_params={})
+                    pk = view.get_queryset().values_list('pk', flat=True).first()
+                    if pk is None:
+                        continue
+                    kwargs['pk'] = pk
+
+                name = route.name.format(basename=basename)
+                try:
+                    path = reverse(name, kwargs=kwargs)
+                except NoReverseMatch:
+                    path = None
+                endpoints.append((f'api:{name}', path))
+
+        for name, query_string in API_ENDPOINTS:
+            try:
+                path = reverse(name) + query_string
+            except NoReverseMatch:
+                path = None
+            endpoints.append((f'api:{name}', path))
+
+        return endpoints
+
+    def request(self, client, path, cold):
+        """
+        Issue one GET request and read the full response body.
+
+        Args:
+            client: Logged-in test client.
+            path: URL to request.
+            cold: Whether to clear caches first.
+
+        Returns:
+            tuple: (response, body size in bytes).
+        """
+        if cold:
+            cache.clear()
+            user_cache.clear()
+        response = client.get(path)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response, size
+
+    def export(self, client, path, cold):
+        """
+        Queue one web export, run it and download the file.
+
+        The export view only queues a job and redirects to its status page,
+        so the job is run here unless JOBS_EAGER already ran it inline.
+
+        Args:
+            client: Logged-in test client.
+            path: Export URL to request.
+            cold: Whether to clear caches first.
+
+        Returns:
+            tuple: (download response, body size in bytes).
+        """
+        response, size = self.request(client, path, cold)
+        if response.status_code != 302:
+            return response, size
+        match = resolve(response['Location'].split('?')[0])
+        if match.url_name != 'export_status':
+            return response, size
+        jobs.run_pending('bench')
+        return self.request(client, reverse('export_download', kwargs=match.kwargs), False)
+
+    def delete_export_jobs(self, user, existing):
+        """
+        Delete the export jobs and files the benchmark created.
+
+        Args:
+            user: User the benchmark ran as.
+            existing: Primary keys of the user's export jobs before the run.
+        """
+        created = Job.objects.filter(user=user, kind='export').exclude(pk__in=existing)
+        for job in created:
+            if job.result_file:
+                job.result_file.delete(save=False)
+        created.delete()
+
+    def measure(self, client, name, path, options, fetch=None):
+        """
+        Benchmark one endpoint.
+
+        Timed requests run without tracemalloc, which would skew latency;
+        peak memory is taken from one extra traced request.
+
+        Args:
+            client: Logged-in test client.
+            name: Endpoint name for the report.
+            path: URL to request.
+            options: Parsed command line options.
+            fetch: Optional callable (client, path, cold) returning the
+                response and its size, defaulting to a single GET.
+
+        Returns:
+            dict: Latency percentiles, query counts, response size and
+                peak memory for the endpoint.
+        """
+        cold = options['cold']
+        fetch = fetch or self.request
+        for _ in range(options['warmup']):
+            fetch(client, path, cold)
+
+        timings = []
+        query_counts = []
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response, size = fetch(client, path, cold)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+
+        tracemalloc.start()
+        try:
+            fetch(client, path, cold)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'name': name,
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': max(query_counts),
+            'response_bytes': size,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def git_commit(self):
+        """
+        Return the current git commit, if the project is a git checkout.
+
+        Returns:
+            str: Commit hash, or None if unavailable.
+        """
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout.strip()
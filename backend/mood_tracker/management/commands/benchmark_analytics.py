@@ -0,0 +1,200 @@
+import datetime
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mood_tracker.models import MoodEntry
+from mood_tracker import analytics, seeding
+
+
+class RollbackBenchmark(Exception):
+    """
+    Raised to roll back the seeded benchmark data set.
+    """
+
+
+def loop_rolling_averages(entries, windows=analytics.ROLLING_WINDOWS):
+    """
+    Reference per-instance implementation of analytics.rolling_averages.
+    """
+    per_day = {}
+    for entry in entries:
+        total, count = per_day.get(entry.date, (0, 0))
+        per_day[entry.date] = (total + entry.intensity, count + 1)
+    if not per_day:
+        return []
+
+    day = min(per_day)
+    records = []
+    while day <= max(per_day):
+        record = {'date': day.strftime('%Y-%m-%d')}
+        for window in windows:
+            total = count = 0
+            for offset in range(window):
+                day_total, day_count = per_day.get(day - datetime.timedelta(days=offset), (0, 0))
+                total += day_total
+                count += day_count
+            record[f'rolling_{window}'] = round(total / count, 2) if count else None
+        records.append(record)
+        day += datetime.timedelta(days=1)
+    return records
+
+
+def loop_heatmap(entries):
+    """
+    Reference per-instance implementation of analytics.weekday_hour_heatmap.
+    """
+    counts = [[0] * 24 for _ in range(7)]
+    sums = [[0] * 24 for _ in range(7)]
+    for entry in entries:
+        counts[entry.date.weekday()][entry.time.hour] += 1
+        sums[entry.date.weekday()][entry.time.hour] += entry.intensity
+    return counts, sums
+
+
+def loop_transitions(entries):
+    """
+    Reference per-instance implementation of analytics.transition_matrix.
+    """
+    index = {key: position for position, key in enumerate(analytics.MOOD_KEYS)}
+    counts = [[0] * len(index) for _ in index]
+    previous = None
+    for entry in entries:
+        if previous is not None:
+            counts[index[previous.mood]][index[entry.mood]] += 1
+        previous = entry
+    return counts
+
+
+def loop_trend(entries):
+    """
+    Reference per-instance implementation of analytics.intensity_trend.
+    """
+    start = datetime.datetime.combine(entries[0].date, entries[0].time)
+    xs = [(datetime.datetime.combine(entry.date, entry.time) - start).total_seconds() / 86400 for entry in entries]
+    ys = [entry.intensity for entry in entries]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return numerator / denominator
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the vectorized mood analytics.
+
+    Seeds one user with a large mood history inside a transaction and
+    compares analytics.build_analytics against straightforward loops over
+    MoodEntry instances computing the same series, checking that both
+    agree. The data set is rolled back afterwards.
+
+    Usage:
+        python manage.py benchmark_analytics --entries 100000
+    """
+    help = 'Compare vectorized mood analytics against per-instance Python loops'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--entries', type=int, default=100000, help='Mood entries for the benchmark user.')
+        parser.add_argument('--days', type=int, default=3 * 365, help='Days the entries are spread over.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per implementation.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to seed data and run the benchmark.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding {options["entries"]} mood entries...')
+                user = seeding.seed(
+                    users=1,
+                    entries_per_user=options['entries'],
+                    days=options['days'],
+                    prefix='benchmark-analytics',
+                )[0]
+
+                vectorized, result = self.time(lambda: analytics.build_analytics(user), options['repeat'])
+                loops, reference = self.time(lambda: self.loop_analytics(user), options['repeat'])
+                self.check_agreement(result, reference)
+
+                self.stdout.write(f'vectorized: median {vectorized:.1f}ms over {options["repeat"]} runs')
+                self.stdout.write(f'per-instance loops: median {loops:.1f}ms over {options["repeat"]} runs')
+                self.stdout.write(self.style.SUCCESS(f'Speedup: {loops / vectorized:.1f}x'))
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def loop_analytics(self, user):
+        """
+        Compute the analytics series by looping over model instances.
+
+        Args:
+            user: User whose entries are analysed.
+
+        Returns:
+            dict: Rolling averages, heatmap, transitions and trend slope.
+        """
+        entries = list(MoodEntry.objects.filter(user=user).order_by('date', 'time'))
+        return {
+            'rolling_averages': loop_rolling_averages(entries),
+            'heatmap': loop_heatmap(entries),
+            'transitions': loop_transitions(entries),
+            'slope': loop_trend(entries),
+        }
+
+    def time(self, func, repeat):
+        """
+        Run a function repeatedly and return its median runtime.
+
+        Args:
+            func: Function to time.
+            repeat: Number of timed runs.
+
+        Returns:
+            tuple: (median milliseconds, result of the last run).
+        """
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), result
+
+    def check_agreement(self, result, reference):
+        """
+        Warn if the vectorized and reference results differ.
+
+        Args:
+            result: Output of analytics.build_analytics.
+            reference: Output of loop_analytics.
+        """
+        mismatches = []
+        for name in ('rolling_7', 'rolling_30'):
+            if [day[name] for day in result['rolling_averages']] != [day[name] for day in reference['rolling_averages']]:
+                mismatches.append(name)
+        if result['heatmap']['counts'] != reference['heatmap'][0]:
+            mismatches.append('heatmap')
+        if result['transitions']['counts'] != reference['transitions']:
+            mismatches.append('transitions')
+        if abs(result['trend']['slope_per_day'] - round(reference['slope'], 4)) > 1e-4:
+            mismatches.append('trend')
+
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'Results differ for: {", ".join(mismatches)}'))
+        else:
+            self.stdout.write('Vectorized and reference results agree')
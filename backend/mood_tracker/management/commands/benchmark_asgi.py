@@ -0,0 +1,253 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from mindmate.middleware import SessionRefreshMiddleware
+from mood_tracker.models import User
+
+# Endpoints served by async views under ASGI and by sync views under WSGI
+ENDPOINTS = [
+    '/api/moods/recent/',
+    '/api/moods/stats/',
+    '/api/moods/history/?days=365',
+    '/api/achievements/user_achievements/',
+    '/dashboard/',
+]
+
+# uvicorn application, interface and URLconf for each configuration;
+# 'asgi-sync' serves the sync views over ASGI to separate the cost of the
+# interface from the gain of the async views
+SERVERS = {
+    'wsgi': ('mindmate.wsgi:application', 'wsgi', 'mindmate.urls'),
+    'asgi-sync': ('mindmate.asgi:application', 'asgi3', 'mindmate.urls'),
+    'asgi': ('mindmate.asgi:application', 'asgi3', 'mindmate.asgi_urls'),
+}
+
+
+class Command(BaseCommand):
+    """
+    Django management command to compare ASGI and WSGI throughput under uvicorn.
+
+    Starts uvicorn against the app database serving the WSGI application
+    (sync views on uvicorn's thread pool), the ASGI application with the
+    sync views, and the ASGI application with the async views, and drives
+    the read endpoints with concurrent keep-alive clients logged in as a seed_bench
+    user. Reports requests per second and latency for each endpoint.
+    Requires uvicorn and SESSION_SAVE_EVERY_REQUEST off.
+
+    Usage:
+        MINDMATE_DB_PROFILE=production python manage.py benchmark_asgi --concurrency 32
+        python manage.py benchmark_asgi --user bench-3 --workers 2
+    """
+    help = 'Compare read endpoint throughput of the ASGI and WSGI applications under uvicorn'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--user', help='UID to benchmark as. Defaults to the first seed_bench user.')
+        parser.add_argument('--prefix', default='bench', help='uid prefix used to pick the default user.')
+        parser.add_argument('--requests', type=int, default=1000, help='Timed requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections.')
+        parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes.')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to run the benchmark.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('uvicorn is not installed')
+
+        if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.signed_cookies':
+            raise CommandError('Sessions must be stored in the database for the servers to share them')
+        if settings.SESSION_SAVE_EVERY_REQUEST:
+            # uvicorn's WSGI adapter rejects the Set-Cookie header Django sends on every save
+            raise CommandError('Run with SESSION_SAVE_EVERY_REQUEST off, e.g. MINDMATE_DB_PROFILE=production')
+
+        user = self.get_user(options['user'], options['prefix'])
+        # Saved to the database, so every server process can load it, and
+        # marked as refreshed so the run never rewrites it
+        session = SessionStore()
+        session['user_id'] = user.uid
+        session[SessionRefreshMiddleware.REFRESHED_AT_KEY] = int(time.time())
+        session.create()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+        try:
+            results = {}
+            for name, server in SERVERS.items():
+                results[name] = self.run_server(name, *server, cookie, options)
+        finally:
+            session.delete()
+
+        for path in ENDPOINTS:
+            figures = ', '.join(
+                f'{name} {results[name][path]["rps"]:.0f} req/s (p95 {results[name][path]["p95_ms"]:.1f}ms)'
+                for name in SERVERS
+            )
+            wsgi, asgi = results['wsgi'][path]['rps'], results['asgi'][path]['rps']
+            self.stdout.write(f'{path}: {figures}, asgi/wsgi {asgi / wsgi if wsgi else 0:.2f}x')
+
+    def get_user(self, uid, prefix):
+        """
+        Return the user to benchmark as.
+
+        Args:
+            uid: Explicit uid, or None to pick the first generated user.
+            prefix: uid prefix of generated users.
+
+        Returns:
+            User: The user to log in as.
+
+        Raises:
+            CommandError: If no matching user exists.
+        """
+        if uid:
+            user = User.objects.filter(uid=uid).first()
+        else:
+            user = User.objects.filter(uid__startswith=f'{prefix}-').order_by('uid').first()
+        if user is None:
+            raise CommandError('No benchmark user found; run seed_bench first or pass --user')
+        return user
+
+    def run_server(self, name, application, interface, urlconf, cookie, options):
+        """
+        Start uvicorn, benchmark every endpoint against it and stop it.
+
+        Args:
+            name: Configuration name, for messages.
+            application: Import path of the application.
+            interface: uvicorn interface for the application.
+            urlconf: ROOT_URLCONF the server uses.
+            cookie: Session cookie header value.
+            options: Parsed command line options.
+
+        Returns:
+            dict: Endpoint path to rps, p50_ms, p95_ms and errors.
+        """
+        port = options['port']
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', application, '--interface', interface, '--port', str(port),
+             '--workers', str(options['workers']), '--log-level', 'warning', '--no-access-log'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'MINDMATE_ROOT_URLCONF': urlconf},
+        )
+        try:
+            self.wait_for_port(port, server)
+            results = {}
+            for path in ENDPOINTS:
+                # Warm up caches and connections before timing
+                self.load(port, path, cookie, options['concurrency'], options['concurrency'])
+                results[path] = self.load(port, path, cookie, options['requests'], options['concurrency'])
+                if results[path]['errors']:
+                    self.stderr.write(f'{name} {path}: {results[path]["errors"]} failed requests')
+            return results
+        finally:
+            server.terminate()
+            server.wait()
+
+    def wait_for_port(self, port, server, timeout=20):
+        """
+        Wait until the server accepts connections.
+
+        Args:
+            port: Port the server listens on.
+            server: The server's Popen handle.
+            timeout: Seconds to wait.
+
+        Raises:
+            CommandError: If the server exits or does not come up in time.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('uvicorn exited before accepting connections')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'uvicorn did not start listening on port {port}')
+
+    def load(self, port, path, cookie, requests, concurrency):
+        """
+        Send GET requests from concurrent keep-alive connections.
+
+        Args:
+            port: Port the server listens on.
+            path: Path to request.
+            cookie: Session cookie header value.
+            requests: Total number of requests.
+            concurrency: Number of connections sending requests in parallel.
+
+        Returns:
+            dict: rps, p50_ms, p95_ms and errors.
+        """
+        remaining = [requests]
+        lock = threading.Lock()
+        latencies = []
+        errors = [0]
+
+        def client():
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers={'Cookie': cookie})
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                    ok = False
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=client) for _ in range(min(concurrency, requests))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        return {
+            'rps': len(latencies) / duration,
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p95_ms': statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0,
+            'errors': errors[0],
+        }
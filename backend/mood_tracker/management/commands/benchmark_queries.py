@@ -0,0 +1,151 @@
+import datetime
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from mood_tracker.models import MoodEntry, Journal, Reminder
+from mood_tracker import seeding
+
+
+class RollbackBenchmark(Exception):
+    """
+    Raised to roll back the seeded benchmark data set.
+    """
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the per-user date-range queries.
+
+    Seeds N users x M mood entries (plus journals and reminders) inside a
+    transaction, then reports the query plan and median timing of the
+    dashboard, history, export, journal list and reminder queries with the
+    composite indexes in place and with them dropped. Everything, including
+    the dropped indexes, is rolled back afterwards, so the command is safe to
+    run against a development database.
+
+    Usage:
+        python manage.py benchmark_queries --users 50 --entries 2000
+    """
+    help = 'Compare per-user query plans and timings with and without composite indexes'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--users', type=int, default=20, help='Number of users to seed.')
+        parser.add_argument('--entries', type=int, default=2000, help='Mood entries per user.')
+        parser.add_argument('--journals', type=int, default=200, help='Journals per user.')
+        parser.add_argument('--reminders', type=int, default=5, help='Reminders per user.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to seed data and run the benchmark.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        try:
+            with transaction.atomic():
+                self.stdout.write('Seeding benchmark data...')
+                users = seeding.seed(
+                    users=options['users'],
+                    entries_per_user=options['entries'],
+                    journals_per_user=options['journals'],
+                    reminders_per_user=options['reminders'],
+                    prefix='benchmark-queries',
+                )
+                target = users[len(users) // 2]
+
+                with connection.cursor() as cursor:
+                    # Refresh planner statistics so index choices reflect the seeded volume
+                    cursor.execute('ANALYZE')
+
+                self.report('With composite indexes', target, options['repeat'])
+
+                with connection.cursor() as cursor:
+                    for model in (MoodEntry, Journal, Reminder):
+                        for index in model._meta.indexes:
+                            cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+                self.report('Without composite indexes', target, options['repeat'])
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def queries(self, user):
+        """
+        Build the query set under test for one user.
+
+        Args:
+            user: User whose data is queried.
+
+        Returns:
+            list: (name, queryset) pairs.
+        """
+        today = timezone.now().date()
+        return [
+            ('dashboard', MoodEntry.objects.filter(
+                user=user, date__gte=today - datetime.timedelta(days=7), date__lte=today
+            ).order_by('date', 'time')),
+            ('history', MoodEntry.objects.filter(
+                user=user, date__gte=today - datetime.timedelta(days=30), date__lte=today
+            ).order_by('-date', '-time')),
+            ('export', MoodEntry.objects.filter(user=user).order_by('date', 'time').values_list(
+                'date', 'time', 'mood', 'intensity', 'notes'
+            )),
+            ('journal_list', Journal.objects.filter(user=user).order_by('-created_at')[:20]),
+            ('reminders', Reminder.objects.filter(user=user, is_active=True).order_by('time')),
+        ]
+
+    def report(self, label, user, repeat):
+        """
+        Print the plan and median runtime of each query.
+
+        Args:
+            label: Heading for this round of measurements.
+            user: User whose data is queried.
+            repeat: Number of timed runs per query.
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+        for name, queryset in self.queries(user):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(f'{name}: median {statistics.median(timings):.2f}ms over {repeat} runs')
+            for line in self.explain(queryset, label):
+                self.stdout.write(f'    {line}')
+
+    def explain(self, queryset, label):
+        """
+        Return the query plan for a queryset as printable lines.
+
+        The label is appended as an SQL comment so the statement text differs
+        between rounds; otherwise sqlite3's statement cache would replay the
+        plan prepared before the indexes were dropped.
+
+        Args:
+            queryset: QuerySet to explain.
+            label: Heading of the current round of measurements.
+
+        Returns:
+            list: One string per plan row.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} /* {label} */', params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
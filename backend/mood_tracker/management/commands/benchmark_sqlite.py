@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Connection setups compared by the benchmark. 'default' is what Django does
+# without OPTIONS: rollback journal, deferred BEGIN and Python's 5s timeout.
+PROFILES = {
+    'default': {
+        'init': ['PRAGMA journal_mode=DELETE', 'PRAGMA synchronous=FULL'],
+        'begin': 'BEGIN',
+    },
+    'production': {
+        'init': [command.strip() for command in settings.SQLITE_WAL_INIT_COMMAND.split(';') if command.strip()],
+        'begin': 'BEGIN IMMEDIATE',
+    },
+}
+
+SCHEMA = [
+    'CREATE TABLE entry (id INTEGER PRIMARY KEY, user_id INTEGER, date TEXT, mood TEXT, intensity INTEGER)',
+    'CREATE INDEX entry_user_date ON entry (user_id, date)',
+    'CREATE TABLE rollup (user_id INTEGER, date TEXT, entry_count INTEGER, intensity_sum INTEGER, '
+    'PRIMARY KEY (user_id, date))',
+]
+
+
+def connect(path, profile):
+    """
+    Open a connection configured like Django would for a profile.
+
+    Args:
+        path: Database file.
+        profile: Entry of PROFILES.
+
+    Returns:
+        Connection: sqlite3 connection in autocommit mode.
+    """
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    for command in profile['init']:
+        conn.execute(command)
+    return conn
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark SQLite under concurrent writers.
+
+    Runs writer threads, each saving mood entries the way the app does (read
+    the day's rollup, insert the entry, update the rollup, in one
+    transaction), alongside reader threads, against a scratch database for
+    each connection profile: Django's defaults and the production profile
+    (WAL, busy_timeout, BEGIN IMMEDIATE). Also times opening a connection per
+    request against reusing one, as CONN_MAX_AGE does. The app database is
+    not touched.
+
+    Usage:
+        python manage.py benchmark_sqlite --writers 8 --readers 4 --seconds 5
+    """
+    help = 'Compare SQLite write throughput under the default and production connection profiles'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run.')
+        parser.add_argument('--connections', type=int, default=2000, help='Requests for the connection reuse test.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to run the benchmark.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            results = {}
+            for name, profile in PROFILES.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                results[name] = self.run_profile(path, profile, options)
+                result = results[name]
+                self.stdout.write(
+                    f'{name}: {result["commits"] / options["seconds"]:.0f} commits/s, '
+                    f'{result["reads"] / options["seconds"]:.0f} reads/s, '
+                    f'{result["errors"]} "database is locked" errors, '
+                    f'p95 write {result["p95_ms"]:.1f}ms'
+                )
+
+            default, production = results['default'], results['production']
+            if default['commits']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Write throughput: {production["commits"] / default["commits"]:.1f}x'
+                ))
+
+            path = os.path.join(directory, 'production.sqlite3')
+            per_request, persistent = self.time_connections(path, PROFILES['production'], options['connections'])
+            self.stdout.write(
+                f'connection per request: {per_request:.0f} requests/s, '
+                f'persistent connection: {persistent:.0f} requests/s'
+            )
+
+    def run_profile(self, path, profile, options):
+        """
+        Run writers and readers against a fresh database for one profile.
+
+        Args:
+            path: Scratch database file.
+            profile: Entry of PROFILES.
+            options: Parsed command line options.
+
+        Returns:
+            dict: commits, reads, errors and p95_ms.
+        """
+        setup = connect(path, profile)
+        for statement in SCHEMA:
+            setup.execute(statement)
+        setup.close()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {'commits': 0, 'reads': 0, 'errors': 0, 'latencies': []}
+
+        def writer(user_id):
+            conn = connect(path, profile)
+            commits, errors, latencies = 0, 0, []
+            day = 0
+            while not stop.is_set():
+                date = f'2024-01-{day % 28 + 1:02d}'
+                start = time.perf_counter()
+                try:
+                    conn.execute(profile['begin'])
+                    conn.execute('SELECT entry_count FROM rollup WHERE user_id = ? AND date = ?', (user_id, date)).fetchone()
+                    conn.execute(
+                        'INSERT INTO entry (user_id, date, mood, intensity) VALUES (?, ?, ?, ?)',
+                        (user_id, date, 'happy', 5),
+                    )
+                    conn.execute(
+                        'INSERT INTO rollup VALUES (?, ?, 1, 5) ON CONFLICT (user_id, date) DO UPDATE '
+                        'SET entry_count = entry_count + 1, intensity_sum = intensity_sum + 5',
+                        (user_id, date),
+                    )
+                    conn.execute('COMMIT')
+                    commits += 1
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                day += 1
+            conn.close()
+            with lock:
+                totals['commits'] += commits
+                totals['errors'] += errors
+                totals['latencies'].extend(latencies)
+
+        def reader(user_id):
+            conn = connect(path, profile)
+            reads = 0
+            while not stop.is_set():
+                try:
+                    conn.execute('SELECT SUM(entry_count), SUM(intensity_sum) FROM rollup WHERE user_id = ?', (user_id,)).fetchone()
+                    conn.execute('SELECT COUNT(*) FROM entry WHERE user_id = ?', (user_id,)).fetchone()
+                    reads += 1
+                except sqlite3.OperationalError:
+                    pass
+            conn.close()
+            with lock:
+                totals['reads'] += reads
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(options['writers'])]
+        threads += [threading.Thread(target=reader, args=(index,)) for index in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        latencies = totals.pop('latencies')
+        totals['p95_ms'] = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0
+        return totals
+
+    def time_connections(self, path, profile, requests):
+        """
+        Time short requests that open their own connection against reusing one.
+
+        Args:
+            path: Existing database file.
+            profile: Entry of PROFILES.
+            requests: Number of requests to time each way.
+
+        Returns:
+            tuple: (requests/s opening a connection each time, requests/s
+                reusing one connection).
+        """
+        query = 'SELECT entry_count FROM rollup WHERE user_id = 0 LIMIT 1'
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            conn = connect(path, profile)
+            conn.execute(query).fetchone()
+            conn.close()
+        per_request = requests / (time.perf_counter() - start)
+
+        conn = connect(path, profile)
+        start = time.perf_counter()
+        for _ in range(requests):
+            conn.execute(query).fetchone()
+        persistent = requests / (time.perf_counter() - start)
+        conn.close()
+        return per_request, persistent
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from mood_tracker.models import User
+from mood_tracker import achievements
+
+
+class Command(BaseCommand):
+    """
+    Django management command to unlock earned achievements in bulk.
+
+    Evaluates every active achievement for all users (or the users given
+    with --user) using grouped aggregate queries per batch of users, and
+    bulk-inserts any newly earned UserAchievement rows. Useful after adding
+    new achievements or backfilling historical data.
+
+    Usage:
+        python manage.py evaluate_achievements
+        python manage.py evaluate_achievements --user <uid> --batch-size 1000
+    """
+    help = 'Unlock achievements that users have already earned'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            default=[],
+            help='UID of a user to evaluate (may be repeated). Defaults to all users.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users evaluated per round of queries.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to evaluate achievements.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        users = User.objects.order_by('uid')
+        if options['users']:
+            users = users.filter(uid__in=options['users'])
+            missing = set(options['users']) - set(users.values_list('uid', flat=True))
+            if missing:
+                raise CommandError(f'Unknown user(s): {", ".join(sorted(missing))}')
+
+        created = achievements.evaluate_all(
+            users.values_list('uid', flat=True).iterator(),
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Unlocked {created} new achievements')
+        )
@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from mood_tracker.models import User
+from mood_tracker import ingest
+
+
+class Command(BaseCommand):
+    """
+    Django management command to bulk-import mood entries from a file.
+
+    Reads JSON, NDJSON or CSV in the shape the export produces (including
+    the combined mood and journal export, whose journal rows are skipped)
+    and ingests it in batches. Each batch is validated, deduplicated and
+    inserted in one transaction, with rollups, streaks, achievements and
+    the search index updated once per batch. Rows without a client key
+    get one derived from their content, so importing the same file twice
+    does not create duplicates.
+
+    Usage:
+        python manage.py import_moods mood_data.csv --user <uid>
+        python manage.py import_moods - --user <uid> --type ndjson < moods.ndjson
+    """
+    help = 'Bulk-import mood entries from a JSON, NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('path', help='File to import, or - for standard input.')
+        parser.add_argument('--user', required=True, help='UID of the user the entries belong to.')
+        parser.add_argument(
+            '--type',
+            choices=ingest.INGEST_FORMATS,
+            help='File format. Defaults to the file extension.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Entries ingested per transaction.')
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Import the valid rows of a batch that contains invalid ones.',
+        )
+        parser.add_argument(
+            '--no-content-keys',
+            action='store_true',
+            help='Do not derive idempotency keys for rows without a client key.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to import the file.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        user = User.objects.filter(uid=options['user']).first()
+        if user is None:
+            raise CommandError(f'Unknown user: {options["user"]}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        path = options['path']
+        ingest_format = options['type'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if ingest_format not in ingest.INGEST_FORMATS:
+            raise CommandError(f'Cannot tell the format of {path}; pass --type')
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        totals = {'created': 0, 'duplicates': 0, 'invalid': 0}
+        try:
+            for offset, batch in self.batches(stream, ingest_format, options['batch_size']):
+                summary = ingest.ingest_mood_entries(
+                    user,
+                    batch,
+                    skip_invalid=options['skip_invalid'],
+                    derive_keys=not options['no_content_keys'],
+                )
+                for error in summary['errors'][:10]:
+                    self.stderr.write(f'Row {offset + error["index"] + 1}: {error["errors"]}')
+                if summary['errors'] and not options['skip_invalid']:
+                    raise CommandError(
+                        f'{len(summary["errors"])} invalid rows in the batch starting at row {offset + 1}; '
+                        f'nothing from that batch was imported (use --skip-invalid to import the valid rows)'
+                    )
+                totals['created'] += summary['created']
+                totals['duplicates'] += summary['duplicates']
+                totals['invalid'] += len(summary['errors'])
+        except ingest.IngestError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {totals["created"]} mood entries for {user.uid} '
+            f'({totals["duplicates"]} duplicates, {totals["invalid"]} invalid rows skipped)'
+        ))
+
+    def batches(self, stream, ingest_format, batch_size):
+        """
+        Split the input into batches of raw records.
+
+        CSV and NDJSON are read lazily, so files larger than memory can be
+        imported; JSON has to be loaded whole.
+
+        Args:
+            stream: Open text file.
+            ingest_format: One of ingest.INGEST_FORMATS.
+            batch_size: Records per batch.
+
+        Yields:
+            tuple: (index of the batch's first record, list of records).
+        """
+        if ingest_format == 'json':
+            try:
+                records = iter(ingest.parse_records(json.load(stream), 'json'))
+            except ValueError as e:
+                raise ingest.IngestError(f'Could not parse json upload: {e}') from e
+        else:
+            records = ingest.iter_records(stream, ingest_format)
+
+        offset = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield offset, batch
+            offset += len(batch)
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mood_tracker import images
+from mood_tracker.models import User
+
+
+class Command(BaseCommand):
+    """
+    Django management command to convert stored profile pictures to variants.
+
+    Pictures uploaded before the image pipeline are served full size. This
+    decodes each of them, writes the resized WebP and JPEG variants and, unless
+    PROFILE_PICTURE_KEEP_ORIGINAL is on, deletes the original. Pictures that
+    cannot be decoded are reported and left alone.
+
+    Usage:
+        python manage.py process_profile_pictures
+        python manage.py process_profile_pictures --all
+    """
+    help = 'Generate resized variants for profile pictures stored as uploaded'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also reprocess kept originals that already have variants, e.g. after changing the sizes.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to process pictures.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        users = User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['all']:
+            users = users.filter(profile_picture_key='')
+
+        processed = 0
+        before = 0
+        after = 0
+        for user in users.iterator():
+            try:
+                with user.profile_picture.open('rb') as original:
+                    picture = images.process(original)
+                    before += original.size
+            except (OSError, images.InvalidImage) as e:
+                self.stderr.write(f'Skipping {user.uid}: {e}')
+                continue
+            with transaction.atomic():
+                images.save(user, picture)
+                user.save(update_fields=['profile_picture', 'profile_picture_key'])
+            processed += 1
+            after += max(len(data) for (size, fmt), data in picture.variants.items() if fmt == 'jpeg')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} profile pictures: {before / 1024:.0f} KiB of originals, '
+            f'largest JPEG variants total {after / 1024:.0f} KiB'
+        ))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from mood_tracker.models import User
+from mood_tracker import rollups, streaks
+
+
+class Command(BaseCommand):
+    """
+    Django management command to backfill the daily mood rollup table.
+
+    Recomputes every DailyMoodRollup row from the raw mood entries, along
+    with the streak state derived from them, either for all users or for
+    the users given with --user.
+
+    Usage:
+        python manage.py rebuild_rollups
+        python manage.py rebuild_rollups --user <uid> --user <uid>
+    """
+    help = 'Rebuild per-user daily mood rollups from raw mood entries'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            default=[],
+            help='UID of a user to rebuild (may be repeated). Defaults to all users.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to rebuild rollups.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        users = User.objects.order_by('uid')
+        if options['users']:
+            users = users.filter(uid__in=options['users'])
+            missing = set(options['users']) - set(users.values_list('uid', flat=True))
+            if missing:
+                raise CommandError(f'Unknown user(s): {", ".join(sorted(missing))}')
+
+        user_count = 0
+        day_count = 0
+        for uid in users.values_list('uid', flat=True).iterator():
+            day_count += rollups.rebuild_user(uid)
+            streaks.rebuild(uid)
+            user_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {day_count} daily rollups for {user_count} users')
+        )
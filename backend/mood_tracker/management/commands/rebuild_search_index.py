@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from mood_tracker.models import User
+from mood_tracker import search
+
+
+class Command(BaseCommand):
+    """
+    Django management command to rebuild the journal and mood note search index.
+
+    Re-indexes every journal and mood entry with notes, either for all users
+    or for the users given with --user. Needed after bulk imports, which
+    bypass the signals that normally keep the index in sync.
+
+    Usage:
+        python manage.py rebuild_search_index
+        python manage.py rebuild_search_index --user <uid> --user <uid>
+    """
+    help = 'Rebuild the full-text search index over journals and mood notes'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            default=[],
+            help='UID of a user to re-index (may be repeated). Defaults to all users.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to rebuild the search index.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        users = User.objects.order_by('uid')
+        if options['users']:
+            users = users.filter(uid__in=options['users'])
+            missing = set(options['users']) - set(users.values_list('uid', flat=True))
+            if missing:
+                raise CommandError(f'Unknown user(s): {", ".join(sorted(missing))}')
+
+        user_count = 0
+        document_count = 0
+        for uid in users.values_list('uid', flat=True).iterator():
+            document_count += search.rebuild_user(uid)
+            user_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {document_count} documents for {user_count} users '
+            f'with the {search.get_backend().name} backend'
+        ))
@@ -0,0 +1,114 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from mood_tracker.models import Reminder
+from mood_tracker.notifications import get_notifier
+from mood_tracker.scheduling import ReminderIndex, ReminderScheduler
+
+
+class Command(BaseCommand):
+    """
+    Django management command to send reminder push notifications.
+
+    Runs as a long-lived process by default: it indexes active reminders by
+    minute of the week, sleeps until the next bucket with reminders in it is
+    due, and dispatches that bucket through the configured notifier backend
+    (REMINDER_NOTIFIER). The index is rebuilt every --refresh seconds to pick
+    up new and changed reminders.
+
+    With --once it dispatches only the current minute and exits, loading
+    just the reminders set for that time, which suits a per-minute cron job.
+
+    Usage:
+        python manage.py run_reminder_scheduler
+        python manage.py run_reminder_scheduler --once
+    """
+    help = 'Dispatch due reminder notifications through the configured notifier'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Dispatch reminders due in the current minute and exit (for cron).',
+        )
+        parser.add_argument(
+            '--refresh',
+            type=int,
+            default=300,
+            help='Seconds between rebuilds of the reminder index.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to dispatch reminders.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        notifier = get_notifier()
+        try:
+            if options['once']:
+                self.run_once(notifier)
+            else:
+                self.run_forever(notifier, options['refresh'])
+        except KeyboardInterrupt:
+            self.stdout.write('Reminder scheduler stopped')
+        finally:
+            notifier.close()
+
+    def run_once(self, notifier):
+        """
+        Dispatch the reminders due in the current minute.
+
+        Args:
+            notifier: Notifier backend to send through.
+        """
+        now = timezone.localtime().replace(second=0, microsecond=0)
+        reminders = Reminder.objects.due_at(now.weekday(), now.time())
+        scheduler = ReminderScheduler(notifier, ReminderIndex.build(reminders))
+        sent = scheduler.tick(now)
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} reminder notifications'))
+        if hasattr(notifier, 'stats'):
+            stats = notifier.stats()
+            self.stdout.write(
+                f"{stats['requests']} push requests, {stats['retried']} retried, {stats['failed']} failed, "
+                f"{stats['pruned']} tokens pruned, p95 latency {stats['p95_ms']:.1f}ms"
+            )
+
+    def run_forever(self, notifier, refresh):
+        """
+        Dispatch reminders continuously, sleeping between due buckets.
+
+        Args:
+            notifier: Notifier backend to send through.
+            refresh: Seconds between rebuilds of the reminder index.
+        """
+        scheduler = ReminderScheduler(notifier)
+        rebuilt_at = time.monotonic()
+        self.stdout.write(f'Indexed {scheduler.index.size} reminder slots')
+
+        while True:
+            # The process sleeps for long stretches, so don't reuse a stale connection
+            close_old_connections()
+            if time.monotonic() - rebuilt_at >= refresh:
+                scheduler.index = ReminderIndex.build()
+                rebuilt_at = time.monotonic()
+
+            scheduler.tick()
+
+            # Sleep until the next bucket with reminders, but wake up for the index refresh
+            wait = scheduler.seconds_until_next()
+            until_refresh = max(refresh - (time.monotonic() - rebuilt_at), 0)
+            time.sleep(until_refresh if wait is None else min(wait, until_refresh))
@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from mood_tracker import jobs
+
+
+class Command(BaseCommand):
+    """
+    Django management command to run background jobs.
+
+    Runs a pool of worker threads that claim queued jobs (exports,
+    achievement recomputes and rollup rebuilds) in priority order and store
+    their results for the status endpoints. Several processes may run at
+    once; each claim is atomic. The main thread periodically requeues jobs
+    abandoned by dead workers and purges expired results. On SQLite, run
+    with MINDMATE_DB_PROFILE=production so workers wait for the write lock
+    instead of failing (and retrying) their jobs.
+
+    With --once it runs every ready job in the current thread and exits,
+    which suits a cron job or a one-off drain.
+
+    Usage:
+        python manage.py run_workers --threads 4
+        python manage.py run_workers --once
+    """
+    help = 'Run queued background jobs with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--threads', type=int, default=2, help='Worker threads in this process.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds an idle worker waits between polls.')
+        parser.add_argument(
+            '--maintenance',
+            type=int,
+            default=300,
+            help='Seconds between requeueing abandoned jobs and purging expired results.',
+        )
+        parser.add_argument('--once', action='store_true', help='Run ready jobs in this thread and exit.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to run jobs.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        if options['threads'] < 1:
+            raise CommandError('--threads must be at least 1')
+        if settings.JOBS_EAGER:
+            self.stderr.write('JOBS_EAGER is on, so new jobs run in the request and never reach the queue')
+
+        if options['once']:
+            self.maintain()
+            count = jobs.run_pending('once')
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} jobs'))
+            return
+
+        pool = jobs.WorkerPool(options['threads'], options['poll'])
+        pool.start()
+        self.stdout.write(f'Started {options["threads"]} workers as {pool.name}')
+        try:
+            while True:
+                self.maintain()
+                time.sleep(options['maintenance'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers after their current jobs')
+        finally:
+            pool.stop()
+            self.stdout.write(f'Workers stopped after {pool.processed} jobs')
+
+    def maintain(self):
+        """
+        Requeue abandoned jobs and purge expired ones.
+        """
+        requeued = jobs.requeue_stale()
+        purged = jobs.purge_finished()
+        if requeued or purged:
+            self.stdout.write(f'Requeued {requeued} abandoned jobs, purged {purged} expired jobs')
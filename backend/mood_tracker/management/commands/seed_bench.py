@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from mood_tracker.models import User
+from mood_tracker import seeding, rollups, streaks, achievements, search
+
+
+class Command(BaseCommand):
+    """
+    Django management command to generate a synthetic load-testing data set.
+
+    Bulk-inserts users with years of mood entries, journals of realistic
+    length and reminders, then rebuilds the derived rollups, streaks,
+    achievement unlocks and search index that signals would normally
+    maintain. Generated users share a uid prefix so the set can be
+    replaced with --clear.
+
+    Usage:
+        python manage.py seed_bench --users 100 --years 2 --entries-per-day 3
+        python manage.py seed_bench --clear --prefix bench
+    """
+    help = 'Bulk-generate synthetic users, mood entries, journals and reminders for benchmarks'
+
+    def add_arguments(self, parser):
+        """
+        Register command line options.
+
+        Args:
+            parser: argparse parser for the command.
+        """
+        parser.add_argument('--users', type=int, default=10, help='Number of users to generate.')
+        parser.add_argument('--years', type=float, default=1, help='Years of mood history per user.')
+        parser.add_argument('--entries-per-day', type=float, default=2, help='Average mood entries per day.')
+        parser.add_argument('--journals', type=int, default=200, help='Journals per user.')
+        parser.add_argument('--reminders', type=int, default=5, help='Reminders per user.')
+        parser.add_argument('--prefix', default='bench', help='Prefix for generated user identifiers.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data sets.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT statement.')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete previously generated users with the same prefix first.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution to generate the data set.
+
+        Args:
+            *args: Variable length argument list (unused)
+            **options: Parsed command line options.
+
+        Returns:
+            None
+        """
+        prefix = options['prefix']
+        existing = User.objects.filter(uid__startswith=f'{prefix}-')
+        if options['clear']:
+            with transaction.atomic():
+                deleted = seeding.delete_users(existing.values_list('pk', flat=True))
+            self.stdout.write(f'Deleted {deleted} existing "{prefix}" users')
+        elif existing.exists():
+            raise CommandError(f'Users with prefix "{prefix}" already exist; use --clear to replace them')
+
+        days = max(int(options['years'] * 365), 1)
+        entries_per_user = int(days * options['entries_per_day'])
+
+        with transaction.atomic():
+            users = seeding.seed(
+                users=options['users'],
+                entries_per_user=entries_per_user,
+                journals_per_user=options['journals'],
+                reminders_per_user=options['reminders'],
+                days=days,
+                prefix=prefix,
+                seed_value=options['seed'],
+                batch_size=options['batch_size'],
+            )
+
+            # bulk_create bypasses signals, so rebuild the derived data explicitly
+            uids = [user.uid for user in users]
+            for uid in uids:
+                rollups.rebuild_user(uid)
+                streaks.rebuild(uid)
+                search.rebuild_user(uid)
+            achievements.evaluate_all(uids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users with {entries_per_user} mood entries, '
+            f'{options["journals"]} journals and {options["reminders"]} reminders each'
+        ))
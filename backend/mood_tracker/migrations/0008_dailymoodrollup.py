@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Build a rollup row for every user and day that already has mood entries.
+    """
+    MoodEntry = apps.get_model('mood_tracker', 'MoodEntry')
+    DailyMoodRollup = apps.get_model('mood_tracker', 'DailyMoodRollup')
+    rows = MoodEntry.objects.values('user_id', 'date', 'mood').annotate(
+        count=models.Count('id'),
+        total=models.Sum('intensity'),
+        low=models.Min('intensity'),
+        high=models.Max('intensity'),
+    ).order_by()
+
+    per_day = {}
+    for row in rows.iterator():
+        per_day.setdefault((row['user_id'], row['date']), []).append(row)
+
+    DailyMoodRollup.objects.bulk_create(
+        [
+            DailyMoodRollup(
+                user_id=user_id,
+                date=date,
+                entry_count=sum(row['count'] for row in day_rows),
+                intensity_sum=sum(row['total'] for row in day_rows),
+                intensity_min=min(row['low'] for row in day_rows),
+                intensity_max=max(row['high'] for row in day_rows),
+                mood_counts={row['mood']: row['count'] for row in day_rows},
+            )
+            for (user_id, date), day_rows in per_day.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0007_achievement_userachievement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMoodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('intensity_sum', models.IntegerField(default=0)),
+                ('intensity_min', models.IntegerField(blank=True, null=True)),
+                ('intensity_max', models.IntegerField(blank=True, null=True)),
+                ('mood_counts', models.JSONField(default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_rollups', to='mood_tracker.user')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Days of history kept in the activity bitmap; matches streaks.ACTIVITY_WINDOW_DAYS
+ACTIVITY_WINDOW_DAYS = 30
+
+
+def backfill_streaks(apps, schema_editor):
+    """
+    Build the streak state of every user with mood history from the rollups.
+    """
+    DailyMoodRollup = apps.get_model('mood_tracker', 'DailyMoodRollup')
+    UserStreak = apps.get_model('mood_tracker', 'UserStreak')
+
+    dates_by_user = {}
+    for user_id, date in DailyMoodRollup.objects.order_by('user_id', 'date').values_list('user_id', 'date').iterator():
+        dates_by_user.setdefault(user_id, []).append(date)
+
+    streaks = []
+    for user_id, dates in dates_by_user.items():
+        longest = 0
+        run = 0
+        previous = None
+        for date in dates:
+            run = run + 1 if previous is not None and (date - previous).days == 1 else 1
+            longest = max(longest, run)
+            previous = date
+
+        bitmap = 0
+        for date in dates:
+            offset = (previous - date).days
+            if offset < ACTIVITY_WINDOW_DAYS:
+                bitmap |= 1 << offset
+
+        streaks.append(UserStreak(
+            user_id=user_id,
+            current_streak=run,
+            longest_streak=longest,
+            last_active_date=previous,
+            activity_bitmap=bitmap,
+        ))
+    UserStreak.objects.bulk_create(streaks, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0008_dailymoodrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStreak',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='streak', serialize=False, to='mood_tracker.user')),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_active_date', models.DateField(blank=True, null=True)),
+                ('activity_bitmap', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0009_userstreak'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['user', 'created_at'], name='journal_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moodentry',
+            index=models.Index(fields=['user', 'date', 'time'], name='moodentry_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['user', 'is_active', 'time'], name='reminder_user_active_time_idx'),
+        ),
+    ]
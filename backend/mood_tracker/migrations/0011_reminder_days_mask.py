@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+def days_to_mask(apps, schema_editor):
+    """
+    Convert comma-separated weekday strings such as "0,1,3" into bitmasks.
+    """
+    Reminder = apps.get_model('mood_tracker', 'Reminder')
+    for reminder in Reminder.objects.only('id', 'days').iterator():
+        mask = 0
+        for part in (reminder.days or '').split(','):
+            part = part.strip()
+            if part.isdigit() and int(part) < 7:
+                mask |= 1 << int(part)
+        reminder.days_mask = mask
+        reminder.save(update_fields=['days_mask'])
+
+
+def mask_to_days(apps, schema_editor):
+    """
+    Convert weekday bitmasks back into comma-separated strings.
+    """
+    Reminder = apps.get_model('mood_tracker', 'Reminder')
+    for reminder in Reminder.objects.only('id', 'days_mask').iterator():
+        reminder.days = ','.join(str(day) for day in range(7) if reminder.days_mask & (1 << day))
+        reminder.save(update_fields=['days'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0010_user_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='days_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='reminder',
+            name='days',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(days_to_mask, mask_to_days),
+        migrations.RemoveField(
+            model_name='reminder',
+            name='days',
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['time', 'days_mask'], name='reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:10
+
+import datetime
+import hashlib
+import uuid
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SEARCH_TABLE = 'mood_tracker_search'
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create and populate the FTS5 search table on SQLite builds that support it.
+
+    Other databases, and SQLite without FTS5, fall back to the in-memory
+    search backend, so nothing is created for them.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+                'owner, kind, title, body, object_id UNINDEXED, created_at UNINDEXED, '
+                "tokenize = 'porter unicode61')"
+            )
+        except OperationalError:
+            return
+
+        def insert(kind, object_id, user_id, title, body, created_at):
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} '
+                '(rowid, owner, kind, title, body, object_id, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                [
+                    uuid.UUID(str(object_id)).int >> 65,
+                    'u' + hashlib.sha1(str(user_id).encode()).hexdigest(),
+                    kind,
+                    title or '',
+                    body or '',
+                    str(object_id),
+                    created_at.isoformat(),
+                ],
+            )
+
+        Journal = apps.get_model('mood_tracker', 'Journal')
+        for journal in Journal.objects.iterator():
+            insert('journal', journal.pk, journal.user_id, journal.title, journal.content, journal.created_at)
+
+        MoodEntry = apps.get_model('mood_tracker', 'MoodEntry')
+        mood_names = dict(MoodEntry._meta.get_field('mood').choices)
+        for entry in MoodEntry.objects.exclude(notes__isnull=True).exclude(notes='').iterator():
+            insert(
+                'mood', entry.pk, entry.user_id, mood_names.get(entry.mood, entry.mood), entry.notes,
+                datetime.datetime.combine(entry.date, entry.time),
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0011_reminder_days_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
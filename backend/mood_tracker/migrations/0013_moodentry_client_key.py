@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moodentry',
+            name='client_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='moodentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_key__isnull', False)), fields=('user', 'client_key'), name='moodentry_user_client_key_uniq'),
+        ),
+    ]
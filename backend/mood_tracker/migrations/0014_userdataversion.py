@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    """
+    Give every existing user a data version row.
+    """
+    User = apps.get_model('mood_tracker', 'User')
+    UserDataVersion = apps.get_model('mood_tracker', 'UserDataVersion')
+    UserDataVersion.objects.bulk_create(
+        [UserDataVersion(user_id=uid) for uid in User.objects.values_list('uid', flat=True).iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0013_moodentry_client_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to='mood_tracker.user')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
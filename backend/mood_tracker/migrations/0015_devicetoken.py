@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_tokens(apps, schema_editor):
+    """
+    Register each user's saved FCM token as a device.
+    """
+    User = apps.get_model('mood_tracker', 'User')
+    DeviceToken = apps.get_model('mood_tracker', 'DeviceToken')
+    # Tokens are unique per device, so a token saved by two users goes to one of them
+    tokens = dict(User.objects.exclude(fcm_token__isnull=True).exclude(fcm_token='').values_list('fcm_token', 'uid'))
+    DeviceToken.objects.bulk_create(
+        [DeviceToken(token=token, user_id=uid) for token, uid in tokens.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0014_userdataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to='mood_tracker.user')),
+            ],
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='fcm_token',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0016_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_key',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
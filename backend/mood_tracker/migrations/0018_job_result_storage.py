@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:58
+
+import mood_tracker.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mood_tracker', '0017_user_profile_picture_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='result_file',
+            field=models.FileField(blank=True, storage=mood_tracker.models.JobResultStorage(), upload_to='jobs/'),
+        ),
+    ]
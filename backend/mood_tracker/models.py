@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+import os
 import uuid
 
 # Create your models here.
@@ -15,8 +19,49 @@ class User(models.Model):
     username = models.CharField(max_length=100, unique=True)
     password = models.CharField(max_length=128, null=True)  # Store hashed password
     created_at = models.DateTimeField(auto_now_add=True)
-    fcm_token = models.CharField(max_length=255, blank=True, null=True)
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)  # Kept only if PROFILE_PICTURE_KEEP_ORIGINAL
+    profile_picture_key = models.CharField(max_length=64, blank=True)  # Content hash naming the resized variants
+    
+    @property
+    def is_authenticated(self):
+        """
+        Mark stored users as authenticated for DRF permission checks.
+        
+        Returns:
+            bool: Always True for a persisted user.
+        """
+        return True
+    
+    @property
+    def is_anonymous(self):
+        """
+        Mark stored users as non-anonymous.
+        
+        Returns:
+            bool: Always False for a persisted user.
+        """
+        return False
+    
+    @property
+    def profile_picture_urls(self):
+        """
+        URLs of the resized profile picture variants.
+        
+        Pictures uploaded before variants existed fall back to the
+        original for every size until process_profile_pictures has run.
+        
+        Returns:
+            dict: Format ('webp' or 'jpeg') to size (as a string) to URL,
+                or None without a picture.
+        """
+        from . import images
+        
+        if self.profile_picture_key:
+            return images.variant_urls(self.profile_picture_key)
+        if self.profile_picture:
+            url = self.profile_picture.url
+            return {fmt: {str(size): url for size in images.sizes()} for fmt in images.VARIANT_FORMATS}
+        return None
     
     def __str__(self):
         """
@@ -27,6 +72,102 @@ class User(models.Model):
         """
         return self.username
 
+class DeviceToken(models.Model):
+    """
+    Model representing a device registered for push notifications.
+    
+    A user gets one row per browser or device they enable notifications on.
+    Tokens are unique, so a device that signs in as another user moves to
+    that user, and rows are deleted when the push provider reports the
+    token as unregistered.
+    """
+    token = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='device_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        """
+        Return string representation of the device token.
+        
+        Returns:
+            str: The user's username and the start of the token.
+        """
+        return f"{self.user.username}'s device {self.token[:12]}"
+
+def _summary(total_entries, active_days, intensity_sum, intensity_min, intensity_max, mood_counts):
+    """
+    Build the summary dict shared by the mood entry and rollup querysets.
+    
+    Args:
+        total_entries: Number of mood entries.
+        active_days: Number of distinct days with entries.
+        intensity_sum: Sum of the entries' intensities.
+        intensity_min: Lowest intensity, or None.
+        intensity_max: Highest intensity, or None.
+        mood_counts: dict mapping mood key to number of entries.
+        
+    Returns:
+        dict: Total entries, active days, intensity average/min/max and
+            per-mood counts (moods without entries left out) ordered by
+            the model's mood choices.
+    """
+    return {
+        'total_entries': total_entries,
+        'active_days': active_days,
+        'average_intensity': intensity_sum / total_entries if total_entries else 0,
+        'min_intensity': intensity_min,
+        'max_intensity': intensity_max,
+        'mood_counts': {
+            key: mood_counts[key] for key, _ in MoodEntry.MOOD_CHOICES if mood_counts.get(key)
+        },
+    }
+
+
+class MoodEntryQuerySet(models.QuerySet):
+    """
+    QuerySet with aggregate lookups for mood entries.
+    """
+    
+    def summary(self, start_date=None, end_date=None):
+        """
+        Summarize the entries in this queryset in a single query.
+        
+        Every figure, including one filtered COUNT per mood, is computed
+        by the same aggregate SELECT rather than a query per mood.
+        
+        Args:
+            start_date: Optional first date of the range.
+            end_date: Optional last date of the range.
+            
+        Returns:
+            dict: See _summary.
+        """
+        queryset = self
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        
+        moods = {f'mood_{key}': models.Count('pk', filter=models.Q(mood=key)) for key, _ in MoodEntry.MOOD_CHOICES}
+        row = queryset.order_by().aggregate(
+            total_entries=models.Count('pk'),
+            active_days=models.Count('date', distinct=True),
+            intensity_sum=models.Sum('intensity'),
+            intensity_min=models.Min('intensity'),
+            intensity_max=models.Max('intensity'),
+            **moods,
+        )
+        return _summary(
+            row['total_entries'],
+            row['active_days'],
+            row['intensity_sum'] or 0,
+            row['intensity_min'],
+            row['intensity_max'],
+            {key: row[f'mood_{key}'] for key, _ in MoodEntry.MOOD_CHOICES},
+        )
+
+
 class MoodEntry(models.Model):
     """
     Model representing a user's mood entry.
@@ -55,10 +196,23 @@ class MoodEntry(models.Model):
     mood = models.CharField(max_length=20, choices=MOOD_CHOICES)
     intensity = models.IntegerField(default=5)  # Scale of 1-10
     notes = models.TextField(blank=True, null=True)
+    client_key = models.CharField(max_length=64, blank=True, null=True)  # Idempotency key supplied by bulk uploads
+    
+    objects = MoodEntryQuerySet.as_manager()
     
     class Meta:
         ordering = ['-date', '-time']
         verbose_name_plural = 'Mood Entries'
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='moodentry_user_date_time_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'client_key'],
+                condition=models.Q(client_key__isnull=False),
+                name='moodentry_user_client_key_uniq',
+            ),
+        ]
     
     def __str__(self):
         """
@@ -69,6 +223,179 @@ class MoodEntry(models.Model):
         """
         return f"{self.user.username}'s mood on {self.date}"
 
+class DailyMoodRollupQuerySet(models.QuerySet):
+    """
+    QuerySet with aggregate lookups for daily mood rollups.
+    """
+    
+    def summary(self, start_date=None, end_date=None):
+        """
+        Summarize the days in this queryset with a single query.
+        
+        Returns the same figures as MoodEntryQuerySet.summary while
+        reading one row per day instead of one per entry.
+        
+        Args:
+            start_date: Optional first date of the range.
+            end_date: Optional last date of the range.
+            
+        Returns:
+            dict: See _summary.
+        """
+        return _rollup_summary(self._summary_rows(start_date, end_date))
+    
+    async def asummary(self, start_date=None, end_date=None):
+        """
+        Async version of summary for async views.
+        
+        Args:
+            start_date: Optional first date of the range.
+            end_date: Optional last date of the range.
+            
+        Returns:
+            dict: See _summary.
+        """
+        return _rollup_summary([row async for row in self._summary_rows(start_date, end_date)])
+    
+    def _summary_rows(self, start_date, end_date):
+        """
+        Return the per-day figures summary folds together.
+        
+        Args:
+            start_date: Optional first date of the range.
+            end_date: Optional last date of the range.
+            
+        Returns:
+            QuerySet: Tuples of entry_count, intensity_sum, intensity_min,
+                intensity_max and mood_counts.
+        """
+        queryset = self
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        return queryset.order_by().values_list(
+            'entry_count', 'intensity_sum', 'intensity_min', 'intensity_max', 'mood_counts'
+        )
+
+
+def _rollup_summary(rows):
+    """
+    Fold per-day rollup figures into a summary.
+    
+    Args:
+        rows: Iterable of (entry_count, intensity_sum, intensity_min,
+            intensity_max, mood_counts) tuples, one per day.
+        
+    Returns:
+        dict: See _summary.
+    """
+    total_entries = 0
+    active_days = 0
+    intensity_sum = 0
+    intensity_min = None
+    intensity_max = None
+    mood_counts = {}
+    for count, day_sum, day_min, day_max, day_moods in rows:
+        active_days += 1
+        total_entries += count
+        intensity_sum += day_sum
+        intensity_min = day_min if intensity_min is None else min(intensity_min, day_min)
+        intensity_max = day_max if intensity_max is None else max(intensity_max, day_max)
+        for mood, mood_count in day_moods.items():
+            mood_counts[mood] = mood_counts.get(mood, 0) + mood_count
+    
+    return _summary(total_entries, active_days, intensity_sum, intensity_min, intensity_max, mood_counts)
+
+
+class DailyMoodRollup(models.Model):
+    """
+    Model representing a precomputed per-user, per-day mood summary.
+    
+    Rows are maintained incrementally whenever a MoodEntry is created,
+    updated or deleted, so aggregate views can scale with the number of
+    days in a range rather than the number of raw entries.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_rollups')
+    date = models.DateField()
+    entry_count = models.PositiveIntegerField(default=0)
+    intensity_sum = models.IntegerField(default=0)
+    intensity_min = models.IntegerField(null=True, blank=True)
+    intensity_max = models.IntegerField(null=True, blank=True)
+    mood_counts = models.JSONField(default=dict)  # Maps mood key to number of entries (e.g., {"happy": 2})
+    
+    objects = DailyMoodRollupQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+    
+    @property
+    def average_intensity(self):
+        """
+        Return the mean intensity of the day's entries.
+        
+        Returns:
+            float: Average intensity, or 0 when the day has no entries.
+        """
+        if not self.entry_count:
+            return 0
+        return self.intensity_sum / self.entry_count
+    
+    def __str__(self):
+        """
+        Return string representation of the daily rollup.
+        
+        Returns:
+            str: A formatted string showing the user, date and entry count.
+        """
+        return f"{self.user.username}'s mood rollup on {self.date} ({self.entry_count} entries)"
+
+class UserStreak(models.Model):
+    """
+    Model representing a user's precomputed mood tracking streak state.
+    
+    Stores the current and longest streaks, the last day with a mood entry
+    and a bitmap of recent activity so streak and consistency figures can
+    be read in constant time instead of walking the user's history.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='streak')
+    current_streak = models.PositiveIntegerField(default=0)  # Consecutive days ending on last_active_date
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)
+    activity_bitmap = models.BigIntegerField(default=0)  # Bit n set if active n days before last_active_date
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        """
+        Return string representation of the streak.
+        
+        Returns:
+            str: A formatted string showing the user and current streak.
+        """
+        return f"{self.user.username}'s streak ({self.current_streak} days)"
+
+class UserDataVersion(models.Model):
+    """
+    Model representing a version stamp for everything a user has written.
+    
+    The version is bumped on every mood entry, journal, reminder and
+    unlocked achievement write, so read views can answer conditional GETs
+    with one primary key lookup instead of recomputing their response.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        """
+        Return string representation of the data version.
+        
+        Returns:
+            str: A formatted string showing the user and version.
+        """
+        return f"{self.user.username}'s data version {self.version}"
+
 class Journal(models.Model):
     """
     Model representing a user's journal entry.
@@ -86,6 +413,9 @@ class Journal(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='journal_user_created_idx'),
+        ]
     
     def __str__(self):
         """
@@ -96,6 +426,71 @@ class Journal(models.Model):
         """
         return f"{self.user.username}'s journal on {self.created_at.date()}"
 
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def weekdays_to_mask(weekdays):
+    """
+    Pack weekday numbers into a bitmask.
+    
+    Args:
+        weekdays: Iterable of weekday numbers (Monday is 0).
+        
+    Returns:
+        int: Bitmask with bit n set for weekday n.
+    """
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << int(weekday)
+    return mask
+
+
+def mask_to_weekdays(mask):
+    """
+    Unpack a weekday bitmask into weekday numbers.
+    
+    Args:
+        mask: Bitmask with bit n set for weekday n.
+        
+    Returns:
+        list: Sorted weekday numbers (Monday is 0).
+    """
+    return [weekday for weekday in range(7) if mask & (1 << weekday)]
+
+
+class ReminderQuerySet(models.QuerySet):
+    """
+    QuerySet with scheduling lookups for reminders.
+    """
+    
+    def due_at(self, weekday, time):
+        """
+        Filter to active reminders that fire on a weekday at a given minute.
+        
+        The weekday test is an IN over the 64 masks that contain the
+        weekday's bit, so the whole lookup resolves from the partial
+        (time, days_mask) index on active reminders without reading
+        table rows.
+        
+        Args:
+            weekday: Weekday number (Monday is 0).
+            time: Time of day; reminders anywhere in its minute match.
+            
+        Returns:
+            QuerySet: Matching reminders.
+        """
+        start = time.replace(second=0, microsecond=0)
+        queryset = self.filter(
+            is_active=True,
+            time__gte=start,
+            days_mask__in=Reminder.masks_for_weekday(weekday),
+        )
+        if start.hour < 23 or start.minute < 59:
+            next_minute = start.hour * 60 + start.minute + 1
+            queryset = queryset.filter(time__lt=start.replace(hour=next_minute // 60, minute=next_minute % 60))
+        return queryset
+
+
 class Reminder(models.Model):
     """
     Model representing a user's mood tracking reminder.
@@ -106,9 +501,17 @@ class Reminder(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminders')
     time = models.TimeField()
-    days = models.CharField(max_length=100)  # Stored as comma-separated values (e.g., "0,1,3" for Monday, Tuesday, Thursday)
+    days_mask = models.PositiveSmallIntegerField(default=0)  # Bit n set for weekday n (Monday is bit 0)
     is_active = models.BooleanField(default=True)
     
+    objects = ReminderQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_active', 'time'], name='reminder_user_active_time_idx'),
+            models.Index(fields=['time', 'days_mask'], condition=models.Q(is_active=True), name='reminder_due_idx'),
+        ]
+    
     def __str__(self):
         """
         Return string representation of the reminder.
@@ -117,6 +520,54 @@ class Reminder(models.Model):
             str: A formatted string showing the user and time of the reminder.
         """
         return f"{self.user.username}'s reminder at {self.time}"
+    
+    @staticmethod
+    def masks_for_weekday(weekday):
+        """
+        Return every day mask that includes a weekday.
+        
+        Args:
+            weekday: Weekday number (Monday is 0).
+            
+        Returns:
+            list: The 64 seven-bit masks with the weekday's bit set.
+        """
+        bit = 1 << weekday
+        return [mask for mask in range(128) if mask & bit]
+    
+    @property
+    def weekdays(self):
+        """
+        Weekday numbers the reminder fires on (Monday is 0).
+        
+        Returns:
+            list: Sorted weekday numbers.
+        """
+        return mask_to_weekdays(self.days_mask)
+    
+    @weekdays.setter
+    def weekdays(self, value):
+        self.days_mask = weekdays_to_mask(value)
+    
+    def fires_on(self, weekday):
+        """
+        Check whether the reminder fires on a weekday.
+        
+        Args:
+            weekday: Weekday number (Monday is 0).
+            
+        Returns:
+            bool: True if the weekday's bit is set.
+        """
+        return bool(self.days_mask & (1 << weekday))
+    
+    monday = property(lambda self: self.fires_on(0))
+    tuesday = property(lambda self: self.fires_on(1))
+    wednesday = property(lambda self: self.fires_on(2))
+    thursday = property(lambda self: self.fires_on(3))
+    friday = property(lambda self: self.fires_on(4))
+    saturday = property(lambda self: self.fires_on(5))
+    sunday = property(lambda self: self.fires_on(6))
 
 class Achievement(models.Model):
     """
@@ -179,3 +630,130 @@ class UserAchievement(models.Model):
             str: A formatted string showing the user and achievement name.
         """
         return f"{self.user.username} - {self.achievement.name}"
+
+@deconstructible
+class JobResultStorage(FileSystemStorage):
+    """
+    Private storage for job result files under JOB_RESULTS_ROOT.
+    
+    Results such as exports hold the user's journals and notes, so they
+    live outside MEDIA_ROOT, have no public URL and are only served by the
+    views that check the job belongs to the requesting user.
+    """
+    
+    def __init__(self):
+        super().__init__()
+    
+    @property
+    def base_location(self):
+        return settings.JOB_RESULTS_ROOT
+    
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+    
+    def url(self, name):
+        raise ValueError('Job results have no public URL; serve them through the download views')
+
+class JobQuerySet(models.QuerySet):
+    """
+    QuerySet for background jobs with helpers for the worker loop.
+    """
+    
+    def active(self):
+        """
+        Filter to jobs that are waiting or running.
+        
+        Returns:
+            JobQuerySet: Jobs a duplicate would be merged into.
+        """
+        return self.filter(status__in=Job.ACTIVE_STATUSES)
+    
+    def ready(self, now=None):
+        """
+        Filter to pending jobs that may run now, highest priority first.
+        
+        Args:
+            now: Optional current time, defaults to now.
+            
+        Returns:
+            JobQuerySet: Claimable jobs in the order workers take them.
+        """
+        return self.filter(status=Job.PENDING, run_after__lte=now or timezone.now()).order_by('-priority', 'run_after')
+
+class Job(models.Model):
+    """
+    Model representing a unit of background work, such as a data export.
+    
+    Jobs are claimed by run_workers in priority order and keep their result
+    (and, for exports, the generated file) for polling. A dedup key makes
+    at most one waiting or running job per key, so repeating a request
+    returns the job already queued instead of doing the work twice.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)  # Higher runs first
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/', storage=JobResultStorage(), blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = JobQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_after'],
+                condition=models.Q(status='pending'),
+                name='job_ready_idx',
+            ),
+            models.Index(fields=['user', '-created_at'], name='job_user_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='job_active_dedup_key',
+            ),
+        ]
+    
+    def __str__(self):
+        """
+        Return string representation of the job.
+        
+        Returns:
+            str: The job's kind, status and id.
+        """
+        return f"{self.kind} job {self.id} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        """
+        Whether the job has stopped running for good.
+        
+        Returns:
+            bool: True once the job is done or has failed.
+        """
+        return self.status in (self.DONE, self.FAILED)
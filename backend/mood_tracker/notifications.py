@@ -0,0 +1,180 @@
+"""
+Pluggable notifier backends for reminder push notifications.
+
+The reminder scheduler hands batches of Notification objects to the backend
+named by the REMINDER_NOTIFIER setting (a dotted path, constructed with the
+keyword arguments in REMINDER_NOTIFIER_OPTIONS). LogNotifier and
+FileNotifier are local stand-ins for development. PushNotifier delivers to
+every registered device through the batched pipeline in push, with a
+configurable transport; FCMNotifier is PushNotifier over Firebase Cloud
+Messaging.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .push import PushDispatcher, PushMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFIER = 'mood_tracker.notifications.LogNotifier'
+
+REMINDER_TITLE = 'Time to check in'
+REMINDER_BODY = 'How are you feeling right now? Take a moment to log your mood.'
+
+
+class Notification:
+    """
+    A single reminder notification addressed to every device of one user.
+    """
+    __slots__ = ('reminder_id', 'user_id', 'tokens', 'title', 'body', 'scheduled_for')
+
+    def __init__(self, reminder_id, user_id, tokens, scheduled_for, title=REMINDER_TITLE, body=REMINDER_BODY):
+        self.reminder_id = reminder_id
+        self.user_id = user_id
+        self.tokens = list(tokens)
+        self.scheduled_for = scheduled_for
+        self.title = title
+        self.body = body
+
+    def as_dict(self):
+        """
+        Return the notification as a JSON-serializable dict.
+
+        Returns:
+            dict: Notification fields, with ids and times as strings.
+        """
+        return {
+            'reminder_id': str(self.reminder_id),
+            'user_id': self.user_id,
+            'tokens': self.tokens,
+            'title': self.title,
+            'body': self.body,
+            'scheduled_for': self.scheduled_for.isoformat(),
+        }
+
+
+class BaseNotifier:
+    """
+    Base class for notifier backends.
+    """
+
+    def send(self, notifications):
+        """
+        Deliver a batch of notifications.
+
+        Args:
+            notifications: List of Notification objects.
+
+        Returns:
+            int: Number of notifications delivered.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release any resources held by the backend.
+        """
+
+
+class LogNotifier(BaseNotifier):
+    """
+    Writes each notification to the mood_tracker.notifications logger.
+    """
+
+    def send(self, notifications):
+        for notification in notifications:
+            record = notification.as_dict()
+            # Device tokens are credentials; only note how many there are
+            record['tokens'] = len(record['tokens'])
+            logger.info('Reminder notification', extra=record)
+        return len(notifications)
+
+
+class FileNotifier(BaseNotifier):
+    """
+    Appends notifications to a file as newline-delimited JSON.
+    """
+
+    def __init__(self, path='reminder_notifications.ndjson'):
+        self.path = path
+        self._file = None
+
+    def send(self, notifications):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.writelines(json.dumps(notification.as_dict()) + '\n' for notification in notifications)
+        self._file.flush()
+        return len(notifications)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PushNotifier(BaseNotifier):
+    """
+    Sends notifications to every device of each user through a PushDispatcher.
+
+    Reminders due in the same minute share one payload, so the dispatcher
+    merges their devices into multicasts of up to 500 tokens. send() waits
+    until the batch is delivered, then prunes unregistered tokens and logs
+    the dispatcher's counters.
+    """
+
+    def __init__(self, transport='mood_tracker.push.FakeTransport', transport_options=None, **dispatcher_options):
+        transport_class = import_string(transport)
+        self.dispatcher = PushDispatcher(transport_class(**(transport_options or {})), **dispatcher_options)
+
+    def send(self, notifications):
+        delivered = self.dispatcher.stats.snapshot()['delivered']
+        for notification in notifications:
+            self.dispatcher.submit(PushMessage(
+                notification.tokens,
+                notification.title,
+                notification.body,
+                {'type': 'reminder'},
+            ))
+        self.dispatcher.flush()
+        stats = self.stats()
+        logger.info('Push delivery stats', extra=stats)
+        return stats['delivered'] - delivered
+
+    def stats(self):
+        """
+        Return the dispatcher's throughput and latency counters.
+
+        Returns:
+            dict: See PushStats.snapshot.
+        """
+        return self.dispatcher.stats.snapshot()
+
+    def close(self):
+        self.dispatcher.close()
+
+
+class FCMNotifier(PushNotifier):
+    """
+    Sends notifications through Firebase Cloud Messaging.
+
+    Requires firebase-admin and application default credentials (for
+    example GOOGLE_APPLICATION_CREDENTIALS). Users without a registered
+    device are skipped.
+    """
+
+    def __init__(self, **dispatcher_options):
+        super().__init__(transport='mood_tracker.push.FCMTransport', **dispatcher_options)
+
+
+def get_notifier():
+    """
+    Build the notifier backend configured in settings.
+
+    Returns:
+        BaseNotifier: Instance of REMINDER_NOTIFIER, defaulting to LogNotifier.
+    """
+    notifier_class = import_string(getattr(settings, 'REMINDER_NOTIFIER', DEFAULT_NOTIFIER))
+    return notifier_class(**getattr(settings, 'REMINDER_NOTIFIER_OPTIONS', {}))
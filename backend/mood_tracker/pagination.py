@@ -0,0 +1,237 @@
+"""
+Keyset (cursor) pagination for mood entries and journals.
+
+Instead of OFFSET, each page starts strictly after the sort key of the
+last row on the previous page, encoded in an opaque cursor. The database
+seeks straight to that key through the per-user indexes, so fetching page
+1000 costs the same as fetching page 1, and rows written while a user is
+scrolling never shift items between pages.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+MOOD_ENTRY_ORDERING = ('-date', '-time', '-id')
+JOURNAL_ORDERING = ('-created_at', '-id')
+
+CURSOR_PARAM = 'cursor'
+
+# Query parameter asking a server-rendered list for just the next page's rows
+PARTIAL_PARAM = 'partial'
+
+
+def encode_cursor(values):
+    """
+    Encode a row's sort key as an opaque URL-safe cursor.
+
+    Args:
+        values: Sort key values, in ordering order.
+
+    Returns:
+        str: Cursor token.
+    """
+    payload = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """
+    Decode a cursor back into typed sort key values.
+
+    Args:
+        token: Cursor token from encode_cursor.
+        model: Model class the cursor was issued for.
+        ordering: Ordering the cursor was issued for.
+
+    Returns:
+        list: Sort key values converted to each field's Python type.
+
+    Raises:
+        ValueError: If the token is malformed or does not fit the ordering.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor')
+
+    fields = [model._meta.get_field(name.lstrip('-')) for name in ordering]
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter for rows that sort strictly after a key.
+
+    For ordering (a, b, c) this is the expanded row comparison
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), with < in
+    place of > for descending fields. The redundant a >= x bound lets the
+    database seek into the index at the key instead of scanning up to it.
+
+    Args:
+        ordering: Field names, prefixed with '-' for descending order.
+        values: Sort key of the last row already returned.
+
+    Returns:
+        Q: Filter selecting the rows after the key.
+    """
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+
+    first = ordering[0]
+    bound = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': values[0]})
+    return bound & condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """
+    Fetch one page of a queryset by keyset.
+
+    Args:
+        queryset: Queryset to page through.
+        ordering: Unique ordering, ending in the primary key.
+        cursor: Cursor from the previous page, or None for the first page.
+        page_size: Rows per page.
+
+    Returns:
+        tuple: (list of rows, cursor for the next page or None).
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
+
+
+def next_page_url(request, cursor):
+    """
+    Build the URL of the next page of a server-rendered list.
+
+    Args:
+        request: Django HttpRequest for the current page.
+        cursor: Cursor for the next page, or None.
+
+    Returns:
+        str: URL with the cursor replaced, or None if there is no next page.
+    """
+    if cursor is None:
+        return None
+    url = remove_query_param(request.get_full_path(), PARTIAL_PARAM)
+    return replace_query_param(url, CURSOR_PARAM, cursor)
+
+
+def paginate(request, queryset, ordering, page_size):
+    """
+    Fetch the page of a server-rendered list named by the request's cursor.
+
+    A missing or invalid cursor (for example a stale bookmark) shows the
+    first page rather than an error.
+
+    Args:
+        request: Django HttpRequest, optionally with a ``cursor`` parameter.
+        queryset: Queryset to page through.
+        ordering: Unique ordering, ending in the primary key.
+        page_size: Rows per page.
+
+    Returns:
+        tuple: (list of rows, URL of the next page or None).
+    """
+    try:
+        rows, cursor = keyset_page(queryset, ordering, request.GET.get(CURSOR_PARAM), page_size)
+    except ValueError:
+        rows, cursor = keyset_page(queryset, ordering, None, page_size)
+    return rows, next_page_url(request, cursor)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination that pages by keyset on the view's ``keyset_ordering``.
+
+    Responses contain ``next`` (the URL of the following page, or null)
+    and ``results``.
+    """
+    page_size = 20
+    cursor_query_param = CURSOR_PARAM
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_cursor = keyset_page(
+                queryset,
+                view.keyset_ordering,
+                request.query_params.get(self.cursor_query_param),
+                self.page_size,
+            )
+        except ValueError:
+            raise NotFound('Invalid cursor')
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CursorOrPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+
+    Requests that carry a ``cursor`` parameter (an empty one starts at the
+    first page) are paged by keyset on the view's ``keyset_ordering``, so
+    infinite-scrolling clients get constant-cost pages while existing
+    page-number clients keep working unchanged.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if CURSOR_PARAM in request.query_params and getattr(view, 'keyset_ordering', None):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
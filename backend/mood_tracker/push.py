@@ -0,0 +1,440 @@
+"""
+Batched push delivery to registered devices.
+
+A PushDispatcher takes PushMessage objects on a bounded queue and a pool of
+worker threads sends them through a transport. Messages with the same
+payload are merged, so every device due the same reminder is addressed by
+one multicast request of up to MAX_TOKENS tokens instead of one request per
+device. Transient failures are retried with exponential backoff; tokens the
+provider reports as unregistered are collected and deleted from the
+DeviceToken table when the dispatcher is flushed.
+
+FCMTransport sends through Firebase Cloud Messaging; FakeTransport is an
+in-process stand-in that records what it was asked to send and can be told
+to reject tokens or fail, for tests and development.
+"""
+import collections
+import logging
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Largest multicast FCM accepts in one request
+MAX_TOKENS = 500
+
+# Number of recent delivery latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 2048
+
+
+class PushMessage:
+    """
+    A notification payload addressed to one or more device tokens.
+    """
+    __slots__ = ('tokens', 'title', 'body', 'data', 'enqueued_at')
+
+    def __init__(self, tokens, title, body, data=None):
+        self.tokens = list(tokens)
+        self.title = title
+        self.body = body
+        self.data = dict(data or {})
+        self.enqueued_at = None
+
+    @property
+    def payload_key(self):
+        """
+        Key shared by messages that can go out in the same multicast.
+
+        Returns:
+            tuple: Title, body and sorted data items.
+        """
+        return (self.title, self.body, tuple(sorted(self.data.items())))
+
+
+class SendResult:
+    """
+    Per-token outcome of one multicast request.
+
+    Attributes:
+        delivered: Number of tokens the provider accepted.
+        invalid: Tokens the provider reports as no longer registered.
+        retry: Tokens that failed with a transient error.
+    """
+    __slots__ = ('delivered', 'invalid', 'retry')
+
+    def __init__(self, delivered=0, invalid=(), retry=()):
+        self.delivered = delivered
+        self.invalid = list(invalid)
+        self.retry = list(retry)
+
+
+class TransientError(Exception):
+    """
+    Raised by a transport when a whole request failed and may be retried.
+    """
+
+
+class BaseTransport:
+    """
+    Base class for push transports.
+    """
+
+    def send_multicast(self, tokens, title, body, data):
+        """
+        Send one payload to up to MAX_TOKENS device tokens.
+
+        Args:
+            tokens: List of device tokens.
+            title: Notification title.
+            body: Notification body.
+            data: dict of string data fields.
+
+        Returns:
+            SendResult: Outcome for each token.
+
+        Raises:
+            TransientError: If the request failed as a whole and may be retried.
+        """
+        raise NotImplementedError
+
+
+class FCMTransport(BaseTransport):
+    """
+    Sends multicasts through Firebase Cloud Messaging.
+
+    Requires firebase-admin and application default credentials (for
+    example GOOGLE_APPLICATION_CREDENTIALS).
+    """
+
+    def __init__(self):
+        import firebase_admin
+        from firebase_admin import exceptions, messaging
+
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app()
+        self.messaging = messaging
+        # Only errors about the token itself; InvalidArgumentError also covers
+        # bad payloads, which would otherwise delete every device in the batch
+        self.invalid_errors = (
+            messaging.UnregisteredError,
+            messaging.SenderIdMismatchError,
+        )
+        self.retry_errors = (
+            messaging.QuotaExceededError,
+            exceptions.UnavailableError,
+            exceptions.InternalError,
+            exceptions.DeadlineExceededError,
+        )
+
+    def send_multicast(self, tokens, title, body, data):
+        message = self.messaging.MulticastMessage(
+            tokens=tokens,
+            notification=self.messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        try:
+            response = self.messaging.send_each_for_multicast(message)
+        except self.retry_errors as e:
+            raise TransientError(str(e))
+
+        result = SendResult(delivered=response.success_count)
+        for token, reply in zip(tokens, response.responses):
+            if reply.success:
+                continue
+            if isinstance(reply.exception, self.invalid_errors):
+                result.invalid.append(token)
+            elif isinstance(reply.exception, self.retry_errors):
+                result.retry.append(token)
+            else:
+                logger.warning('FCM rejected a push notification: %s', reply.exception)
+        return result
+
+
+class FakeTransport(BaseTransport):
+    """
+    In-process transport that records multicasts instead of sending them.
+
+    Tokens in ``invalid_tokens`` are reported as unregistered, and the
+    next ``fail_requests`` requests raise TransientError.
+    """
+
+    def __init__(self, invalid_tokens=(), fail_requests=0, delay=0.0):
+        self.invalid_tokens = set(invalid_tokens)
+        self.fail_requests = fail_requests
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+
+    @property
+    def delivered(self):
+        """
+        Every token that was sent a notification, in request order.
+
+        Returns:
+            list: Device tokens.
+        """
+        with self._lock:
+            return [token for tokens, *_ in self.requests for token in tokens if token not in self.invalid_tokens]
+
+    def send_multicast(self, tokens, title, body, data):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                raise TransientError('Simulated outage')
+            self.requests.append((list(tokens), title, body, dict(data)))
+        invalid = [token for token in tokens if token in self.invalid_tokens]
+        return SendResult(delivered=len(tokens) - len(invalid), invalid=invalid)
+
+
+class PushStats:
+    """
+    Thread-safe delivery counters and recent latencies.
+    """
+
+    COUNTERS = ('queued', 'dropped', 'requests', 'delivered', 'failed', 'retried', 'invalid', 'pruned')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._started_at = time.monotonic()
+
+    def add(self, **counts):
+        """
+        Increment counters.
+
+        Args:
+            **counts: Counter name to amount.
+        """
+        with self._lock:
+            for name, amount in counts.items():
+                self._counts[name] += amount
+
+    def observe(self, seconds):
+        """
+        Record the time from enqueueing a message to its delivery.
+
+        Args:
+            seconds: Latency in seconds.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def snapshot(self):
+        """
+        Return the counters with throughput and latency percentiles.
+
+        Returns:
+            dict: Counters, ``delivered_per_second`` since the stats were
+                created, and ``p50_ms``/``p95_ms``/``max_ms`` over recent
+                deliveries.
+        """
+        with self._lock:
+            data = dict(self._counts)
+            latencies = sorted(self._latencies)
+            elapsed = time.monotonic() - self._started_at
+        data['delivered_per_second'] = data['delivered'] / elapsed if elapsed > 0 else 0.0
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('max_ms', 1.0)):
+            index = min(int(len(latencies) * fraction), len(latencies) - 1)
+            data[name] = latencies[index] * 1000 if latencies else 0.0
+        return data
+
+
+def prune_tokens(tokens):
+    """
+    Delete device tokens the provider no longer accepts.
+
+    Args:
+        tokens: Iterable of device tokens.
+
+    Returns:
+        int: Number of tokens deleted.
+    """
+    from .models import DeviceToken
+
+    deleted, _ = DeviceToken.objects.filter(token__in=list(tokens)).delete()
+    return deleted
+
+
+class PushDispatcher:
+    """
+    Sends PushMessages through a transport from a pool of worker threads.
+
+    Each worker takes a message off the queue, then keeps collecting
+    messages for up to ``linger`` seconds or until it holds ``batch_size``
+    tokens, merges those with the same payload and sends them as
+    multicasts. Workers never touch the database; unregistered tokens are
+    pruned by the thread that calls flush().
+    """
+
+    def __init__(self, transport, workers=4, queue_size=10000, batch_size=MAX_TOKENS, linger=0.01,
+                 max_attempts=4, backoff=0.5, max_backoff=30.0, prune=prune_tokens):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = min(batch_size, MAX_TOKENS)
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.prune = prune
+        self.stats = PushStats()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._invalid = set()
+        self._invalid_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """
+        Start the worker threads if they are not running.
+        """
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'push-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, message, timeout=None):
+        """
+        Queue a message for delivery, waiting for room if the queue is full.
+
+        Args:
+            message: PushMessage to send.
+            timeout: Seconds to wait for room, or None to wait indefinitely.
+
+        Returns:
+            bool: False if the message was dropped because the queue stayed full.
+        """
+        if not message.tokens:
+            return True
+        self.start()
+        message.enqueued_at = time.monotonic()
+        try:
+            self._queue.put(message, timeout=timeout)
+        except queue.Full:
+            self.stats.add(dropped=len(message.tokens))
+            return False
+        self.stats.add(queued=len(message.tokens))
+        return True
+
+    def flush(self):
+        """
+        Wait until every queued message has been handled and prune dead tokens.
+
+        Returns:
+            int: Number of device tokens pruned.
+        """
+        self._queue.join()
+        with self._invalid_lock:
+            invalid, self._invalid = self._invalid, set()
+        if not invalid:
+            return 0
+        pruned = self.prune(invalid)
+        self.stats.add(pruned=pruned)
+        logger.info('Pruned unregistered device tokens', extra={'pruned': pruned})
+        return pruned
+
+    def close(self):
+        """
+        Deliver everything queued, then stop the workers.
+        """
+        if not self._threads:
+            return
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        """
+        Worker loop: collect a batch of messages, send it, repeat.
+        """
+        while True:
+            message = self._queue.get()
+            if message is None:
+                self._queue.task_done()
+                return
+            messages = [message]
+            count = len(message.tokens)
+            deadline = time.monotonic() + self.linger
+            stop = False
+            while count < self.batch_size:
+                try:
+                    message = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if message is None:
+                    # Stop after this batch; the sentinel is accounted for below
+                    stop = True
+                    break
+                messages.append(message)
+                count += len(message.tokens)
+            try:
+                self._send_batch(messages)
+            except Exception:
+                logger.exception('Push worker failed to send a batch')
+                self.stats.add(failed=sum(len(message.tokens) for message in messages))
+            finally:
+                for _ in range(len(messages) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _send_batch(self, messages):
+        """
+        Merge messages by payload and send each group in multicast chunks.
+
+        Args:
+            messages: List of PushMessage objects.
+        """
+        groups = collections.defaultdict(list)
+        for message in messages:
+            groups[message.payload_key].append(message)
+
+        for group in groups.values():
+            first = group[0]
+            enqueued_at = min(message.enqueued_at for message in group)
+            # A device due several identical notifications gets one
+            tokens = list(dict.fromkeys(token for message in group for token in message.tokens))
+            for start in range(0, len(tokens), self.batch_size):
+                self._send(tokens[start:start + self.batch_size], first.title, first.body, first.data, enqueued_at)
+
+    def _send(self, tokens, title, body, data, enqueued_at):
+        """
+        Send one multicast, retrying transient failures with backoff.
+
+        Args:
+            tokens: Up to batch_size device tokens.
+            title: Notification title.
+            body: Notification body.
+            data: dict of string data fields.
+            enqueued_at: Monotonic time the oldest message was queued.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = self.transport.send_multicast(tokens, title, body, data)
+            except TransientError as e:
+                result = SendResult(retry=tokens)
+                logger.warning('Push request failed (attempt %d): %s', attempt, e)
+            self.stats.add(requests=1, delivered=result.delivered, invalid=len(result.invalid))
+            if result.delivered:
+                self.stats.observe(time.monotonic() - enqueued_at)
+            if result.invalid:
+                with self._invalid_lock:
+                    self._invalid.update(result.invalid)
+
+            tokens = result.retry
+            if not tokens:
+                return
+            if attempt < self.max_attempts:
+                self.stats.add(retried=len(tokens))
+                delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+                # Full jitter, so workers retrying together don't hit the provider in step
+                time.sleep(random.uniform(0, delay))
+        self.stats.add(failed=len(tokens))
@@ -0,0 +1,226 @@
+"""
+Maintenance of the per-user daily mood rollup table.
+
+Every MoodEntry write is folded into a single DailyMoodRollup row for the
+entry's user and date, so chart and statistics views only need to read one
+row per day instead of every raw entry; see DailyMoodRollupQuerySet.summary.
+"""
+from django.db import models, transaction
+
+from .models import MoodEntry, DailyMoodRollup
+
+
+def normalize_date(value):
+    """
+    Coerce a MoodEntry date value into a ``datetime.date``.
+
+    MoodEntry.date defaults to ``timezone.now``, so unsaved or freshly saved
+    instances may still hold an aware datetime rather than a date.
+
+    Args:
+        value: A date, datetime or ISO formatted string.
+
+    Returns:
+        date: The normalized calendar date.
+    """
+    return MoodEntry._meta.get_field('date').to_python(value)
+
+
+def add_entry(user_id, date, mood, intensity):
+    """
+    Fold a single mood entry into the rollup for its day.
+
+    Args:
+        user_id: Primary key of the entry's user.
+        date: Date of the entry.
+        mood: Mood key of the entry.
+        intensity: Intensity value of the entry.
+    """
+    date = normalize_date(date)
+    intensity = int(intensity)
+    with transaction.atomic():
+        rollup, _ = DailyMoodRollup.objects.select_for_update().get_or_create(
+            user_id=user_id,
+            date=date,
+        )
+        rollup.entry_count += 1
+        rollup.intensity_sum += intensity
+        rollup.intensity_min = intensity if rollup.intensity_min is None else min(rollup.intensity_min, intensity)
+        rollup.intensity_max = intensity if rollup.intensity_max is None else max(rollup.intensity_max, intensity)
+        rollup.mood_counts[mood] = rollup.mood_counts.get(mood, 0) + 1
+        rollup.save()
+
+
+def add_entries(user_id, entries):
+    """
+    Fold a batch of new mood entries into the rollups for their days.
+
+    Entries are grouped by day first, so each affected day is read and
+    written once no matter how many of the entries fall on it.
+
+    Args:
+        user_id: Primary key of the entries' user.
+        entries: Iterable of (date, mood, intensity) tuples.
+
+    Returns:
+        int: Number of days touched.
+    """
+    per_day = {}
+    for date, mood, intensity in entries:
+        per_day.setdefault(normalize_date(date), []).append((mood, int(intensity)))
+    if not per_day:
+        return 0
+
+    with transaction.atomic():
+        existing = {
+            rollup.date: rollup
+            for rollup in DailyMoodRollup.objects.select_for_update().filter(user_id=user_id, date__in=list(per_day))
+        }
+        created = []
+        for date, day_entries in per_day.items():
+            rollup = existing.get(date)
+            if rollup is None:
+                rollup = DailyMoodRollup(user_id=user_id, date=date, mood_counts={})
+                created.append(rollup)
+            intensities = [intensity for _, intensity in day_entries]
+            rollup.entry_count += len(day_entries)
+            rollup.intensity_sum += sum(intensities)
+            rollup.intensity_min = min(intensities + ([rollup.intensity_min] if rollup.intensity_min is not None else []))
+            rollup.intensity_max = max(intensities + ([rollup.intensity_max] if rollup.intensity_max is not None else []))
+            for mood, _ in day_entries:
+                rollup.mood_counts[mood] = rollup.mood_counts.get(mood, 0) + 1
+
+        DailyMoodRollup.objects.bulk_update(
+            list(existing.values()),
+            ['entry_count', 'intensity_sum', 'intensity_min', 'intensity_max', 'mood_counts'],
+            batch_size=500,
+        )
+        DailyMoodRollup.objects.bulk_create(created, batch_size=500)
+
+    return len(per_day)
+
+
+def remove_entry(user_id, date, mood, intensity):
+    """
+    Remove a single mood entry's contribution from the rollup for its day.
+
+    Counts and sums are decremented in place. If the removed intensity was the
+    day's minimum or maximum, the day is recomputed from the remaining entries.
+
+    Args:
+        user_id: Primary key of the entry's user.
+        date: Date of the entry.
+        mood: Mood key of the entry.
+        intensity: Intensity value of the entry.
+
+    Returns:
+        DailyMoodRollup: The updated rollup, or None if the day has no entries left.
+    """
+    date = normalize_date(date)
+    intensity = int(intensity)
+    with transaction.atomic():
+        rollup = DailyMoodRollup.objects.select_for_update().filter(user_id=user_id, date=date).first()
+        if rollup is None:
+            return None
+
+        if rollup.entry_count <= 1:
+            rollup.delete()
+            return None
+
+        if intensity in (rollup.intensity_min, rollup.intensity_max):
+            # Extremes cannot be decremented, so rebuild this one day
+            return refresh_day(user_id, date)
+
+        rollup.entry_count -= 1
+        rollup.intensity_sum -= intensity
+        remaining = rollup.mood_counts.get(mood, 0) - 1
+        if remaining > 0:
+            rollup.mood_counts[mood] = remaining
+        else:
+            rollup.mood_counts.pop(mood, None)
+        rollup.save()
+        return rollup
+
+
+def refresh_day(user_id, date):
+    """
+    Recompute the rollup for one user and day from the raw mood entries.
+
+    Args:
+        user_id: Primary key of the user.
+        date: Date to recompute.
+
+    Returns:
+        DailyMoodRollup: The refreshed rollup, or None if the day has no entries.
+    """
+    date = normalize_date(date)
+    with transaction.atomic():
+        rows = MoodEntry.objects.filter(user_id=user_id, date=date).values('mood').annotate(
+            count=models.Count('id'),
+            total=models.Sum('intensity'),
+            low=models.Min('intensity'),
+            high=models.Max('intensity'),
+        ).order_by()
+        rows = list(rows)
+
+        if not rows:
+            DailyMoodRollup.objects.filter(user_id=user_id, date=date).delete()
+            return None
+
+        rollup, _ = DailyMoodRollup.objects.update_or_create(
+            user_id=user_id,
+            date=date,
+            defaults=_rollup_fields(rows),
+        )
+        return rollup
+
+
+def rebuild_user(user_id):
+    """
+    Rebuild every rollup row for a user from the raw mood entries.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        int: Number of daily rollup rows written.
+    """
+    per_day = {}
+    rows = MoodEntry.objects.filter(user_id=user_id).values('date', 'mood').annotate(
+        count=models.Count('id'),
+        total=models.Sum('intensity'),
+        low=models.Min('intensity'),
+        high=models.Max('intensity'),
+    ).order_by()
+    for row in rows:
+        per_day.setdefault(row['date'], []).append(row)
+
+    rollups = [
+        DailyMoodRollup(user_id=user_id, date=date, **_rollup_fields(day_rows))
+        for date, day_rows in per_day.items()
+    ]
+
+    with transaction.atomic():
+        DailyMoodRollup.objects.filter(user_id=user_id).delete()
+        DailyMoodRollup.objects.bulk_create(rollups, batch_size=500)
+
+    return len(rollups)
+
+
+def _rollup_fields(rows):
+    """
+    Combine per-mood aggregate rows for one day into rollup field values.
+
+    Args:
+        rows: Iterable of dicts with mood, count, total, low and high keys.
+
+    Returns:
+        dict: Field values for a DailyMoodRollup row.
+    """
+    return {
+        'entry_count': sum(row['count'] for row in rows),
+        'intensity_sum': sum(row['total'] for row in rows),
+        'intensity_min': min(row['low'] for row in rows),
+        'intensity_max': max(row['high'] for row in rows),
+        'mood_counts': {row['mood']: row['count'] for row in rows},
+    }
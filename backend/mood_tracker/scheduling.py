@@ -0,0 +1,227 @@
+"""
+Minute-bucketed scheduling of reminder notifications.
+
+ReminderIndex loads active reminders once, unpacks their weekdays, and files
+each reminder under every minute of the week it is due on. At dispatch time
+the scheduler only looks up the buckets that have come due since the last
+tick, so the cost of a tick depends on the reminders in those buckets rather
+than on the size of the Reminder table. Due reminders are handed to the
+notifier backend in batches, with the users' device tokens fetched per batch.
+"""
+import bisect
+import datetime
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DeviceToken, Reminder, mask_to_weekdays
+from .notifications import Notification
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def minute_of_week(moment):
+    """
+    Return the bucket key for a datetime.
+
+    Args:
+        moment: Local datetime.
+
+    Returns:
+        int: Minutes since Monday 00:00.
+    """
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def batch_size():
+    """
+    Return the number of notifications handed to the notifier per call.
+
+    Returns:
+        int: Configured REMINDER_BATCH_SIZE, defaulting to 500.
+    """
+    return getattr(settings, 'REMINDER_BATCH_SIZE', 500)
+
+
+class ReminderIndex:
+    """
+    In-memory index of active reminders keyed by minute of the week.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.keys = []
+        self.size = 0
+
+    @classmethod
+    def build(cls, queryset=None):
+        """
+        Load reminders into a new index, unpacking each row's day mask once.
+
+        Args:
+            queryset: Optional Reminder queryset to index; defaults to all
+                active reminders.
+
+        Returns:
+            ReminderIndex: The populated index.
+        """
+        if queryset is None:
+            queryset = Reminder.objects.filter(is_active=True)
+
+        index = cls()
+        rows = queryset.values_list('id', 'user_id', 'time', 'days_mask').iterator(chunk_size=5000)
+        for reminder_id, user_id, time, days_mask in rows:
+            index.add(reminder_id, user_id, time, mask_to_weekdays(days_mask))
+        index.keys = sorted(index.buckets)
+        return index
+
+    def add(self, reminder_id, user_id, time, weekdays):
+        """
+        File a reminder under each minute of the week it is due.
+
+        Args:
+            reminder_id: Primary key of the reminder.
+            user_id: Primary key of the reminder's user.
+            time: Time of day the reminder fires.
+            weekdays: Iterable of weekday numbers (Monday is 0).
+        """
+        entry = (reminder_id, user_id)
+        for weekday in weekdays:
+            key = weekday * MINUTES_PER_DAY + time.hour * 60 + time.minute
+            self.buckets.setdefault(key, []).append(entry)
+            self.size += 1
+
+    def due(self, key):
+        """
+        Return the reminders filed under one minute of the week.
+
+        Args:
+            key: Minute of the week.
+
+        Returns:
+            list: (reminder_id, user_id) pairs.
+        """
+        return self.buckets.get(key % MINUTES_PER_WEEK, [])
+
+    def next_key(self, after):
+        """
+        Return the next non-empty bucket strictly after a minute of the week.
+
+        Args:
+            after: Minute of the week.
+
+        Returns:
+            int: Minutes from ``after`` to the next due bucket, or None if
+                the index is empty.
+        """
+        if not self.keys:
+            return None
+        after %= MINUTES_PER_WEEK
+        position = bisect.bisect_right(self.keys, after)
+        if position < len(self.keys):
+            return self.keys[position] - after
+        return self.keys[0] + MINUTES_PER_WEEK - after
+
+
+class ReminderScheduler:
+    """
+    Dispatches due reminders from a ReminderIndex to a notifier backend.
+    """
+
+    # Longest gap that is caught up after a stall; older buckets are skipped
+    MAX_CATCH_UP_MINUTES = 60
+
+    def __init__(self, notifier, index=None):
+        self.notifier = notifier
+        self.index = index if index is not None else ReminderIndex.build()
+        self.last_minute = None
+
+    def dispatch_minute(self, moment):
+        """
+        Send every reminder due in the minute containing ``moment``.
+
+        Args:
+            moment: Aware or naive local datetime within the minute.
+
+        Returns:
+            int: Number of notifications delivered.
+        """
+        entries = self.index.due(minute_of_week(moment))
+        if not entries:
+            return 0
+
+        scheduled_for = moment.replace(second=0, microsecond=0)
+        size = batch_size()
+        sent = 0
+        for start in range(0, len(entries), size):
+            batch = entries[start:start + size]
+            tokens = {}
+            devices = DeviceToken.objects.filter(user_id__in={user_id for _, user_id in batch})
+            for user_id, token in devices.values_list('user_id', 'token'):
+                tokens.setdefault(user_id, []).append(token)
+            # Users without a registered device have nowhere to be reminded
+            sent += self.notifier.send([
+                Notification(reminder_id, user_id, tokens[user_id], scheduled_for)
+                for reminder_id, user_id in batch
+                if user_id in tokens
+            ])
+
+        logger.info(
+            'Dispatched reminder bucket',
+            extra={'bucket': scheduled_for.isoformat(), 'due': len(entries), 'sent': sent},
+        )
+        return sent
+
+    def tick(self, now=None):
+        """
+        Dispatch every bucket that came due since the previous tick.
+
+        The first tick only dispatches the current minute. Later ticks also
+        catch up buckets missed while the process was busy or asleep, up to
+        MAX_CATCH_UP_MINUTES.
+
+        Args:
+            now: Optional current time, defaults to the local time.
+
+        Returns:
+            int: Number of notifications delivered.
+        """
+        now = (now or timezone.localtime()).replace(second=0, microsecond=0)
+        if self.last_minute is None:
+            pending = [now]
+        elif now <= self.last_minute:
+            pending = []
+        else:
+            missed = int((now - self.last_minute).total_seconds() // 60)
+            if missed > self.MAX_CATCH_UP_MINUTES:
+                logger.warning('Skipping %d missed reminder minutes', missed - self.MAX_CATCH_UP_MINUTES)
+                missed = self.MAX_CATCH_UP_MINUTES
+            pending = [now - datetime.timedelta(minutes=offset) for offset in range(missed - 1, -1, -1)]
+
+        sent = 0
+        for minute in pending:
+            sent += self.dispatch_minute(minute)
+        self.last_minute = now
+        return sent
+
+    def seconds_until_next(self, now=None):
+        """
+        Return how long to sleep before the next non-empty bucket is due.
+
+        Args:
+            now: Optional current time, defaults to the local time.
+
+        Returns:
+            float: Seconds until the start of the next due bucket, or None
+                if the index is empty.
+        """
+        now = now or timezone.localtime()
+        minutes = self.index.next_key(minute_of_week(now))
+        if minutes is None:
+            return None
+        next_minute = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=minutes)
+        return max((next_minute - now).total_seconds(), 0)
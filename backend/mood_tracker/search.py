@@ -0,0 +1,599 @@
+"""
+Full-text search over journal entries and mood notes.
+
+Documents are journal titles and content plus the notes on mood entries.
+Two interchangeable backends rank matches with BM25 and return highlighted
+snippets:
+
+* FTS5Backend keeps an SQLite FTS5 inverted index in the
+  ``mood_tracker_search`` virtual table, created by migration where the
+  SQLite build supports FTS5. Rows are written by model signals.
+* PythonBackend is the fallback for other databases or SQLite builds
+  without FTS5. It builds a per-user inverted index in memory on first
+  search and keeps it until a signal bumps the user's search version.
+
+Query text is reduced to plain words, all of which must match; the last
+word also matches as a prefix so search works while the user is typing.
+"""
+import bisect
+import datetime
+import hashlib
+import math
+import re
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.html import escape
+
+from .models import MoodEntry, Journal
+
+SEARCH_TABLE = 'mood_tracker_search'
+
+KIND_JOURNAL = 'journal'
+KIND_MOOD = 'mood'
+KINDS = (KIND_JOURNAL, KIND_MOOD)
+
+# Matches are wrapped in these markers by the backends, then swapped for
+# <mark> tags after the surrounding text has been HTML-escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+MAX_QUERY_TERMS = 10
+SNIPPET_TOKENS = 16
+TITLE_WEIGHT = 2.0
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_query(text):
+    """
+    Reduce free-form query text to lowercase search terms.
+
+    Args:
+        text: Raw query string.
+
+    Returns:
+        list: Up to MAX_QUERY_TERMS words, in order.
+    """
+    return WORD_RE.findall((text or '').lower())[:MAX_QUERY_TERMS]
+
+
+def render_highlight(text):
+    """
+    HTML-escape backend output and turn match markers into <mark> tags.
+
+    Args:
+        text: Snippet or title containing MATCH_START/MATCH_END markers.
+
+    Returns:
+        str: HTML-safe text with matches wrapped in <mark>.
+    """
+    return escape(text or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def owner_token(user_id):
+    """
+    Return a single-token FTS key for a user.
+
+    Firebase uids may contain characters the tokenizer would split on, so
+    the uid is hashed into one alphanumeric token that can be matched
+    through the inverted index.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        str: Owner token.
+    """
+    return 'u' + hashlib.sha1(str(user_id).encode()).hexdigest()
+
+
+def document_rowid(object_id):
+    """
+    Derive a stable 63-bit FTS rowid from a UUID primary key.
+
+    Args:
+        object_id: UUID of the journal or mood entry.
+
+    Returns:
+        int: Positive rowid.
+    """
+    return uuid.UUID(str(object_id)).int >> 65
+
+
+def journal_document(journal):
+    """
+    Build the searchable document for a journal entry.
+
+    Args:
+        journal: Journal instance.
+
+    Returns:
+        dict: Search document fields.
+    """
+    return {
+        'kind': KIND_JOURNAL,
+        'id': journal.pk,
+        'user_id': journal.user_id,
+        'title': journal.title or '',
+        'body': journal.content or '',
+        'created_at': journal.created_at,
+    }
+
+
+def mood_document(entry):
+    """
+    Build the searchable document for a mood entry's notes.
+
+    Args:
+        entry: MoodEntry instance.
+
+    Returns:
+        dict: Search document fields, or None if the entry has no notes.
+    """
+    if not entry.notes:
+        return None
+    return {
+        'kind': KIND_MOOD,
+        'id': entry.pk,
+        'user_id': entry.user_id,
+        'title': entry.get_mood_display(),
+        'body': entry.notes,
+        # Freshly created entries may still hold the timezone.now defaults
+        'created_at': datetime.datetime.combine(
+            MoodEntry._meta.get_field('date').to_python(entry.date),
+            MoodEntry._meta.get_field('time').to_python(entry.time),
+        ),
+    }
+
+
+def iter_user_documents(user_id):
+    """
+    Yield every searchable document a user owns, straight from the database.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Yields:
+        dict: Search documents for journals, then mood notes.
+    """
+    for journal in Journal.objects.filter(user_id=user_id).only(
+        'id', 'user_id', 'title', 'content', 'created_at'
+    ).iterator(chunk_size=2000):
+        yield journal_document(journal)
+
+    for entry in MoodEntry.objects.filter(user_id=user_id).exclude(notes__isnull=True).exclude(notes='').only(
+        'id', 'user_id', 'mood', 'notes', 'date', 'time'
+    ).iterator(chunk_size=2000):
+        yield mood_document(entry)
+
+
+def result(document, title, snippet, score):
+    """
+    Format one search hit for callers.
+
+    Args:
+        document: dict with kind, id and created_at.
+        title: Title with match markers.
+        snippet: Body excerpt with match markers.
+        score: BM25 relevance, higher is better.
+
+    Returns:
+        dict: Search hit with HTML-safe highlighted title and snippet.
+    """
+    created_at = document['created_at']
+    return {
+        'kind': document['kind'],
+        'id': str(document['id']),
+        'title': render_highlight(title),
+        'snippet': render_highlight(snippet),
+        'score': round(score, 6),
+        'created_at': created_at.isoformat() if hasattr(created_at, 'isoformat') else created_at,
+    }
+
+
+class FTS5Backend:
+    """
+    Search backend on an SQLite FTS5 virtual table.
+
+    Columns are owner, kind, title, body (indexed) and object_id,
+    created_at (stored only). Owner and kind are matched as tokens, so a
+    query only walks the postings of one user's documents.
+    """
+    name = 'fts5'
+
+    # bm25() weights per column: owner, kind, title, body, object_id, created_at
+    WEIGHTS = f'0, 0, {TITLE_WEIGHT}, 1, 0, 0'
+
+    def index(self, document):
+        self.index_many([document])
+
+    def index_many(self, documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} '
+                '(rowid, owner, kind, title, body, object_id, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                [
+                    [
+                        document_rowid(document['id']),
+                        owner_token(document['user_id']),
+                        document['kind'],
+                        document['title'],
+                        document['body'],
+                        str(document['id']),
+                        document['created_at'].isoformat() if document['created_at'] else '',
+                    ]
+                    for document in documents
+                ],
+            )
+
+    def remove(self, kind, object_id, user_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [document_rowid(object_id)])
+
+    def rebuild_user(self, user_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+                [f'owner:{owner_token(user_id)}'],
+            )
+        count = 0
+        for document in iter_user_documents(user_id):
+            self.index(document)
+            count += 1
+        return count
+
+    def search(self, user_id, terms, kinds, limit):
+        words = [f'"{term}"' for term in terms]
+        words[-1] += '*'
+        expression = f'owner:{owner_token(user_id)} AND ({" OR ".join(f"kind:{kind}" for kind in kinds)})'
+        expression += ' AND ' + ' AND '.join(words)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT kind, object_id, created_at, bm25({SEARCH_TABLE}, {self.WEIGHTS}) AS rank, '
+                f"highlight({SEARCH_TABLE}, 2, char(2), char(3)), "
+                f"snippet({SEARCH_TABLE}, 3, char(2), char(3), '…', {SNIPPET_TOKENS}) "
+                f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [expression, limit],
+            )
+            rows = cursor.fetchall()
+
+        return [
+            # bm25() is lower-is-better; flip the sign so scores read naturally
+            result({'kind': kind, 'id': object_id, 'created_at': created_at or None}, title, snippet, -rank)
+            for kind, object_id, created_at, rank, title, snippet in rows
+        ]
+
+
+class UserIndex:
+    """
+    In-memory inverted index over one user's documents.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, documents):
+        self.documents = []
+        self.postings = defaultdict(dict)
+        self.lengths = []
+        for document in documents:
+            position = len(self.documents)
+            self.documents.append(document)
+            frequencies = defaultdict(float)
+            title_terms = WORD_RE.findall(document['title'].lower())
+            body_terms = WORD_RE.findall(document['body'].lower())
+            for term in title_terms:
+                frequencies[term] += TITLE_WEIGHT
+            for term in body_terms:
+                frequencies[term] += 1
+            for term, frequency in frequencies.items():
+                self.postings[term][position] = frequency
+            self.lengths.append(len(title_terms) * TITLE_WEIGHT + len(body_terms))
+        self.terms = sorted(self.postings)
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+
+    def expand(self, term, prefix):
+        """
+        Return the indexed terms a query term matches.
+
+        Args:
+            term: Query term.
+            prefix: Whether the term also matches as a prefix.
+
+        Returns:
+            list: Matching indexed terms.
+        """
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.terms, term)
+        matches = []
+        for indexed in self.terms[start:]:
+            if not indexed.startswith(term):
+                break
+            matches.append(indexed)
+        return matches
+
+    def search(self, terms, kinds, limit):
+        """
+        Rank documents that match every term with BM25.
+
+        Args:
+            terms: Query terms; the last one matches as a prefix.
+            kinds: Document kinds to include.
+            limit: Maximum number of hits.
+
+        Returns:
+            list: (score, document, matched terms) tuples, best first.
+        """
+        total = len(self.documents)
+        scores = None
+        matched = set()
+        for position, term in enumerate(terms):
+            term_scores = defaultdict(float)
+            for indexed in self.expand(term, prefix=position == len(terms) - 1):
+                postings = self.postings[indexed]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, frequency in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self.lengths[doc] / self.average_length)
+                    term_scores[doc] += idf * frequency * (self.K1 + 1) / (frequency + norm)
+                matched.add(indexed)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        hits = [(score, self.documents[doc]) for doc, score in scores.items() if self.documents[doc]['kind'] in kinds]
+        hits.sort(key=lambda hit: -hit[0])
+        return [(score, document, matched) for score, document in hits[:limit]]
+
+
+def mark_terms(text, matched, window=None):
+    """
+    Wrap matched words in match markers, optionally cutting a snippet.
+
+    Args:
+        text: Text to highlight.
+        matched: Set of lowercase indexed terms that matched.
+        window: Number of words to keep around the first match, or None
+            to return the whole text.
+
+    Returns:
+        str: Text with MATCH_START/MATCH_END around matched words.
+    """
+    words = list(WORD_RE.finditer(text))
+    hits = [index for index, word in enumerate(words) if word.group().lower() in matched]
+    if window is not None and words:
+        first = hits[0] if hits else 0
+        start_word = max(first - window // 4, 0)
+        end_word = min(start_word + window, len(words))
+        start = words[start_word].start() if start_word else 0
+        end = words[end_word - 1].end() if end_word < len(words) else len(text)
+        prefix = '…' if start_word else ''
+        suffix = '…' if end_word < len(words) else ''
+    else:
+        start, end, prefix, suffix = 0, len(text), '', ''
+
+    pieces = []
+    cursor = start
+    for index in hits:
+        word = words[index]
+        if word.start() < start or word.end() > end:
+            continue
+        pieces.append(text[cursor:word.start()])
+        pieces.append(MATCH_START + word.group() + MATCH_END)
+        cursor = word.end()
+    pieces.append(text[cursor:end])
+    return prefix + ''.join(pieces) + suffix
+
+
+class PythonBackend:
+    """
+    Pure-Python search backend with per-user in-memory inverted indexes.
+
+    Indexes are built from the database on first search and cached per
+    process, keyed by a per-user version stored in the Django cache. Model
+    signals bump the version, so a shared cache backend keeps every
+    process in sync.
+    """
+    name = 'python'
+
+    def __init__(self, max_users=None):
+        self.max_users = max_users or getattr(settings, 'SEARCH_INDEX_CACHE_SIZE', 128)
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version_key(self, user_id):
+        return f'search:version:{user_id}'
+
+    def bump(self, user_id):
+        cache.set(self.version_key(user_id), uuid.uuid4().hex, None)
+
+    def index(self, document):
+        self.bump(document['user_id'])
+
+    def index_many(self, documents):
+        for user_id in {document['user_id'] for document in documents}:
+            self.bump(user_id)
+
+    def remove(self, kind, object_id, user_id):
+        self.bump(user_id)
+
+    def rebuild_user(self, user_id):
+        self.bump(user_id)
+        return sum(1 for _ in iter_user_documents(user_id))
+
+    def get_index(self, user_id):
+        """
+        Return the user's index, rebuilding it if their documents changed.
+
+        Args:
+            user_id: Primary key of the user.
+
+        Returns:
+            UserIndex: Current index for the user.
+        """
+        version = cache.get(self.version_key(user_id))
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(self.version_key(user_id), version, None)
+
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._indexes.move_to_end(user_id)
+                return cached[1]
+
+        user_index = UserIndex(iter_user_documents(user_id))
+        with self._lock:
+            self._indexes[user_id] = (version, user_index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return user_index
+
+    def search(self, user_id, terms, kinds, limit):
+        hits = self.get_index(user_id).search(terms, kinds, limit)
+        return [
+            result(
+                document,
+                mark_terms(document['title'], matched),
+                mark_terms(document['body'], matched, window=SNIPPET_TOKENS),
+                score,
+            )
+            for score, document, matched in hits
+        ]
+
+
+_backend = None
+
+
+def fts5_available():
+    """
+    Check whether the FTS5 search table exists on the default database.
+
+    Returns:
+        bool: True on SQLite when the migration created the FTS5 table.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        return cursor.fetchone() is not None
+
+
+def get_backend():
+    """
+    Return the configured search backend.
+
+    SEARCH_BACKEND may be 'fts5', 'python' or 'auto' (the default), which
+    uses FTS5 when its table exists and the Python backend otherwise.
+
+    Returns:
+        FTS5Backend or PythonBackend: The backend instance.
+    """
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if choice == 'auto':
+            choice = 'fts5' if fts5_available() else 'python'
+        _backend = FTS5Backend() if choice == 'fts5' else PythonBackend()
+    return _backend
+
+
+def index_journal(journal):
+    """
+    Add or refresh a journal entry in the search index.
+
+    Args:
+        journal: Saved Journal instance.
+    """
+    get_backend().index(journal_document(journal))
+
+
+def index_mood_entry(entry):
+    """
+    Add, refresh or drop a mood entry in the search index.
+
+    Entries without notes have nothing to search, so they are removed.
+
+    Args:
+        entry: Saved MoodEntry instance.
+    """
+    document = mood_document(entry)
+    if document is None:
+        get_backend().remove(KIND_MOOD, entry.pk, entry.user_id)
+    else:
+        get_backend().index(document)
+
+
+def index_mood_entries(entries):
+    """
+    Add a batch of new mood entries to the search index at once.
+
+    Entries without notes are skipped.
+
+    Args:
+        entries: Saved MoodEntry instances.
+
+    Returns:
+        int: Number of documents indexed.
+    """
+    documents = [document for document in map(mood_document, entries) if document is not None]
+    if documents:
+        get_backend().index_many(documents)
+    return len(documents)
+
+
+def remove(kind, object_id, user_id):
+    """
+    Drop a document from the search index.
+
+    Args:
+        kind: KIND_JOURNAL or KIND_MOOD.
+        object_id: Primary key of the deleted object.
+        user_id: Primary key of the object's user.
+    """
+    get_backend().remove(kind, object_id, user_id)
+
+
+def rebuild_user(user_id):
+    """
+    Re-index every document a user owns.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        int: Number of documents indexed.
+    """
+    return get_backend().rebuild_user(user_id)
+
+
+def search(user, query, kinds=KINDS, limit=20):
+    """
+    Search a user's journals and mood notes.
+
+    Args:
+        user: User object (or primary key) to search for.
+        query: Free-form query text.
+        kinds: Document kinds to include.
+        limit: Maximum number of hits.
+
+    Returns:
+        list: Hits (kind, id, title, snippet, score, created_at), best
+            first. Title and snippet are HTML-escaped with <mark> tags
+            around matches.
+    """
+    terms = parse_query(query)
+    kinds = [kind for kind in kinds if kind in KINDS]
+    if not terms or not kinds or limit <= 0:
+        return []
+    user_id = getattr(user, 'pk', user)
+    return get_backend().search(user_id, terms, kinds, limit)
@@ -0,0 +1,227 @@
+"""
+Synthetic data generation for benchmarks.
+
+Generates users with mood entries, journals and reminders in bulk using
+bulk_create. Signals do not fire for bulk inserts, so callers that need
+derived data (rollups, streaks) must rebuild it afterwards. Generated users
+are removed the same way, with one DELETE per table.
+"""
+import datetime
+import random
+
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from mindmate.cache import tiered_cache, user_tag, MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS
+
+from .models import User, MoodEntry, Journal, Reminder, Job, weekdays_to_mask
+from . import search, versioning
+
+MOOD_KEYS = [key for key, _ in MoodEntry.MOOD_CHOICES]
+
+SAMPLE_NOTES = [
+    'Had a productive day!',
+    'Feeling drained but managing',
+    'Meditation session was helpful',
+    'Upcoming deadlines on my mind',
+    'Enjoyed time with friends',
+    'Just taking it day by day',
+]
+
+SAMPLE_WORDS = (
+    'today felt calm work family sleep walk coffee rain sunshine stress '
+    'deadline friend music reading gratitude tired hopeful anxious meeting '
+    'exercise dinner weekend plan reflect breathe progress journal'
+).split()
+
+
+def make_users(count, prefix='bench'):
+    """
+    Build unsaved users with predictable uids, emails and usernames.
+
+    Args:
+        count: Number of users to build.
+        prefix: Prefix for uids, emails and usernames.
+
+    Returns:
+        list: Unsaved User instances.
+    """
+    return [
+        User(uid=f'{prefix}-{index}', email=f'{prefix}-{index}@example.com', username=f'{prefix}-{index}')
+        for index in range(count)
+    ]
+
+
+def make_mood_entries(user, count, days, rng, today=None):
+    """
+    Build unsaved mood entries spread over the trailing days.
+
+    Args:
+        user: User the entries belong to.
+        count: Number of entries to build.
+        days: Number of trailing days to spread entries over.
+        rng: random.Random instance.
+        today: Optional last day of the range, defaults to the current date.
+
+    Returns:
+        list: Unsaved MoodEntry instances.
+    """
+    today = today or timezone.now().date()
+    entries = []
+    for _ in range(count):
+        entries.append(MoodEntry(
+            user=user,
+            date=today - datetime.timedelta(days=rng.randrange(max(days, 1))),
+            time=datetime.time(rng.randrange(7, 23), rng.randrange(60), rng.randrange(60)),
+            mood=rng.choice(MOOD_KEYS),
+            intensity=rng.randint(1, 10),
+            notes=rng.choice(SAMPLE_NOTES) if rng.random() < 0.4 else None,
+        ))
+    return entries
+
+
+def make_journals(user, count, rng, mean_words=120):
+    """
+    Build unsaved journals with roughly realistic text lengths.
+
+    Lengths follow an exponential distribution around mean_words, so most
+    entries are short and a few are long.
+
+    Args:
+        user: User the journals belong to.
+        count: Number of journals to build.
+        rng: random.Random instance.
+        mean_words: Average number of words per journal.
+
+    Returns:
+        list: Unsaved Journal instances.
+    """
+    journals = []
+    for _ in range(count):
+        words = max(5, int(rng.expovariate(1 / mean_words)))
+        journals.append(Journal(
+            user=user,
+            title=' '.join(rng.choices(SAMPLE_WORDS, k=rng.randint(2, 6))).capitalize() if rng.random() < 0.8 else None,
+            content=' '.join(rng.choices(SAMPLE_WORDS, k=words)),
+        ))
+    return journals
+
+
+def spread_created_at(journals, days, rng, now=None, batch_size=1000):
+    """
+    Give saved journals creation times spread over the trailing days.
+
+    Journal.created_at is auto_now_add, so bulk_create stamps every row
+    with the time of the insert; the generated times are written afterwards
+    with bulk_update.
+
+    Args:
+        journals: Saved Journal instances.
+        days: Number of trailing days to spread the times over.
+        rng: random.Random instance.
+        now: Optional end of the range, defaults to the current time.
+        batch_size: Rows per UPDATE statement.
+    """
+    now = now or timezone.now()
+    for journal in journals:
+        journal.created_at = now - datetime.timedelta(seconds=rng.randrange(max(days, 1) * 24 * 3600))
+    Journal.objects.bulk_update(journals, ['created_at'], batch_size=batch_size)
+
+
+def make_reminders(user, count, rng):
+    """
+    Build unsaved reminders at random times on random weekdays.
+
+    Args:
+        user: User the reminders belong to.
+        count: Number of reminders to build.
+        rng: random.Random instance.
+
+    Returns:
+        list: Unsaved Reminder instances.
+    """
+    reminders = []
+    for _ in range(count):
+        weekdays = rng.sample(range(7), rng.randint(1, 7))
+        reminders.append(Reminder(
+            user=user,
+            time=datetime.time(rng.randrange(6, 23), rng.choice([0, 15, 30, 45])),
+            days_mask=weekdays_to_mask(weekdays),
+            is_active=rng.random() < 0.9,
+        ))
+    return reminders
+
+
+def seed(users, entries_per_user, journals_per_user=0, reminders_per_user=0,
+         days=365, prefix='bench', seed_value=0, batch_size=1000):
+    """
+    Insert a synthetic data set with bulk_create.
+
+    Args:
+        users: Number of users to create.
+        entries_per_user: Mood entries per user.
+        journals_per_user: Journals per user.
+        reminders_per_user: Reminders per user.
+        days: Number of trailing days the mood entries and journals are
+            spread over.
+        prefix: Prefix for generated user identifiers.
+        seed_value: Seed for the random generator, for repeatable data.
+        batch_size: Rows per INSERT statement.
+
+    Returns:
+        list: The created User instances.
+    """
+    rng = random.Random(seed_value)
+    created_users = User.objects.bulk_create(make_users(users, prefix), batch_size=batch_size)
+
+    for user in created_users:
+        MoodEntry.objects.bulk_create(make_mood_entries(user, entries_per_user, days, rng), batch_size=batch_size)
+        if journals_per_user:
+            journals = Journal.objects.bulk_create(make_journals(user, journals_per_user, rng), batch_size=batch_size)
+            spread_created_at(journals, days, rng, batch_size=batch_size)
+        if reminders_per_user:
+            Reminder.objects.bulk_create(make_reminders(user, reminders_per_user, rng), batch_size=batch_size)
+
+    return created_users
+
+
+def delete_users(user_ids):
+    """
+    Delete users and every row that refers to them without per-row signals.
+
+    QuerySet.delete() would collect every mood entry and journal and fire
+    the rollup, streak, search and cache signals for each one. Here each
+    table that cascades from User gets a single DELETE, and the search index
+    and caches are then cleared once per user.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+
+    Returns:
+        int: Number of users deleted.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    for job in Job.objects.filter(user_id__in=user_ids).exclude(result_file=''):
+        job.result_file.delete(save=False)
+
+    # Journals refer to mood entries, so they are deleted first
+    relations = sorted(User._meta.related_objects, key=lambda relation: relation.related_model is not Journal)
+    for relation in relations:
+        if relation.on_delete is not models.CASCADE:
+            continue
+        rows = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': user_ids})
+        rows._raw_delete(rows.db)
+    users = User._base_manager.filter(pk__in=user_ids)
+    deleted = users._raw_delete(users.db)
+
+    for user_id in user_ids:
+        search.rebuild_user(user_id)
+    cache.delete_many([versioning.cache_key(user_id) for user_id in user_ids])
+    tiered_cache.invalidate_tags(*(
+        user_tag(user_id, kind) for user_id in user_ids for kind in (MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS)
+    ))
+    return deleted
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import User, MoodEntry, Journal, Reminder
+from django.urls import reverse
+from .models import User, MoodEntry, Journal, Reminder, Job
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -7,14 +8,36 @@ class UserSerializer(serializers.ModelSerializer):
     Serializer for User model.
     
     Provides serialization for user data with read-only fields
-    for system-generated values like uid and timestamps.
+    for system-generated values like uid and timestamps, and the URLs of
+    the resized profile picture variants by format and size.
     """
     date_joined = serializers.DateTimeField(source='created_at', read_only=True)
+    profile_picture_urls = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ['uid', 'email', 'username', 'created_at', 'date_joined']
-        read_only_fields = ['uid', 'created_at', 'date_joined']
+        fields = ['uid', 'email', 'username', 'created_at', 'date_joined', 'profile_picture_urls']
+        read_only_fields = ['uid', 'created_at', 'date_joined', 'profile_picture_urls']
+    
+    def get_profile_picture_urls(self, user):
+        """
+        Return absolute URLs of the user's profile picture variants.
+        
+        Args:
+            user: User instance.
+            
+        Returns:
+            dict: Format to size to URL, e.g. ``['webp']['128']``, or None
+                without a picture.
+        """
+        urls = user.profile_picture_urls
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            fmt: {size: request.build_absolute_uri(url) for size, url in by_size.items()}
+            for fmt, by_size in urls.items()
+        }
 
 
 class MoodEntrySerializer(serializers.ModelSerializer):
@@ -28,8 +51,8 @@ class MoodEntrySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = MoodEntry
-        fields = ['id', 'user', 'mood', 'mood_display', 'intensity', 'notes', 'date', 'time', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
+        fields = ['id', 'user', 'mood', 'mood_display', 'intensity', 'notes', 'date', 'time']
+        read_only_fields = ['id', 'user']
     
     def create(self, validated_data):
         """
@@ -78,12 +101,19 @@ class ReminderSerializer(serializers.ModelSerializer):
     Serializer for Reminder model.
     
     Handles mood tracking reminder data and automatically
-    sets the user from the request context.
+    sets the user from the request context. Days are exposed as a
+    list of weekday numbers (Monday is 0) and stored as a bitmask.
     """
+    days = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        source='weekdays',
+        allow_empty=False,
+    )
+    
     class Meta:
         model = Reminder
-        fields = ['id', 'user', 'title', 'message', 'time', 'days_of_week', 'is_active', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
+        fields = ['id', 'user', 'time', 'days', 'days_mask', 'is_active']
+        read_only_fields = ['id', 'user', 'days_mask']
     
     def create(self, validated_data):
         """
@@ -117,10 +147,62 @@ class MoodHistorySerializer(serializers.Serializer):
     Serializer for mood history chart data.
     
     Handles data formatted for visualization including dates,
-    intensities, mood labels, and counts for chart rendering.
+    intensities, mood labels, and counts for chart rendering. Intensities
+    are bucket averages when the series was downsampled.
     """
     dates = serializers.ListField(child=serializers.CharField())
-    intensities = serializers.ListField(child=serializers.IntegerField())
+    intensities = serializers.ListField(child=serializers.FloatField())
     moods = serializers.ListField(child=serializers.CharField())
     mood_labels = serializers.ListField(child=serializers.CharField())
-    mood_counts = serializers.ListField(child=serializers.IntegerField())
\ No newline at end of file
+    mood_counts = serializers.ListField(child=serializers.IntegerField())
+    resolution = serializers.CharField()
+    start_date = serializers.CharField()
+    end_date = serializers.CharField()
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for background jobs, as returned by the status endpoints.
+    
+    Adds the URL to poll and, once an export has finished, the URL to
+    download its file from.
+    """
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'priority', 'attempts', 'result', 'error',
+            'created_at', 'started_at', 'finished_at', 'status_url', 'download_url',
+        ]
+        read_only_fields = fields
+    
+    def get_status_url(self, job):
+        """
+        Return the API URL that reports the job's status.
+        
+        Args:
+            job: Job instance.
+            
+        Returns:
+            str: Absolute URL when a request is in the context.
+        """
+        return self._absolute(reverse('job-detail', args=[job.pk]))
+    
+    def get_download_url(self, job):
+        """
+        Return the URL of the job's result file once it is done.
+        
+        Args:
+            job: Job instance.
+            
+        Returns:
+            str: Absolute URL, or None while there is no file.
+        """
+        if job.status != Job.DONE or not job.result_file:
+            return None
+        return self._absolute(reverse('job-download', args=[job.pk]))
+    
+    def _absolute(self, path):
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
@@ -0,0 +1,231 @@
+"""
+Model signal handlers that keep derived mood data (daily rollups and
+streaks) and the search index in sync with raw writes, evaluate
+achievement unlocks, bump per-user data versions and invalidate cached
+user data and session users.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, MoodEntry, Journal, Reminder, UserAchievement
+from . import rollups, streaks, achievements, search, versioning
+from .auth import user_cache
+from mindmate.cache import tiered_cache, user_tag, MOODS, JOURNALS, REMINDERS, ACHIEVEMENTS
+
+# Tiered cache tag kind invalidated by writes to each model
+CACHE_TAGS = {
+    MoodEntry: MOODS,
+    Journal: JOURNALS,
+    Reminder: REMINDERS,
+    UserAchievement: ACHIEVEMENTS,
+}
+
+
+@receiver(pre_save, sender=MoodEntry)
+def remember_previous_mood_entry(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored state of a mood entry before it is updated.
+
+    Args:
+        sender: The MoodEntry model class.
+        instance: The MoodEntry about to be saved.
+        raw: True when loading fixtures, in which case nothing is tracked.
+    """
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._rollup_previous = MoodEntry.objects.filter(pk=instance.pk).values(
+        'user_id', 'date', 'mood', 'intensity'
+    ).first()
+
+
+@receiver(post_save, sender=MoodEntry)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Fold a created or updated mood entry into the daily rollup table.
+
+    Args:
+        sender: The MoodEntry model class.
+        instance: The saved MoodEntry.
+        created: True if a new row was inserted.
+        raw: True when loading fixtures, in which case nothing is updated.
+    """
+    if raw:
+        return
+
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        # Updates are rare, so recompute the affected days from raw entries
+        rollups.refresh_day(previous['user_id'], previous['date'])
+        if (previous['user_id'], previous['date']) != (instance.user_id, rollups.normalize_date(instance.date)):
+            rollups.refresh_day(instance.user_id, instance.date)
+            streaks.invalidate(previous['user_id'])
+            streaks.invalidate(instance.user_id)
+        return
+
+    rollups.add_entry(instance.user_id, instance.date, instance.mood, instance.intensity)
+    streaks.record_activity(instance.user_id, rollups.normalize_date(instance.date))
+    achievements.evaluate(instance.user_id, 'mood')
+
+
+@receiver(post_delete, sender=MoodEntry)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted mood entry from the daily rollup table.
+
+    Args:
+        sender: The MoodEntry model class.
+        instance: The deleted MoodEntry.
+    """
+    remaining = rollups.remove_entry(instance.user_id, instance.date, instance.mood, instance.intensity)
+    if remaining is None:
+        # The day no longer has any entries, so it drops out of the streak
+        streaks.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Journal)
+def evaluate_achievements_on_journal(sender, instance, created, raw=False, **kwargs):
+    """
+    Check journal and milestone achievements when a journal is written.
+
+    Args:
+        sender: The Journal model class.
+        instance: The saved Journal.
+        created: True if a new row was inserted.
+        raw: True when loading fixtures, in which case nothing is evaluated.
+    """
+    if created and not raw:
+        achievements.evaluate(instance.user_id, 'journal')
+
+
+@receiver(post_save, sender=Reminder)
+def evaluate_achievements_on_reminder(sender, instance, created, raw=False, **kwargs):
+    """
+    Check milestone achievements when a reminder is created.
+
+    Args:
+        sender: The Reminder model class.
+        instance: The saved Reminder.
+        created: True if a new row was inserted.
+        raw: True when loading fixtures, in which case nothing is evaluated.
+    """
+    if created and not raw:
+        achievements.evaluate(instance.user_id, 'reminder')
+
+
+@receiver(post_save, sender=MoodEntry)
+@receiver(post_delete, sender=MoodEntry)
+@receiver(post_save, sender=Journal)
+@receiver(post_delete, sender=Journal)
+@receiver(post_save, sender=Reminder)
+@receiver(post_delete, sender=Reminder)
+@receiver(post_save, sender=UserAchievement)
+@receiver(post_delete, sender=UserAchievement)
+def invalidate_cached_user_data(sender, instance, **kwargs):
+    """
+    Invalidate cached data built from the kind of row that was written.
+
+    Args:
+        sender: The MoodEntry, Journal, Reminder or UserAchievement model class.
+        instance: The saved or deleted row.
+    """
+    tiered_cache.invalidate_tags_on_commit(user_tag(instance.user_id, CACHE_TAGS[sender]))
+
+
+@receiver(post_save, sender=MoodEntry)
+@receiver(post_delete, sender=MoodEntry)
+@receiver(post_save, sender=Journal)
+@receiver(post_delete, sender=Journal)
+@receiver(post_save, sender=Reminder)
+@receiver(post_delete, sender=Reminder)
+@receiver(post_save, sender=UserAchievement)
+@receiver(post_delete, sender=UserAchievement)
+def bump_data_version(sender, instance, raw=False, **kwargs):
+    """
+    Advance the data version of the user who wrote the row.
+
+    Args:
+        sender: The MoodEntry, Journal, Reminder or UserAchievement model class.
+        instance: The saved or deleted row.
+        raw: True when loading fixtures, in which case nothing is bumped.
+    """
+    if not raw:
+        versioning.bump(instance.user_id)
+
+
+@receiver(post_save, sender=Journal)
+def index_journal(sender, instance, raw=False, **kwargs):
+    """
+    Add or refresh a saved journal in the search index.
+
+    Args:
+        sender: The Journal model class.
+        instance: The saved Journal.
+        raw: True when loading fixtures, in which case nothing is indexed.
+    """
+    if not raw:
+        search.index_journal(instance)
+
+
+@receiver(post_save, sender=MoodEntry)
+def index_mood_entry(sender, instance, created, raw=False, **kwargs):
+    """
+    Add, refresh or drop a saved mood entry's notes in the search index.
+
+    Args:
+        sender: The MoodEntry model class.
+        instance: The saved MoodEntry.
+        created: True if a new row was inserted.
+        raw: True when loading fixtures, in which case nothing is indexed.
+    """
+    # New entries without notes have nothing to index or remove
+    if raw or (created and not instance.notes):
+        return
+    search.index_mood_entry(instance)
+
+
+@receiver(post_delete, sender=Journal)
+@receiver(post_delete, sender=MoodEntry)
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    Drop a deleted journal or mood entry from the search index.
+
+    Args:
+        sender: The Journal or MoodEntry model class.
+        instance: The deleted row.
+    """
+    kind = search.KIND_JOURNAL if sender is Journal else search.KIND_MOOD
+    search.remove(kind, instance.pk, instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop a saved or deleted user from the per-process user cache.
+
+    Args:
+        sender: The User model class.
+        instance: The saved or deleted User.
+    """
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def bump_data_version_on_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Start a new user's data version, or advance it when their profile changes.
+
+    Args:
+        sender: The User model class.
+        instance: The saved User.
+        created: True if a new row was inserted.
+        raw: True when loading fixtures, in which case nothing is written.
+    """
+    if raw:
+        return
+    if created:
+        versioning.create(instance.pk)
+    else:
+        # Usernames and profile pictures show up on every page
+        versioning.bump(instance.pk)
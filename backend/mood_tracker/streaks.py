@@ -0,0 +1,191 @@
+"""
+Constant-time mood tracking streak and consistency engine.
+
+Streak state lives in one UserStreak row per user and is advanced on every
+mood write, so reading a user's streak or 30-day consistency never walks
+their mood history. Backdated writes and deletions fall back to rebuilding
+the row from the daily rollup dates, which hold one row per active day.
+"""
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailyMoodRollup, UserStreak
+
+# Number of trailing days tracked in the activity bitmap
+ACTIVITY_WINDOW_DAYS = 30
+ACTIVITY_MASK = (1 << ACTIVITY_WINDOW_DAYS) - 1
+
+
+def record_activity(user_id, date):
+    """
+    Advance a user's streak state for a mood entry on the given date.
+
+    Args:
+        user_id: Primary key of the user.
+        date: Date of the new mood entry.
+
+    Returns:
+        UserStreak: The updated streak state.
+    """
+    with transaction.atomic():
+        streak = UserStreak.objects.select_for_update().filter(user_id=user_id).first()
+        if streak is None or streak.last_active_date is None:
+            return rebuild(user_id)
+
+        last_active = streak.last_active_date
+        if date == last_active:
+            return streak
+        if date < last_active:
+            # A backdated entry can bridge gaps, so recompute from history
+            return rebuild(user_id)
+
+        gap = (date - last_active).days
+        streak.current_streak = streak.current_streak + 1 if gap == 1 else 1
+        streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+        streak.activity_bitmap = ((streak.activity_bitmap << gap) | 1) & ACTIVITY_MASK if gap < ACTIVITY_WINDOW_DAYS else 1
+        streak.last_active_date = date
+        streak.save()
+        return streak
+
+
+def rebuild(user_id):
+    """
+    Recompute a user's streak state from their active days.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        UserStreak: The rebuilt streak state.
+    """
+    dates = DailyMoodRollup.objects.filter(user_id=user_id).order_by('date').values_list('date', flat=True)
+
+    longest = 0
+    run = 0
+    previous = None
+    for date in dates:
+        run = run + 1 if previous is not None and (date - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = date
+
+    bitmap = 0
+    if previous is not None:
+        window_start = previous - datetime.timedelta(days=ACTIVITY_WINDOW_DAYS - 1)
+        for date in DailyMoodRollup.objects.filter(
+            user_id=user_id, date__gte=window_start
+        ).values_list('date', flat=True):
+            bitmap |= 1 << (previous - date).days
+
+    streak, _ = UserStreak.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'current_streak': run,
+            'longest_streak': longest,
+            'last_active_date': previous,
+            'activity_bitmap': bitmap,
+        },
+    )
+    return streak
+
+
+def invalidate(user_id):
+    """
+    Discard a user's stored streak state so it is rebuilt on next access.
+
+    Used when history is removed or moved, which cannot be applied
+    incrementally. Deleting rather than rebuilding keeps this safe to call
+    while the user itself is being deleted.
+
+    Args:
+        user_id: Primary key of the user.
+    """
+    UserStreak.objects.filter(user_id=user_id).delete()
+
+
+def get_streak(user):
+    """
+    Fetch a user's streak state, building it on first access.
+
+    Args:
+        user: User object (or primary key).
+
+    Returns:
+        UserStreak: The user's streak state.
+    """
+    user_id = getattr(user, 'pk', user)
+    streak = UserStreak.objects.filter(user_id=user_id).first()
+    if streak is None:
+        streak = rebuild(user_id)
+    return streak
+
+
+def get_streak_stats(user, today=None):
+    """
+    Return streak and consistency figures for a user as of a given day.
+
+    This is the shared entry point for the dashboard, the achievements page
+    and the achievements API.
+
+    Args:
+        user: User object (or primary key).
+        today: Optional reference date, defaults to the current date.
+
+    Returns:
+        dict: current_streak (consecutive days ending today), longest_streak,
+            consistency (active days in the last 30 days), last_active_date
+            and activity (30 booleans, oldest first, ending today).
+    """
+    return streak_stats(get_streak(user), today)
+
+
+async def aget_streak_stats(user, today=None):
+    """
+    Async version of get_streak_stats for async views.
+
+    Args:
+        user: User object (or primary key).
+        today: Optional reference date, defaults to the current date.
+
+    Returns:
+        dict: See get_streak_stats.
+    """
+    user_id = getattr(user, 'pk', user)
+    streak = await UserStreak.objects.filter(user_id=user_id).afirst()
+    if streak is None:
+        # First access builds and saves the row with the sync ORM
+        streak = await sync_to_async(rebuild)(user_id)
+    return streak_stats(streak, today)
+
+
+def streak_stats(streak, today=None):
+    """
+    Project stored streak state onto a reference date.
+
+    Args:
+        streak: UserStreak instance.
+        today: Optional reference date, defaults to the current date.
+
+    Returns:
+        dict: See get_streak_stats.
+    """
+    today = today or timezone.now().date()
+    last_active = streak.last_active_date
+
+    if last_active is None:
+        bitmap = 0
+        current = 0
+    else:
+        offset = max((today - last_active).days, 0)
+        bitmap = (streak.activity_bitmap << offset) & ACTIVITY_MASK if offset < ACTIVITY_WINDOW_DAYS else 0
+        current = streak.current_streak if offset == 0 else 0
+
+    return {
+        'current_streak': current,
+        'longest_streak': streak.longest_streak,
+        'consistency': bin(bitmap).count('1'),
+        'last_active_date': last_active,
+        'activity': [bool(bitmap & (1 << day)) for day in reversed(range(ACTIVITY_WINDOW_DAYS))],
+    }
@@ -1,3 +1,1677 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+import unittest.mock
 
-# Create your tests here.
+import jwt
+from asgiref.sync import sync_to_async
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.management.base import SystemCheckError
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from PIL import Image
+
+from mindmate.cache import TieredCache, tiered_cache, user_tag, MOODS
+from mindmate.middleware import RequestTimingMiddleware
+
+from . import achievements, analytics, downsampling, exports, images, ingest, jobs, rollups, search, streaks, tokens
+from .auth import user_cache
+from .dashboard import DashboardSnapshot
+from .models import (
+    User, DeviceToken, MoodEntry, Journal, Reminder, DailyMoodRollup, UserStreak, Job, Achievement, UserAchievement
+)
+from .forms import UserProfileForm
+from .notifications import BaseNotifier, Notification, PushNotifier
+from .push import FakeTransport, FCMTransport, PushDispatcher, PushMessage, TransientError
+from .pagination import keyset_page, MOOD_ENTRY_ORDERING
+from .scheduling import ReminderIndex, ReminderScheduler
+
+
+class UserTestCase(TestCase):
+    """
+    Base class for tests that need users and a logged-in client.
+    """
+
+    def create_user(self, uid='user-1', username='user'):
+        """
+        Create a user with an example.com address derived from the username.
+        """
+        return User.objects.create(uid=uid, email=f'{username}@example.com', username=username)
+
+    def log_in(self, user):
+        """
+        Log the test client in as a user through the session.
+
+        Returns:
+            SessionBase: The saved session.
+        """
+        session = self.client.session
+        session['user_id'] = user.uid
+        session.save()
+        return session
+
+
+class DashboardSnapshotTests(UserTestCase):
+    """
+    Query budget and invalidation tests for the cached dashboard snapshot.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with one mood entry and empty caches.
+        """
+        cache.clear()
+        tiered_cache.clear()
+        user_cache.clear()
+        self.user = self.create_user()
+        MoodEntry.objects.create(user=self.user, mood='happy', intensity=6)
+        self.log_in(self.user)
+
+    def test_build_uses_three_queries(self):
+        """
+        Building a snapshot runs one query each for the mood window, journal count and streak.
+        """
+        with self.assertNumQueries(3):
+            snapshot = DashboardSnapshot.build(self.user)
+        self.assertEqual(len(snapshot.recent_moods), 1)
+        self.assertEqual(snapshot.day_streak, 1)
+
+    def test_cache_hit_costs_zero_queries(self):
+        """
+        A cached snapshot is served without touching the database.
+        """
+        DashboardSnapshot.for_user(self.user)
+        with self.assertNumQueries(0):
+            DashboardSnapshot.for_user(self.user)
+
+    def test_writes_invalidate_snapshot(self):
+        """
+        Mood and journal writes drop the cached snapshot.
+        """
+        DashboardSnapshot.for_user(self.user)
+        MoodEntry.objects.create(user=self.user, mood='calm', intensity=4)
+        self.assertEqual(len(DashboardSnapshot.for_user(self.user).recent_moods), 2)
+
+        Journal.objects.create(user=self.user, content='A quiet day')
+        self.assertEqual(DashboardSnapshot.for_user(self.user).total_journals, 1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', SESSION_SAVE_EVERY_REQUEST=True)
+    def test_dashboard_request_query_budget(self):
+        """
+        The dashboard view stays within a fixed query budget per request.
+
+        Session load and the session save (a savepoint, update and release)
+        are paid on every request. The user lookup, the data version lookup
+        and the snapshot's three queries are only paid on the first request;
+        after that all three are served from cache.
+        """
+        with self.assertNumQueries(9):
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+
+class CurrentUserResolutionTests(UserTestCase):
+    """
+    Tests for request-scoped resolution of the session user.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user and an empty user cache.
+        """
+        user_cache.clear()
+        self.user = self.create_user()
+        self.log_in(self.user)
+
+    def user_lookups(self, path):
+        """
+        Request a page and count the queries that hit the user table.
+
+        Args:
+            path: URL to request.
+
+        Returns:
+            int: Number of SELECT queries against mood_tracker_user.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path)
+        return sum(
+            query['sql'].startswith('SELECT') and 'FROM "mood_tracker_user"' in query['sql']
+            for query in queries.captured_queries
+        )
+
+    def test_request_resolves_user_at_most_once(self):
+        """
+        A request looks the user up at most once, and not at all on a cache hit.
+        """
+        self.assertEqual(self.user_lookups('/journals/'), 1)
+        self.assertEqual(self.user_lookups('/journals/'), 0)
+
+    def test_profile_save_invalidates_cache(self):
+        """
+        Saving a user drops the cached copy so later requests see the change.
+        """
+        self.client.get('/profile/')
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.uid))
+
+
+class RecordingNotifier(BaseNotifier):
+    """
+    Notifier that keeps sent notifications in memory.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, notifications):
+        self.sent.extend(notifications)
+        return len(notifications)
+
+
+class ReminderSchedulerTests(UserTestCase):
+    """
+    Tests for the minute-bucketed reminder index and dispatcher.
+    """
+
+    def setUp(self):
+        """
+        Create a user with a Monday/Wednesday reminder at 09:00 and an inactive one.
+        """
+        self.user = self.create_user()
+        DeviceToken.objects.create(user=self.user, token='token-1')
+        DeviceToken.objects.create(user=self.user, token='token-2')
+        self.reminder = Reminder.objects.create(user=self.user, time=datetime.time(9, 0), weekdays=[0, 2])
+        Reminder.objects.create(user=self.user, time=datetime.time(9, 0), weekdays=[0], is_active=False)
+        # 2024-01-01 is a Monday
+        self.monday_9am = datetime.datetime(2024, 1, 1, 9, 0)
+
+    def test_index_files_reminder_per_weekday(self):
+        """
+        Active reminders are filed under each of their weekdays; inactive ones are skipped.
+        """
+        index = ReminderIndex.build()
+        self.assertEqual(index.size, 2)
+        self.assertEqual(index.next_key(0), 9 * 60)
+
+    def test_tick_dispatches_due_bucket_once(self):
+        """
+        A tick sends the due bucket in one batch, and repeating the minute sends nothing.
+        """
+        notifier = RecordingNotifier()
+        scheduler = ReminderScheduler(notifier)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(scheduler.tick(self.monday_9am), 1)
+        self.assertEqual(notifier.sent[0].reminder_id, self.reminder.id)
+        self.assertEqual(sorted(notifier.sent[0].tokens), ['token-1', 'token-2'])
+        self.assertEqual(scheduler.tick(self.monday_9am), 0)
+
+    def test_tick_catches_up_missed_minutes(self):
+        """
+        Buckets that came due between ticks are still dispatched.
+        """
+        notifier = RecordingNotifier()
+        scheduler = ReminderScheduler(notifier)
+        scheduler.tick(self.monday_9am - datetime.timedelta(minutes=5))
+        self.assertEqual(scheduler.tick(self.monday_9am + datetime.timedelta(minutes=3)), 1)
+
+    def test_due_at_matches_weekday_and_minute(self):
+        """
+        due_at finds active reminders by weekday bit and minute, through the due index.
+        """
+        due = Reminder.objects.due_at(2, datetime.time(9, 0, 30))
+        self.assertEqual(list(due), [self.reminder])
+        self.assertFalse(Reminder.objects.due_at(1, datetime.time(9, 0)).exists())
+        self.assertFalse(Reminder.objects.due_at(0, datetime.time(9, 1)).exists())
+        self.assertIn('reminder_due_idx', due.explain())
+
+
+class PushDeliveryTests(UserTestCase):
+    """
+    Tests for the batched push pipeline and dead-token pruning.
+    """
+
+    def setUp(self):
+        """
+        Register two devices for one user and one for another.
+        """
+        self.user = self.create_user()
+        other = self.create_user('user-2', 'other')
+        for user, token in ((self.user, 'phone'), (self.user, 'laptop'), (other, 'tablet')):
+            DeviceToken.objects.create(user=user, token=token)
+        self.now = datetime.datetime(2024, 1, 1, 9, 0)
+
+    def notifier(self, **transport_options):
+        """
+        Build a PushNotifier over a fake transport without retry delays.
+        """
+        return PushNotifier(transport_options=transport_options, workers=1, backoff=0)
+
+    def test_same_payload_is_one_multicast(self):
+        """
+        Every device due the same reminder shares a single request.
+        """
+        notifier = self.notifier()
+        sent = notifier.send([
+            Notification(1, 'user-1', ['phone', 'laptop'], self.now),
+            Notification(2, 'user-2', ['tablet'], self.now),
+        ])
+        notifier.close()
+
+        transport = notifier.dispatcher.transport
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(transport.requests), 1)
+        self.assertEqual(sorted(transport.requests[0][0]), ['laptop', 'phone', 'tablet'])
+        stats = notifier.stats()
+        self.assertEqual((stats['requests'], stats['delivered'], stats['queued']), (1, 3, 3))
+
+    def test_multicasts_are_capped_at_batch_size(self):
+        """
+        Large fan-outs are split into requests of at most batch_size tokens.
+        """
+        transport = FakeTransport()
+        dispatcher = PushDispatcher(transport, workers=1, batch_size=2, prune=lambda tokens: 0)
+        dispatcher.submit(PushMessage(['a', 'b', 'c', 'd', 'e'], 'title', 'body'))
+        dispatcher.close()
+        self.assertEqual([len(tokens) for tokens, *_ in transport.requests], [2, 2, 1])
+
+    def test_transient_failures_are_retried(self):
+        """
+        A failed request is retried with backoff until it goes through.
+        """
+        notifier = self.notifier(fail_requests=2)
+        self.assertEqual(notifier.send([Notification(1, 'user-1', ['phone'], self.now)]), 1)
+        notifier.close()
+        stats = notifier.stats()
+        self.assertEqual((stats['requests'], stats['retried'], stats['failed']), (3, 2, 0))
+
+    def test_exhausted_retries_count_as_failed(self):
+        """
+        Tokens still failing after max_attempts requests are counted as failed.
+        """
+        transport = FakeTransport(fail_requests=5)
+        with self.assertRaises(TransientError):
+            FakeTransport(fail_requests=1).send_multicast(['a'], 'title', 'body', {})
+
+        dispatcher = PushDispatcher(transport, workers=1, max_attempts=3, backoff=0, prune=lambda tokens: 0)
+        dispatcher.submit(PushMessage(['a', 'b'], 'title', 'body'))
+        dispatcher.close()
+
+        stats = dispatcher.stats.snapshot()
+        self.assertEqual((stats['requests'], stats['retried'], stats['delivered'], stats['failed']), (3, 4, 0, 2))
+        self.assertEqual((transport.requests, transport.fail_requests), ([], 2))
+
+    def test_unregistered_tokens_are_pruned(self):
+        """
+        Tokens the provider rejects as unregistered are deleted after the send.
+        """
+        notifier = self.notifier(invalid_tokens={'laptop'})
+        self.assertEqual(notifier.send([Notification(1, 'user-1', ['phone', 'laptop'], self.now)]), 1)
+        notifier.close()
+        self.assertEqual(notifier.stats()['pruned'], 1)
+        self.assertEqual(set(DeviceToken.objects.values_list('token', flat=True)), {'phone', 'tablet'})
+
+    def test_fcm_prunes_only_unregistered_tokens(self):
+        """
+        FCM errors naming the token are pruned; invalid-argument errors are only logged.
+        """
+        from firebase_admin import exceptions, messaging
+
+        with unittest.mock.patch.dict('firebase_admin._apps', {'[DEFAULT]': object()}):
+            transport = FCMTransport()
+        response = messaging.BatchResponse([
+            messaging.SendResponse({'name': 'sent'}, None),
+            messaging.SendResponse(None, messaging.UnregisteredError('Token is not registered')),
+            messaging.SendResponse(None, exceptions.InvalidArgumentError('Payload too large')),
+            messaging.SendResponse(None, exceptions.UnavailableError('Try again')),
+        ])
+        with unittest.mock.patch.object(messaging, 'send_each_for_multicast', return_value=response):
+            with self.assertLogs('mood_tracker.push', 'WARNING'):
+                result = transport.send_multicast(['phone', 'old', 'tablet', 'laptop'], 'Title', 'Body', {})
+
+        self.assertEqual((result.delivered, result.invalid, result.retry), (1, ['old'], ['laptop']))
+
+    def test_scheduler_reaches_every_device(self):
+        """
+        A due reminder is delivered to all of its user's devices.
+        """
+        Reminder.objects.create(user=self.user, time=datetime.time(9, 0), weekdays=[0])
+        notifier = self.notifier()
+        self.assertEqual(ReminderScheduler(notifier).tick(self.now), 2)
+        notifier.close()
+        self.assertEqual(sorted(notifier.dispatcher.transport.delivered), ['laptop', 'phone'])
+
+    def test_full_queue_drops_messages(self):
+        """
+        submit gives up after its timeout when the queue stays full.
+        """
+        # No workers, so nothing drains the queue
+        dispatcher = PushDispatcher(FakeTransport(), workers=0, queue_size=1)
+        self.assertTrue(dispatcher.submit(PushMessage(['a'], 'title', 'body'), timeout=0))
+        self.assertFalse(dispatcher.submit(PushMessage(['b'], 'title', 'body'), timeout=0))
+        self.assertEqual(dispatcher.stats.snapshot()['dropped'], 1)
+
+
+class SearchTests(UserTestCase):
+    """
+    Tests for full-text search over journals and mood notes.
+    """
+
+    def setUp(self):
+        """
+        Create a user with one journal and one mood entry with notes.
+        """
+        cache.clear()
+        self.user = self.create_user()
+        self.journal = Journal.objects.create(
+            user=self.user, title='Rainy walk', content='Went running in the <rain> and felt calm afterwards.'
+        )
+        self.entry = MoodEntry.objects.create(user=self.user, mood='calm', intensity=5, notes='Calm after a long run')
+        other = self.create_user('user-2', 'other')
+        Journal.objects.create(user=other, content='Running late again')
+
+    def test_index_follows_writes(self):
+        """
+        Saves and deletes are reflected in search results, scoped to the user.
+        """
+        hits = search.search(self.user, 'running')
+        self.assertEqual({hit['id'] for hit in hits}, {str(self.journal.pk), str(self.entry.pk)})
+
+        self.journal.content = 'A sunny afternoon'
+        self.journal.save()
+        self.assertEqual([hit['kind'] for hit in search.search(self.user, 'running')], ['mood'])
+
+        self.entry.delete()
+        self.assertEqual(search.search(self.user, 'running'), [])
+
+    def test_backends_highlight_escaped_matches(self):
+        """
+        Both backends wrap matches in <mark> and escape the surrounding text.
+        """
+        for backend in (search.get_backend(), search.PythonBackend()):
+            hits = backend.search(self.user.pk, ['rain'], [search.KIND_JOURNAL], 10)
+            self.assertEqual(len(hits), 1, backend.name)
+            self.assertIn('&lt;<mark>rain</mark>&gt;', hits[0]['snippet'])
+
+    def test_journal_list_searches_on_server(self):
+        """
+        The journal page filters by ?q= and shows highlighted snippets.
+        """
+        self.log_in(self.user)
+        response = self.client.get('/journals/', {'q': 'calm'})
+        self.assertEqual([journal.pk for journal in response.context['journals']], [self.journal.pk])
+        self.assertContains(response, '<mark>calm</mark>')
+
+
+class KeysetPaginationTests(UserTestCase):
+    """
+    Tests for cursor pagination of mood entries and journals.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with 25 mood entries, several sharing a timestamp.
+        """
+        self.user = self.create_user()
+        today = datetime.date(2026, 1, 31)
+        for i in range(25):
+            MoodEntry.objects.create(
+                user=self.user,
+                mood='happy',
+                intensity=5,
+                date=today - datetime.timedelta(days=i // 5),
+                time=datetime.time(9, 0),
+            )
+        self.log_in(self.user)
+
+    def test_pages_cover_every_row_once(self):
+        """
+        Walking the cursors returns each row exactly once, in order, even across ties.
+        """
+        queryset = MoodEntry.objects.filter(user=self.user)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(queryset, MOOD_ENTRY_ORDERING, cursor, page_size=7)
+            seen.extend(row.pk for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(queryset.order_by(*MOOD_ENTRY_ORDERING).values_list('pk', flat=True)))
+
+    def test_deep_page_costs_one_query(self):
+        """
+        A page far into the list is a single query, like the first page.
+        """
+        queryset = MoodEntry.objects.filter(user=self.user)
+        _, cursor = keyset_page(queryset, MOOD_ENTRY_ORDERING, None, page_size=20)
+        with self.assertNumQueries(1):
+            rows, next_cursor = keyset_page(queryset, MOOD_ENTRY_ORDERING, cursor, page_size=20)
+        self.assertEqual((len(rows), next_cursor), (5, None))
+
+    def test_mood_history_partial_returns_next_rows(self):
+        """
+        The history table loads further rows as a fragment, and bad cursors fall back to page one.
+        """
+        params = {'start_date': '2026-01-01', 'end_date': '2026-01-31'}
+        response = self.client.get('/mood-history/', params)
+        self.assertEqual(len(response.context['mood_entries']), 20)
+        next_page = response.context['next_page']
+
+        fragment = self.client.get(next_page + '&partial=1')
+        self.assertEqual(len(fragment.context['mood_entries']), 5)
+        self.assertNotIn('X-Next-Page', fragment)
+        self.assertNotContains(fragment, '<html')
+
+        response = self.client.get('/mood-history/', {**params, 'cursor': 'not-a-cursor'})
+        self.assertEqual(len(response.context['mood_entries']), 20)
+
+
+class BulkIngestTests(UserTestCase):
+    """
+    Tests for bulk mood entry ingestion.
+    """
+
+    def setUp(self):
+        """
+        Create a user and a small upload in the export's NDJSON shape.
+        """
+        self.user = self.create_user()
+        self.upload = '\n'.join([
+            '{"date": "2026-01-01", "time": "08:00:00", "mood": "Happy", "intensity": 7, "client_key": "a"}',
+            '{"date": "2026-01-01", "time": "20:00:00", "mood": "sad", "intensity": 3, "notes": "Long day", "client_key": "b"}',
+            '{"date": "2026-01-02", "time": "09:30:00", "mood": "Calm", "intensity": 5, "client_key": "c"}',
+        ])
+
+    def test_batch_updates_derived_data_once(self):
+        """
+        Entries are inserted with a fixed number of queries, and rollups, streak and search match.
+        """
+        records = ingest.parse_records(self.upload, 'ndjson')
+        search.get_backend()
+        with CaptureQueriesContext(connection) as small:
+            ingest.ingest_mood_entries(self.user, records)
+        MoodEntry.objects.all().delete()
+        DailyMoodRollup.objects.all().delete()
+        UserStreak.objects.all().delete()
+
+        many = [dict(record, client_key=f'{record["client_key"]}{i}') for i in range(30) for record in records]
+        with CaptureQueriesContext(connection) as large:
+            summary = ingest.ingest_mood_entries(self.user, many)
+        self.assertEqual(summary['created'], 90)
+        self.assertEqual(len(large), len(small))
+
+        day = DailyMoodRollup.objects.get(user=self.user, date=datetime.date(2026, 1, 1))
+        self.assertEqual((day.entry_count, day.intensity_min, day.intensity_max), (60, 3, 7))
+        self.assertEqual(UserStreak.objects.get(user=self.user).current_streak, 2)
+        self.assertEqual(len(search.search(self.user, 'long day', limit=50)), 30)
+
+    def test_client_keys_make_retries_idempotent(self):
+        """
+        Re-sending an upload creates nothing and returns the original ids.
+        """
+        records = ingest.parse_records(self.upload, 'ndjson')
+        first = ingest.ingest_mood_entries(self.user, records)
+        second = ingest.ingest_mood_entries(self.user, records + [dict(records[0])])
+        self.assertEqual((first['created'], second['created'], second['duplicates']), (3, 0, 4))
+        self.assertEqual(sorted(first['entries'], key=str), sorted(second['entries'], key=str))
+        self.assertEqual(MoodEntry.objects.filter(user=self.user).count(), 3)
+
+    def test_invalid_row_rejects_batch(self):
+        """
+        Without skip_invalid one bad row means nothing is written.
+        """
+        records = ingest.parse_records(self.upload, 'ndjson')
+        records[1]['intensity'] = 11
+        summary = ingest.ingest_mood_entries(self.user, records)
+        self.assertEqual(summary['errors'], [{'index': 1, 'errors': {'intensity': 'Ensure this value is between 1 and 10.'}}])
+        self.assertFalse(MoodEntry.objects.exists())
+
+        summary = ingest.ingest_mood_entries(self.user, records, skip_invalid=True)
+        self.assertEqual(summary['created'], 2)
+
+    def test_import_command_round_trips_export(self):
+        """
+        A CSV export imports into another account, and importing it again adds nothing.
+        """
+        ingest.ingest_mood_entries(self.user, ingest.parse_records(self.upload, 'ndjson'))
+        export = b''.join(
+            chunk if isinstance(chunk, bytes) else chunk.encode()
+            for chunk in exports.export_response(self.user, 'mood', 'csv').streaming_content
+        )
+        other = self.create_user('user-2', 'other')
+        path = os.path.join(tempfile.mkdtemp(), 'mood_data.csv')
+        with open(path, 'wb') as f:
+            f.write(export)
+
+        call_command('import_moods', path, user=other.uid, stdout=io.StringIO())
+        call_command('import_moods', path, user=other.uid, stdout=io.StringIO())
+        self.assertEqual(
+            sorted(MoodEntry.objects.filter(user=other).values_list('date', 'time', 'mood', 'intensity')),
+            sorted(MoodEntry.objects.filter(user=self.user).values_list('date', 'time', 'mood', 'intensity')),
+        )
+
+
+class RollupMaintenanceTests(UserTestCase):
+    """
+    Tests for keeping the daily mood rollups in step with mood entry writes.
+    """
+
+    def setUp(self):
+        """
+        Create a user with two entries on one day.
+        """
+        self.user = self.create_user()
+        self.day = datetime.date(2026, 1, 5)
+        self.low = MoodEntry.objects.create(user=self.user, date=self.day, mood='sad', intensity=2)
+        self.high = MoodEntry.objects.create(user=self.user, date=self.day, mood='happy', intensity=8)
+
+    def rollup(self, date):
+        """
+        Return the user's rollup fields for a day, or None if there is no row.
+        """
+        return DailyMoodRollup.objects.filter(user=self.user, date=date).values_list(
+            'entry_count', 'intensity_sum', 'intensity_min', 'intensity_max', 'mood_counts'
+        ).first()
+
+    def test_add_and_remove_entries(self):
+        """
+        Adding and removing entries adjusts counts, sums, extremes and mood counts.
+        """
+        self.assertEqual(self.rollup(self.day), (2, 10, 2, 8, {'sad': 1, 'happy': 1}))
+
+        rollups.add_entry(self.user.pk, self.day, 'happy', 5)
+        self.assertEqual(self.rollup(self.day), (3, 15, 2, 8, {'sad': 1, 'happy': 2}))
+
+        # Not an extreme, so decremented in place
+        rollups.remove_entry(self.user.pk, self.day, 'happy', 5)
+        self.assertEqual(self.rollup(self.day), (2, 10, 2, 8, {'sad': 1, 'happy': 1}))
+
+    def test_update_and_date_change(self):
+        """
+        Editing an entry refreshes its day, and moving it refreshes both days.
+        """
+        self.low.intensity = 4
+        self.low.mood = 'calm'
+        self.low.save()
+        self.assertEqual(self.rollup(self.day), (2, 12, 4, 8, {'calm': 1, 'happy': 1}))
+
+        next_day = self.day + datetime.timedelta(days=1)
+        self.high.date = next_day
+        self.high.save()
+        self.assertEqual(self.rollup(self.day), (1, 4, 4, 4, {'calm': 1}))
+        self.assertEqual(self.rollup(next_day), (1, 8, 8, 8, {'happy': 1}))
+
+    def test_delete(self):
+        """
+        Deleting the extreme entry recomputes the day and the last entry drops the row.
+        """
+        self.high.delete()
+        self.assertEqual(self.rollup(self.day), (1, 2, 2, 2, {'sad': 1}))
+        self.low.delete()
+        self.assertIsNone(self.rollup(self.day))
+
+        self.assertEqual(rollups.rebuild_user(self.user.pk), 0)
+        self.assertFalse(DailyMoodRollup.objects.filter(user=self.user).exists())
+
+
+class StreakTests(UserTestCase):
+    """
+    Tests for the incremental streak state and its rebuild fallback.
+    """
+
+    def setUp(self):
+        """
+        Create a user without entries.
+        """
+        self.user = self.create_user()
+        self.start = datetime.date(2026, 1, 1)
+
+    def log(self, day):
+        """
+        Create a mood entry the given number of days after the start date.
+        """
+        return MoodEntry.objects.create(
+            user=self.user, date=self.start + datetime.timedelta(days=day), mood='happy', intensity=5
+        )
+
+    def test_incremental_updates(self):
+        """
+        Consecutive days extend the streak, a gap restarts it and the bitmap shifts.
+        """
+        for day in (0, 1, 2, 5):
+            self.log(day)
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual((streak.current_streak, streak.longest_streak), (1, 3))
+        self.assertEqual(streak.last_active_date, self.start + datetime.timedelta(days=5))
+        self.assertEqual(streak.activity_bitmap, 0b111001)
+
+        # A second entry on the latest day changes nothing
+        self.log(5)
+        self.assertEqual(UserStreak.objects.get(user=self.user).activity_bitmap, 0b111001)
+
+    def test_backdated_and_deleted_entries(self):
+        """
+        A backdated entry bridging a gap and deleting a day both rebuild the streak.
+        """
+        self.log(0)
+        self.log(2)
+        self.assertEqual(UserStreak.objects.get(user=self.user).current_streak, 1)
+
+        bridge = self.log(1)
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.activity_bitmap), (3, 3, 0b111))
+
+        bridge.delete()
+        today = self.start + datetime.timedelta(days=2)
+        stats = streaks.get_streak_stats(self.user, today=today)
+        self.assertEqual((stats['current_streak'], stats['longest_streak'], stats['consistency']), (1, 1, 2))
+        self.assertEqual(stats['activity'][-3:], [True, False, True])
+        self.assertEqual(streaks.rebuild(self.user.pk).activity_bitmap, 0b101)
+
+    def test_activity_window(self):
+        """
+        The bitmap keeps only the last 30 days, on writes, rebuilds and reads.
+        """
+        self.log(0)
+        self.log(29)
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual(streak.activity_bitmap, 1 << 29 | 1)
+        self.assertEqual(streaks.rebuild(self.user.pk).activity_bitmap, 1 << 29 | 1)
+
+        self.log(30)
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual(streak.activity_bitmap, 0b11)
+        self.assertEqual(streak.activity_bitmap, streaks.rebuild(self.user.pk).activity_bitmap)
+
+        today = self.start + datetime.timedelta(days=45)
+        stats = streaks.get_streak_stats(self.user, today=today)
+        self.assertEqual((stats['current_streak'], stats['longest_streak'], stats['consistency']), (0, 2, 2))
+        self.assertEqual(len(stats['activity']), streaks.ACTIVITY_WINDOW_DAYS)
+
+        self.log(80)
+        self.assertEqual(UserStreak.objects.get(user=self.user).activity_bitmap, 1)
+
+
+class AchievementEvaluationTests(UserTestCase):
+    """
+    Tests for unlocking achievements on writes and in bulk.
+    """
+
+    def setUp(self):
+        """
+        Create a user and a small set of achievements.
+        """
+        self.user = self.create_user()
+        self.first_mood = Achievement.objects.create(
+            name='First mood', description='Log a mood', achievement_type='mood_count', requirement_value=1
+        )
+        self.streak = Achievement.objects.create(
+            name='Streak', description='Three days in a row', achievement_type='mood_streak', requirement_value=3
+        )
+        self.journal = Achievement.objects.create(
+            name='Writer', description='Write a journal', achievement_type='journal_count', requirement_value=1
+        )
+
+    def unlocked(self, user=None):
+        """
+        Return the names of the achievements a user has unlocked.
+        """
+        return set(UserAchievement.objects.filter(user=user or self.user).values_list('achievement__name', flat=True))
+
+    def test_evaluate_on_writes(self):
+        """
+        Writes unlock only the achievements their event can affect, once each.
+        """
+        start = datetime.date(2026, 1, 1)
+        MoodEntry.objects.create(user=self.user, date=start, mood='happy', intensity=5)
+        self.assertEqual(self.unlocked(), {'First mood'})
+
+        for day in (1, 2):
+            MoodEntry.objects.create(user=self.user, date=start + datetime.timedelta(days=day), mood='calm', intensity=5)
+        self.assertEqual(self.unlocked(), {'First mood', 'Streak'})
+
+        # Streak achievements stay unlocked once the streak is broken
+        MoodEntry.objects.create(user=self.user, date=start + datetime.timedelta(days=9), mood='calm', intensity=5)
+        self.assertEqual(achievements.evaluate(self.user, 'mood'), [])
+        self.assertEqual(UserAchievement.objects.filter(user=self.user).count(), 2)
+
+        Journal.objects.create(user=self.user, title='Day', content='Fine')
+        self.assertEqual(self.unlocked(), {'First mood', 'Streak', 'Writer'})
+        self.assertEqual(achievements.evaluate(self.user, 'journal'), [])
+
+    def test_evaluate_all(self):
+        """
+        The bulk evaluation unlocks missed achievements once and skips inactive ones.
+        """
+        other = self.create_user('user-2', 'other')
+        MoodEntry.objects.create(user=self.user, date=datetime.date(2026, 1, 1), mood='happy', intensity=5)
+        Journal.objects.create(user=other, title='Day', content='Fine')
+        UserAchievement.objects.all().delete()
+        self.journal.is_active = False
+        self.journal.save()
+
+        self.assertEqual(achievements.evaluate_all([self.user.pk, other.pk], batch_size=1), 1)
+        self.assertEqual(self.unlocked(), {'First mood'})
+        self.assertEqual(self.unlocked(other), set())
+        self.assertEqual(achievements.evaluate_all([self.user.pk, other.pk]), 0)
+
+
+class StreamingExportTests(UserTestCase):
+    """
+    Tests for the streaming CSV and NDJSON exports.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with moods and journals written out of order.
+        """
+        self.user = self.create_user()
+        other = self.create_user('user-2', 'other')
+        day = datetime.date(2026, 1, 5)
+        for date, time, mood, intensity, notes in [
+            (day + datetime.timedelta(days=1), datetime.time(9), 'sad', 3, 'Tired'),
+            (day, datetime.time(20), 'calm', 6, ''),
+            (day, datetime.time(8), 'happy', 8, 'Sunny, warm'),
+        ]:
+            MoodEntry.objects.create(user=self.user, date=date, time=time, mood=mood, intensity=intensity, notes=notes)
+        MoodEntry.objects.create(user=other, date=day, time=datetime.time(7), mood='angry', intensity=9)
+
+        for hour, title in [(21, 'Evening'), (12, 'Lunch')]:
+            journal = Journal.objects.create(user=self.user, title=title, content=f'{title} notes')
+            Journal.objects.filter(pk=journal.pk).update(
+                created_at=datetime.datetime(2026, 1, 5, hour, tzinfo=datetime.timezone.utc)
+            )
+        Journal.objects.create(user=other, title='Private', content='Not exported')
+
+        self.log_in(self.user)
+
+    def download(self, path):
+        """
+        GET a streaming export and return its lines.
+        """
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_mood_csv(self):
+        """
+        The mood CSV lists only the user's entries, oldest first, across fetch chunks.
+        """
+        lines = self.download('/api/moods/export/?type=csv')
+        self.assertEqual(lines, [
+            ','.join(exports.MOOD_CSV_HEADER),
+            '2026-01-05,08:00:00,Happy,8,"Sunny, warm"',
+            '2026-01-05,20:00:00,Calm,6,',
+            '2026-01-06,09:00:00,Sad,3,Tired',
+        ])
+
+    def test_journal_ndjson(self):
+        """
+        The journal NDJSON has one object per entry in creation order.
+        """
+        records = [json.loads(line) for line in self.download('/api/journals/export/?type=ndjson')]
+        self.assertEqual([record['title'] for record in records], ['Lunch', 'Evening'])
+        self.assertEqual(records[0]['content'], 'Lunch notes')
+        self.assertTrue(records[0]['created_at'].startswith('2026-01-05 12:00:00'))
+
+    def test_combined(self):
+        """
+        The combined export merges moods and journals by time in both formats.
+        """
+        lines = list(exports.iter_csv('all', self.user))
+        self.assertEqual(lines[0].strip(), ','.join(exports.COMBINED_CSV_HEADER))
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['mood', 'journal', 'mood', 'journal', 'mood'])
+        self.assertEqual(lines[2].strip(), 'journal,2026-01-05,12:00:00,,,Lunch,Lunch notes')
+
+        records = [json.loads(line) for line in exports.iter_ndjson('all', self.user)]
+        self.assertEqual(
+            [(record['type'], record['time']) for record in records],
+            [('mood', '08:00:00'), ('journal', '12:00:00'), ('mood', '20:00:00'), ('journal', '21:00:00'), ('mood', '09:00:00')],
+        )
+        self.assertEqual(records[-1]['date'], '2026-01-06')
+
+
+class SeedBenchTests(UserTestCase):
+    """
+    Tests for the synthetic benchmark data set command.
+    """
+
+    def seed(self, *args, **options):
+        """
+        Run seed_bench with a small data set.
+        """
+        options = {'users': 2, 'years': 0.1, 'entries_per_day': 2, 'journals': 3, 'reminders': 2, **options}
+        call_command('seed_bench', *args, stdout=io.StringIO(), **options)
+
+    def test_generates_requested_volume(self):
+        """
+        Every user gets the requested rows, with the derived data rebuilt.
+        """
+        self.seed()
+        users = User.objects.filter(uid__startswith='bench-')
+        self.assertEqual(sorted(users.values_list('uid', flat=True)), ['bench-0', 'bench-1'])
+        for user in users:
+            self.assertEqual(MoodEntry.objects.filter(user=user).count(), 72)
+            self.assertEqual(Journal.objects.filter(user=user).values('created_at').distinct().count(), 3)
+            self.assertEqual(Reminder.objects.filter(user=user).count(), 2)
+            days = MoodEntry.objects.filter(user=user).values('date').distinct().count()
+            self.assertEqual(DailyMoodRollup.objects.filter(user=user).count(), days)
+            self.assertEqual(DailyMoodRollup.objects.filter(user=user).summary()['total_entries'], 72)
+            self.assertTrue(UserStreak.objects.filter(user=user).exists())
+
+    def test_clear_replaces_only_generated_users(self):
+        """
+        Existing users with the prefix need --clear, which leaves other users alone.
+        """
+        self.seed()
+        other = self.create_user()
+        MoodEntry.objects.create(user=other, mood='happy', intensity=5)
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+        self.seed('--clear', users=1)
+        self.assertEqual(list(User.objects.filter(uid__startswith='bench-').values_list('uid', flat=True)), ['bench-0'])
+        self.assertEqual(MoodEntry.objects.filter(user_id='bench-0').count(), 72)
+        self.assertFalse(DailyMoodRollup.objects.filter(user_id='bench-1').exists())
+        self.assertEqual(DailyMoodRollup.objects.get(user=other).entry_count, 1)
+
+
+class AnalyticsTests(UserTestCase):
+    """
+    Tests for the vectorized mood analytics.
+    """
+
+    def setUp(self):
+        """
+        Create a user with an improving week of entries, including a gap day.
+        """
+        self.user = self.create_user()
+        start = datetime.date(2026, 1, 5)  # A Monday
+        for day, mood, intensity in [(0, 'sad', 2), (0, 'calm', 4), (1, 'calm', 5), (3, 'happy', 7), (6, 'happy', 9)]:
+            MoodEntry.objects.create(
+                user=self.user,
+                date=start + datetime.timedelta(days=day),
+                time=datetime.time(8 + day),
+                mood=mood,
+                intensity=intensity,
+            )
+
+    def test_series(self):
+        """
+        Rolling averages, heatmap, transitions and trend match hand-computed values.
+        """
+        with self.assertNumQueries(1):
+            result = analytics.build_analytics(self.user)
+
+        days = result['rolling_averages']
+        self.assertEqual(len(days), 7)
+        self.assertEqual((days[0]['average'], days[2]['average'], days[2]['rolling_7']), (3.0, None, 3.67))
+        self.assertEqual(days[6]['rolling_7'], 5.4)
+
+        self.assertEqual(result['heatmap']['counts'][0][8], 2)
+        self.assertEqual(result['heatmap']['average_intensity'][6][14], 9.0)
+
+        moods = analytics.MOOD_KEYS
+        counts = result['transitions']['counts']
+        self.assertEqual(counts[moods.index('calm')][moods.index('calm')], 1)
+        self.assertEqual(result['transitions']['probabilities'][moods.index('happy')][moods.index('happy')], 1.0)
+
+        self.assertEqual(result['trend']['direction'], 'improving')
+        self.assertEqual(result['total_entries'], 5)
+
+
+class MoodHistoryApiTests(UserTestCase):
+    """
+    Tests for the downsampled history and stats endpoints used by the React client.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with two years of entries, three a day.
+        """
+        self.user = self.create_user()
+        today = datetime.date.today()
+        MoodEntry.objects.bulk_create([
+            MoodEntry(
+                user=self.user,
+                date=today - datetime.timedelta(days=day),
+                time=datetime.time(8 + 4 * slot),
+                mood='happy' if day % 3 else 'sad',
+                intensity=1 + (day + slot) % 10,
+            )
+            for day in range(730)
+            for slot in range(3)
+        ])
+        rollups.rebuild_user(self.user.pk)
+        self.log_in(self.user)
+
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        """
+        LTTB returns the requested number of points, including both ends and an isolated spike.
+        """
+        y = [5] * 1000
+        y[500] = 10
+        keep = downsampling.lttb(range(1000), y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertIn(500, keep)
+
+    def test_mood_history_is_bounded(self):
+        """
+        A long range is bucketed automatically, and explicit resolutions respect the point limit.
+        """
+        response = self.client.get('/api/mood-entries/mood_history/', {'days': 365})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Resolution'], 'day')
+        self.assertEqual(len(response.json()), 366)
+        self.assertEqual(response.json()[0]['entries'], 3)
+
+        response = self.client.get('/api/mood-entries/mood_history/', {'days': 729, 'resolution': 'entry', 'points': 200})
+        self.assertEqual(len(response.json()), 200)
+
+        response = self.client.get('/api/moods/history/', {'days': 729})
+        self.assertEqual(response.json()['resolution'], 'week')
+        self.assertLessEqual(len(response.json()['dates']), downsampling.DEFAULT_MAX_POINTS)
+
+    def test_stats_and_export_routes(self):
+        """
+        The stats and export URLs the React client calls are served.
+        """
+        stats = self.client.get('/api/mood-entries/mood_stats/').json()
+        self.assertEqual(stats['total_entries'], 93)
+        self.assertEqual(stats['most_common_mood'], 'happy')
+        self.assertEqual(stats['streak'], 730)
+
+        response = self.client.get('/api/mood-entries/export_data/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2191)
+
+
+class MoodSummaryTests(UserTestCase):
+    """
+    Tests for the single-query mood entry and rollup summaries.
+    """
+
+    def setUp(self):
+        """
+        Create a user with entries over three days.
+        """
+        self.user = self.create_user()
+        self.today = datetime.date.today()
+        for offset, mood, intensity in [(0, 'happy', 8), (0, 'sad', 2), (1, 'happy', 6), (5, 'calm', 5)]:
+            MoodEntry.objects.create(
+                user=self.user, date=self.today - datetime.timedelta(days=offset), mood=mood, intensity=intensity
+            )
+
+    def test_summary_is_one_query(self):
+        """
+        Entry and rollup summaries each cost one query and agree.
+        """
+        start = self.today - datetime.timedelta(days=1)
+        with self.assertNumQueries(1):
+            entries = MoodEntry.objects.filter(user=self.user).summary(start, self.today)
+        with self.assertNumQueries(1):
+            days = DailyMoodRollup.objects.filter(user=self.user).summary(start, self.today)
+
+        self.assertEqual(entries, days)
+        self.assertEqual(entries['total_entries'], 3)
+        self.assertEqual(entries['active_days'], 2)
+        self.assertEqual(entries['average_intensity'], 16 / 3)
+        self.assertEqual((entries['min_intensity'], entries['max_intensity']), (2, 8))
+        self.assertEqual(entries['mood_counts'], {'happy': 2, 'sad': 1})
+
+    def test_stats_endpoint_reads_one_summary(self):
+        """
+        The stats endpoint runs a single query for its figures once the user is resolved.
+        """
+        self.log_in(self.user)
+        self.client.get('/api/moods/stats/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/moods/stats/', {'days': 7})
+        self.assertEqual(response.json()['total_entries'], 4)
+        self.assertEqual(len([query for query in queries if 'mood_tracker_dailymoodrollup' in query['sql']]), 1)
+
+
+class ConditionalGetTests(UserTestCase):
+    """
+    Tests for ETag revalidation of per-user read views.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with one mood entry and empty caches.
+        """
+        cache.clear()
+        tiered_cache.clear()
+        user_cache.clear()
+        self.user = self.create_user()
+        MoodEntry.objects.create(user=self.user, mood='happy', intensity=6)
+        self.log_in(self.user)
+
+    def test_repeat_poll_is_not_modified(self):
+        """
+        A matching If-None-Match gets a 304 without running the view's queries.
+        """
+        response = self.client.get('/api/mood-entries/mood_stats/')
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/mood-entries/mood_stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'mood_tracker_' in query['sql']])
+
+    def test_writes_change_the_etag(self):
+        """
+        Mood entry, journal, reminder and bulk writes each invalidate earlier ETags.
+        """
+        etags = [self.client.get('/dashboard/')['ETag']]
+        MoodEntry.objects.create(user=self.user, mood='calm', intensity=4)
+        etags.append(self.client.get('/dashboard/')['ETag'])
+        Journal.objects.create(user=self.user, content='A quiet day')
+        etags.append(self.client.get('/api/journals/')['ETag'])
+        Reminder.objects.create(user=self.user, time=datetime.time(9, 0))
+        etags.append(self.client.get('/api/journals/')['ETag'])
+        ingest.ingest_mood_entries(self.user, [{'date': '2024-01-01', 'time': '09:00', 'mood': 'sad', 'intensity': '3'}])
+        etags.append(self.client.get('/api/journals/')['ETag'])
+        self.assertEqual(len(set(etags)), len(etags))
+
+        response = self.client.get('/dashboard/', HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_last_modified(self):
+        """
+        Only the ETag validates, so If-Modified-Since alone never yields a stale 304.
+        """
+        response = self.client.get('/api/mood-entries/mood_stats/')
+        self.assertFalse(response.has_header('Last-Modified'))
+        MoodEntry.objects.create(user=self.user, mood='calm', intensity=4)
+        response = self.client.get(
+            '/api/mood-entries/mood_stats/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_requests_get_no_etag(self):
+        """
+        Requests without a logged-in user are not revalidated.
+        """
+        self.client.logout()
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class TieredCacheTests(UserTestCase):
+    """
+    Tests for the two-tier cache and its tag invalidation.
+    """
+
+    def setUp(self):
+        """
+        Start from an empty shared cache with two caches standing in for two processes.
+        """
+        cache.clear()
+        self.first = TieredCache(local_size=2, local_ttl=60)
+        self.second = TieredCache(local_size=2, local_ttl=60)
+
+    def test_tiers_and_counters(self):
+        """
+        Reads hit the local tier, then the shared tier, and the LRU evicts beyond its size.
+        """
+        self.assertIsNone(self.first.get('a'))
+        self.first.set('a', 1)
+        self.assertEqual(self.first.get('a'), 1)
+        self.assertEqual(self.second.get('a'), 1)
+        self.first.set('b', 2)
+        self.first.set('c', 3)
+
+        stats = self.first.stats()
+        self.assertEqual((stats['local_hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+        self.assertEqual(self.second.stats()['shared_hits'], 1)
+
+    def test_tag_invalidation_reaches_other_processes(self):
+        """
+        Invalidating a tag drops local and shared copies in every process at once.
+        """
+        tag = user_tag('user-1', MOODS)
+        self.first.set('stats', 'old', tags=[tag])
+        self.first.set('other', 'kept', tags=[user_tag('user-2', MOODS)])
+        self.second.invalidate_tags(tag)
+
+        self.assertIsNone(self.first.get('stats'))
+        self.assertEqual(len(self.first.local), 1)  # The stale local copy is dropped
+        self.assertEqual(self.first.get('other'), 'kept')
+
+        self.assertEqual(self.first.get_or_set('stats', lambda: 'new', tags=[tag]), 'new')
+        self.first.invalidate_tags(tag)
+        self.assertEqual(self.first.get_or_set('stats', lambda: 'newer', tags=[tag]), 'newer')
+
+    def test_writes_invalidate_cached_user_data(self):
+        """
+        Model writes invalidate the achievement progress cached for their user.
+        """
+        user = self.create_user()
+        tiered_cache.clear()
+        self.assertEqual(achievements.cached_progress(user)['unlocked_count'], 0)
+        with self.assertNumQueries(0):
+            achievements.cached_progress(user)
+
+        Reminder.objects.create(user=user, time=datetime.time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            achievements.cached_progress(user)
+        self.assertTrue(queries)
+
+
+class RequestTimingTests(UserTestCase):
+    """
+    Tests for the per-request timing log and Server-Timing header.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with a mood entry.
+        """
+        self.user = self.create_user()
+        MoodEntry.objects.create(user=self.user, mood='happy', intensity=6)
+        self.log_in(self.user)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_HEADER=True)
+    def test_enabled(self):
+        """
+        Each request logs its view, status and query count and returns them in Server-Timing.
+        """
+        with self.assertLogs('mindmate.timing', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/moods/stats/')
+
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual((record.method, record.path, record.status), ('GET', '/api/moods/stats/', 200))
+        self.assertTrue(record.view.endswith('stats'))
+        self.assertEqual(record.db_queries, len(queries))
+        self.assertGreater(record.db_queries, 0)
+        self.assertRegex(response['Server-Timing'], rf'^app;dur=[\d.]+, db;dur=[\d.]+;desc="{len(queries)} queries"$')
+
+    @override_settings(REQUEST_TIMING_ENABLED=False, REQUEST_TIMING_HEADER=True)
+    def test_disabled(self):
+        """
+        The middleware removes itself, so nothing is logged or added to responses.
+        """
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(lambda request: None)
+
+        with self.assertNoLogs('mindmate.timing', 'INFO'):
+            response = self.client.get('/api/moods/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class SessionStorageTests(UserTestCase):
+    """
+    Tests for the cached session store without per-request session saves.
+    """
+
+    def setUp(self):
+        """
+        Create a user with no cached session state.
+        """
+        cache.clear()
+        user_cache.clear()
+        self.user = self.create_user()
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', SESSION_SAVE_EVERY_REQUEST=False)
+    def test_unchanged_session_is_not_written(self):
+        """
+        Repeat requests read the session from cache and skip the session write.
+        """
+        self.log_in(self.user)
+        self.client.get('/api/moods/stats/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/moods/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+    @override_settings(SESSION_SAVE_EVERY_REQUEST=False, SESSION_REFRESH_INTERVAL=0)
+    def test_expiry_keeps_sliding(self):
+        """
+        Sessions older than the refresh interval are saved again to extend their expiry.
+        """
+        self.log_in(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/moods/stats/')
+        self.assertTrue([query for query in queries if query['sql'].startswith('UPDATE "django_session"')])
+
+
+@override_settings(ROOT_URLCONF='mindmate.asgi_urls')
+class AsyncViewTests(UserTestCase):
+    """
+    Tests for the async views served under ASGI.
+    """
+
+    def setUp(self):
+        """
+        Create a user with mood entries, logged in on both test clients.
+        """
+        cache.clear()
+        tiered_cache.clear()
+        user_cache.clear()
+        self.user = self.create_user()
+        today = datetime.date.today()
+        for days_ago, mood, intensity in [(0, 'happy', 8), (1, 'calm', 6), (3, 'sad', 3)]:
+            MoodEntry.objects.create(
+                user=self.user, mood=mood, intensity=intensity, date=today - datetime.timedelta(days=days_ago)
+            )
+        Journal.objects.create(user=self.user, content='A quiet day')
+        session = self.log_in(self.user)
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    async def test_api_reads_match_sync_views(self):
+        """
+        The async API reads return the same payloads as the DRF actions.
+        """
+        for path in ['/api/moods/recent/', '/api/moods/stats/?days=7', '/api/mood-entries/history/?resolution=day',
+                     '/api/achievements/user_achievements/']:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 200)
+                with override_settings(ROOT_URLCONF='mindmate.urls'):
+                    expected = await sync_to_async(self.client.get)(path)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_dashboard_is_built_and_revalidated(self):
+        """
+        The async dashboard renders the snapshot and answers repeat polls with 304.
+        """
+        response = await self.async_client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_journals'], 1)
+        self.assertEqual(response.context['day_streak'], 2)
+        self.assertEqual(len(response.context['recent_moods']), 3)
+
+        response = await self.async_client.get('/dashboard/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_requires_a_session_user(self):
+        """
+        Anonymous requests are rejected like the sync views reject them.
+        """
+        self.async_client.cookies.clear()
+        self.assertEqual((await self.async_client.get('/api/moods/stats/')).status_code, 403)
+        self.assertRedirects(await self.async_client.get('/dashboard/'), '/login/', fetch_redirect_response=False)
+
+    async def test_save_fcm_token(self):
+        """
+        Each FCM token is registered as a device of the session's user, once.
+        """
+        for token in ('token-2', 'token-3', 'token-2'):
+            response = await self.async_client.post(
+                '/save-fcm-token/', json.dumps({'token': token}), content_type='application/json'
+            )
+            self.assertEqual(response.json(), {'success': True})
+        tokens = [token async for token in DeviceToken.objects.filter(user=self.user).values_list('token', flat=True)]
+        self.assertEqual(sorted(tokens), ['token-2', 'token-3'])
+
+
+@override_settings(FIREBASE_KEY_SOURCE='mood_tracker.tokens.LocalKeySource', FIREBASE_PROJECT_ID='mindmate-test')
+class TokenVerificationTests(TestCase):
+    """
+    Tests for local Firebase ID token verification.
+    """
+
+    def setUp(self):
+        """
+        Clear cached claims and set up the local stand-in issuer.
+        """
+        tokens.get_verifier().clear()
+        self.issuer = tokens.LocalKeySource()
+
+    def test_valid_token_is_verified_and_cached(self):
+        """
+        A valid token yields its claims, and a repeat check skips the signature.
+        """
+        verifier = tokens.TokenVerifier(tokens.LocalKeySource(), 'mindmate-test')
+        token = self.issuer.issue('firebase-uid')
+        self.assertEqual(verifier.verify(token)['sub'], 'firebase-uid')
+
+        # Any key lookup would now fail, so this can only be a cache hit
+        verifier.key_source = tokens.BaseKeySource()
+        self.assertEqual(verifier.verify(token)['sub'], 'firebase-uid')
+
+    def test_project_id_is_required_at_startup(self):
+        """
+        The system check fails without a Firebase project and passes with one.
+        """
+        self.assertEqual(tokens.check_project_id(), [])
+        with override_settings(FIREBASE_PROJECT_ID=''):
+            self.assertEqual([error.id for error in tokens.check_project_id()], ['mood_tracker.E001'])
+            with self.assertRaises(SystemCheckError):
+                call_command('check', stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_invalid_tokens_are_rejected(self):
+        """
+        Expired, foreign, forged and malformed tokens raise InvalidToken.
+        """
+        forged = jwt.encode(
+            {'sub': 'firebase-uid', 'aud': 'mindmate-test', 'iss': 'https://securetoken.google.com/mindmate-test',
+             'iat': 0, 'exp': 2 ** 31},
+            rsa.generate_private_key(public_exponent=65537, key_size=2048),
+            algorithm='RS256',
+            headers={'kid': tokens.LocalKeySource.KEY_ID},
+        )
+        for token in [
+            self.issuer.issue('firebase-uid', lifetime=-60),
+            self.issuer.issue('firebase-uid', aud='other-project'),
+            self.issuer.issue(''),
+            forged,
+            'not-a-token',
+        ]:
+            with self.assertRaises(tokens.InvalidToken):
+                tokens.verify(token)
+
+    async def test_verify_token_view_starts_a_session(self):
+        """
+        Posting a valid token to verify-token logs the account in.
+        """
+        token = self.issuer.issue('firebase-uid')
+        response = await self.async_client.post(
+            '/verify-token/', json.dumps({'token': token}), content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'success': True})
+        session = await sync_to_async(lambda: self.async_client.session)()
+        self.assertEqual(await session.aget('user_id'), 'firebase-uid')
+
+
+class JobQueueTests(UserTestCase):
+    """
+    Tests for the background job queue and the enqueue-then-poll endpoints.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user with two mood entries and scratch media and result roots.
+        """
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        results = tempfile.TemporaryDirectory()
+        self.addCleanup(results.cleanup)
+        self.results_root = results.name
+        settings_override = override_settings(MEDIA_ROOT=media.name, JOB_RESULTS_ROOT=results.name, JOBS_EAGER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = self.create_user()
+        MoodEntry.objects.create(user=self.user, mood='happy', intensity=6, date=datetime.date(2024, 1, 1))
+        MoodEntry.objects.create(user=self.user, mood='calm', intensity=4, date=datetime.date(2024, 1, 2))
+        self.log_in(self.user)
+
+    def test_duplicate_requests_share_a_job(self):
+        """
+        An export already waiting is returned instead of queueing another.
+        """
+        first, created = jobs.enqueue('export', self.user, {'data': 'mood', 'format': 'csv'})
+        second, created_again = jobs.enqueue('export', self.user, {'data': 'mood', 'format': 'csv'})
+        other, _ = jobs.enqueue('export', self.user, {'data': 'journal', 'format': 'csv'})
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+
+        jobs.run_pending()
+        third, created = jobs.enqueue('export', self.user, {'data': 'mood', 'format': 'csv'})
+        self.assertTrue(created)
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_workers_take_highest_priority_first(self):
+        """
+        Rollup rebuilds wait behind interactive exports.
+        """
+        rebuild, _ = jobs.enqueue('rollups', self.user)
+        export, _ = jobs.enqueue('export', self.user, {'data': 'mood', 'format': 'csv'})
+        self.assertEqual(jobs.claim('test').pk, export.pk)
+        self.assertEqual(jobs.claim('test').pk, rebuild.pk)
+        self.assertIsNone(jobs.claim('test'))
+
+    def test_export_enqueue_then_poll(self):
+        """
+        POSTing an export answers 202; once a worker runs it the file downloads.
+        """
+        response = self.client.post('/api/moods/export/?type=csv')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'pending')
+        status_url = response['Location']
+
+        self.assertEqual(self.client.get(status_url).json()['download_url'], None)
+        self.assertEqual(jobs.run_pending(), 1)
+
+        job = self.client.get(status_url).json()
+        self.assertEqual(job['status'], 'done')
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download['Content-Type'], 'text/csv')
+        lines = b''.join(download.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.MOOD_CSV_HEADER))
+        self.assertEqual(len(lines), 3)
+
+        # Stored privately, outside the publicly served media root
+        path = Job.objects.get().result_file.path
+        self.assertTrue(path.startswith(self.results_root))
+        with self.assertRaises(ValueError):
+            Job.objects.get().result_file.url
+
+    def test_page_export_redirects_to_status(self):
+        """
+        The export link queues a job and shows a status page that links the file when done.
+        """
+        response = self.client.get('/export/?type=ndjson&data=all')
+        job = Job.objects.get()
+        self.assertRedirects(response, f'/export/{job.pk}/')
+        self.assertContains(self.client.get(f'/export/{job.pk}/'), 'Preparing your export')
+
+        jobs.run_pending()
+        self.assertContains(self.client.get(f'/export/{job.pk}/'), f'/export/{job.pk}/download/')
+
+    def test_eager_mode_exports_without_a_worker(self):
+        """
+        With JOBS_EAGER on, the export is ready when the status page first loads.
+        """
+        with override_settings(JOBS_EAGER=True):
+            response = self.client.get('/export/?type=csv&data=mood', follow=True)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertContains(response, f'/export/{job.pk}/download/')
+
+    def test_failed_job_is_retried_then_failed(self):
+        """
+        A handler error reschedules the job with backoff until its attempts run out.
+        """
+        job, _ = jobs.enqueue('achievements', self.user)
+        with override_settings(JOB_RETRY_DELAY=0):
+            with unittest.mock.patch.object(achievements, 'evaluate_all', side_effect=RuntimeError('boom')):
+                for _ in range(job.max_attempts):
+                    jobs.run(jobs.claim('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertEqual(job.error, 'RuntimeError: boom')
+
+    def test_recompute_jobs(self):
+        """
+        Achievement and rollup jobs rebuild derived data and report it.
+        """
+        DailyMoodRollup.objects.all().delete()
+        jobs.enqueue('rollups', self.user)
+        jobs.enqueue('achievements', self.user)
+        jobs.run_pending()
+        results = dict(Job.objects.values_list('kind', 'result'))
+        self.assertEqual(results['rollups']['days'], 2)
+        self.assertEqual(DailyMoodRollup.objects.filter(user=self.user).count(), 2)
+        self.assertIn('unlocked_count', results['achievements'])
+
+    def test_abandoned_jobs_are_requeued(self):
+        """
+        Jobs left running past JOB_STALE_AFTER go back to the queue.
+        """
+        job, _ = jobs.enqueue('rollups', self.user)
+        jobs.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(stale_after=3600), 1)
+        self.assertEqual(jobs.claim('test').pk, job.pk)
+
+
+    def test_abandoned_job_out_of_attempts_fails(self):
+        """
+        A stale job at its attempt limit is marked failed instead of requeued.
+        """
+        job, _ = jobs.enqueue('rollups', self.user)
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1)
+        jobs.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(hours=2))
+
+        self.assertEqual(jobs.requeue_stale(stale_after=3600), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, job.max_attempts))
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(jobs.claim('test'))
+
+class ProfilePictureTests(UserTestCase):
+    """
+    Tests for the profile picture pipeline.
+    """
+
+    def setUp(self):
+        """
+        Create a logged-in user and a scratch media root.
+        """
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = self.create_user()
+        self.log_in(self.user)
+
+    def photo(self, size=(3000, 2000), color='red', name='photo.jpg'):
+        """
+        Return a JPEG upload carrying EXIF with a GPS position and a rotation.
+        """
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise when shown
+        exif[0x8825] = {2: (51.0, 30.0, 0.0)}  # GPS latitude
+        output = io.BytesIO()
+        Image.new('RGB', size, color).save(output, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/jpeg')
+
+    def upload(self, picture):
+        """
+        Submit the profile form with a new picture.
+        """
+        return self.client.post(
+            '/profile/', {'username': 'user', 'email': 'user@example.com', 'profile_picture': picture}
+        )
+
+    def test_upload_is_stored_as_stripped_variants(self):
+        """
+        An upload becomes square, metadata-free WebP and JPEG variants and the original is dropped.
+        """
+        self.assertRedirects(self.upload(self.photo()), '/profile/')
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_picture)
+        self.assertEqual(len(self.user.profile_picture_key), 24)
+
+        for size in images.sizes():
+            for fmt in images.VARIANT_FORMATS:
+                with default_storage.open(images.variant_name(self.user.profile_picture_key, size, fmt)) as file:
+                    variant = Image.open(file)
+                    self.assertEqual(variant.format, fmt.upper())
+                    self.assertEqual(variant.size, (size, size))
+                    self.assertFalse(variant.getexif())
+
+        urls = self.user.profile_picture_urls
+        self.assertTrue(urls['webp']['48'].endswith(f'{self.user.profile_picture_key}/48.webp'))
+        self.assertContains(self.client.get('/profile/'), urls['jpeg']['128'])
+
+    @override_settings(PROFILE_PICTURE_KEEP_ORIGINAL=True, PROFILE_PICTURE_MAX_DIMENSION=500)
+    def test_kept_original_is_capped_and_upright(self):
+        """
+        With originals kept, the stored copy is rotated per EXIF, capped and stripped.
+        """
+        self.upload(self.photo())
+        self.user.refresh_from_db()
+        with self.user.profile_picture.open('rb') as file:
+            original = Image.open(file)
+            self.assertEqual(original.size, (333, 500))
+            self.assertFalse(original.getexif())
+
+    def test_replacing_picture_deletes_old_variants(self):
+        """
+        A new picture removes the previous variants.
+        """
+        self.upload(self.photo())
+        self.user.refresh_from_db()
+        old_key = self.user.profile_picture_key
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(self.photo(color='blue'))
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.profile_picture_key, old_key)
+        self.assertFalse(default_storage.exists(images.variant_name(old_key, 48, 'webp')))
+
+    def test_failed_save_keeps_old_files(self):
+        """
+        Old variants survive when the user save rolls back.
+        """
+        self.upload(self.photo())
+        self.user.refresh_from_db()
+        old_key = self.user.profile_picture_key
+
+        form = UserProfileForm(
+            {'username': 'user', 'email': 'user@example.com'},
+            {'profile_picture': self.photo(color='blue')},
+            instance=self.user,
+        )
+        self.assertTrue(form.is_valid())
+        with self.captureOnCommitCallbacks(execute=True):
+            with unittest.mock.patch.object(User, 'save', side_effect=DatabaseError('Write failed')):
+                with self.assertRaises(DatabaseError):
+                    form.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile_picture_key, old_key)
+        self.assertTrue(default_storage.exists(images.variant_name(old_key, 48, 'webp')))
+
+    def test_rejects_undecodable_upload(self):
+        """
+        A file claiming to be an image that Pillow cannot decode is rejected.
+        """
+        response = self.upload(SimpleUploadedFile('fake.jpg', b'not an image', content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_key, '')
+
+    def test_serializer_exposes_absolute_urls(self):
+        """
+        The user API lists absolute URLs per format and size.
+        """
+        self.upload(self.photo())
+        data = self.client.get('/api/users/').json()['results'][0]
+        self.assertTrue(data['profile_picture_urls']['jpeg']['256'].startswith('http://testserver/media/'))
@@ -0,0 +1,402 @@
+"""
+Local verification of Firebase ID tokens.
+
+Firebase ID tokens are RS256 JWTs signed with keys Google publishes as
+X.509 certificates. TokenVerifier checks the signature against the key set
+named by the FIREBASE_KEY_SOURCE setting (a dotted path, constructed with
+the keyword arguments in FIREBASE_KEY_SOURCE_OPTIONS) and validates the
+audience, issuer, subject and timestamps, so logging in needs no call to
+Firebase. GoogleKeySource fetches the published keys and caches them for as
+long as Google's Cache-Control header allows; LocalKeySource is an
+in-process stand-in key set that can also issue tokens, for tests and
+development.
+
+Decoded claims are cached per process by a hash of the token until the
+token expires, so verifying the same token again is a dictionary lookup.
+``averify`` serves cache hits on the event loop and runs the signature
+check on a worker thread.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import jwt
+from asgiref.sync import sync_to_async
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_KEY_SOURCE = 'mood_tracker.tokens.GoogleKeySource'
+
+# Longest uid Firebase issues
+MAX_UID_LENGTH = 128
+
+
+class InvalidToken(ValueError):
+    """
+    Raised when an ID token is malformed, forged, expired or for another project.
+    """
+
+
+class BaseKeySource:
+    """
+    Base class for sets of public keys that sign ID tokens.
+    """
+
+    def get_keys(self, refresh=False):
+        """
+        Return the current signing keys.
+
+        Args:
+            refresh: Whether to reload the keys even if they are still fresh,
+                used when a token names an unknown key.
+
+        Returns:
+            dict: Key id to public key.
+        """
+        raise NotImplementedError
+
+
+class GoogleKeySource(BaseKeySource):
+    """
+    Firebase's published signing keys, fetched and cached per process.
+
+    Keys are reloaded when Google's max-age runs out, and early when a token
+    names a key id that is not in the set, at most once every
+    ``min_refresh_interval`` seconds so forged key ids cannot trigger a
+    fetch per request.
+    """
+
+    URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+    def __init__(self, url=URL, timeout=5, min_refresh_interval=60):
+        self.url = url
+        self.timeout = timeout
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def get_keys(self, refresh=False):
+        now = time.monotonic()
+        with self._lock:
+            stale = now >= self._expires_at
+            may_refresh = self._fetched_at is None or now - self._fetched_at >= self.min_refresh_interval
+            if stale or (refresh and may_refresh):
+                self._keys, max_age = self.fetch()
+                self._fetched_at = now
+                self._expires_at = now + max_age
+            return self._keys
+
+    def fetch(self):
+        """
+        Download the certificates and extract their public keys.
+
+        Returns:
+            tuple: (key id to public key dict, seconds the set may be cached).
+        """
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            certificates = json.load(response)
+            match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        keys = {
+            key_id: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for key_id, pem in certificates.items()
+        }
+        return keys, int(match.group(1)) if match else 0
+
+
+class LocalKeySource(BaseKeySource):
+    """
+    In-process key set that can issue tokens, standing in for Firebase.
+
+    The key pair is generated once per process and shared by every instance,
+    so tokens issued through one instance verify with another.
+    """
+
+    KEY_ID = 'local'
+    _private_key = None
+    _lock = threading.Lock()
+
+    def __init__(self, project_id=None):
+        self.project_id = project_id
+
+    @classmethod
+    def private_key(cls):
+        """
+        Return the process's signing key, generating it on first use.
+
+        Returns:
+            RSAPrivateKey: The signing key.
+        """
+        with cls._lock:
+            if cls._private_key is None:
+                cls._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            return cls._private_key
+
+    def get_keys(self, refresh=False):
+        return {self.KEY_ID: self.private_key().public_key()}
+
+    def issue(self, uid, lifetime=3600, **claims):
+        """
+        Issue an ID token the way Firebase Authentication would.
+
+        Args:
+            uid: Firebase uid of the signed-in account.
+            lifetime: Seconds until the token expires; negative for an
+                already expired token.
+            **claims: Extra or overriding claims.
+
+        Returns:
+            str: Signed token.
+        """
+        project_id = self.project_id or getattr(settings, 'FIREBASE_PROJECT_ID', '')
+        now = int(time.time())
+        payload = {
+            'iss': f'https://securetoken.google.com/{project_id}',
+            'aud': project_id,
+            'auth_time': now,
+            'user_id': uid,
+            'sub': uid,
+            'iat': now,
+            'exp': now + lifetime,
+            **claims,
+        }
+        return jwt.encode(payload, self.private_key(), algorithm='RS256', headers={'kid': self.KEY_ID})
+
+
+class TokenVerifier:
+    """
+    Verifies Firebase ID tokens and caches the decoded claims until expiry.
+    """
+
+    def __init__(self, key_source, project_id, cache_size=4096, leeway=5):
+        self.key_source = key_source
+        self.project_id = project_id
+        self.cache_size = cache_size
+        self.leeway = leeway
+        self._claims = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, id_token):
+        """
+        Verify a token and return its claims.
+
+        Args:
+            id_token: Encoded Firebase ID token.
+
+        Returns:
+            dict: The token's claims; ``sub`` is the Firebase uid.
+
+        Raises:
+            InvalidToken: If the token does not verify.
+            ImproperlyConfigured: If no Firebase project is configured.
+        """
+        if not isinstance(id_token, str) or not id_token:
+            raise InvalidToken('No token provided')
+        key = hashlib.sha256(id_token.encode()).hexdigest()
+        claims = self._cached(key)
+        if claims is None:
+            claims = self._decode(id_token)
+            self._store(key, claims)
+        return dict(claims)
+
+    async def averify(self, id_token):
+        """
+        Async version of verify, checking signatures on a worker thread.
+
+        Args:
+            id_token: Encoded Firebase ID token.
+
+        Returns:
+            dict: The token's claims.
+
+        Raises:
+            InvalidToken: If the token does not verify.
+        """
+        if isinstance(id_token, str) and id_token:
+            claims = self._cached(hashlib.sha256(id_token.encode()).hexdigest())
+            if claims is not None:
+                return dict(claims)
+        return await sync_to_async(self.verify, thread_sensitive=False)(id_token)
+
+    def clear(self):
+        """
+        Drop every cached claim set.
+        """
+        with self._lock:
+            self._claims.clear()
+
+    def _cached(self, key):
+        """
+        Return unexpired cached claims for a token hash, or None.
+        """
+        with self._lock:
+            entry = self._claims.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._claims[key]
+                return None
+            self._claims.move_to_end(key)
+            return claims
+
+    def _store(self, key, claims):
+        """
+        Cache verified claims until the token expires.
+        """
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._claims[key] = (claims, claims['exp'])
+            while len(self._claims) > self.cache_size:
+                self._claims.popitem(last=False)
+
+    def _decode(self, id_token):
+        """
+        Check a token's signature and claims.
+
+        Args:
+            id_token: Encoded Firebase ID token.
+
+        Returns:
+            dict: The token's claims.
+
+        Raises:
+            InvalidToken: If the token does not verify.
+        """
+        if not self.project_id:
+            raise ImproperlyConfigured('FIREBASE_PROJECT_ID must be set to verify ID tokens')
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise InvalidToken(f'Malformed token: {e}')
+        if header.get('alg') != 'RS256':
+            raise InvalidToken('Token is not signed with RS256')
+
+        key_id = header.get('kid')
+        keys = self.key_source.get_keys()
+        if key_id not in keys:
+            # Google rotates its keys, so an unknown id may be a new key
+            keys = self.key_source.get_keys(refresh=True)
+        if key_id not in keys:
+            raise InvalidToken('Token is signed with an unknown key')
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                keys[key_id],
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=f'https://securetoken.google.com/{self.project_id}',
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+
+        subject = claims['sub']
+        if not isinstance(subject, str) or not subject or len(subject) > MAX_UID_LENGTH:
+            raise InvalidToken('Token has an invalid subject')
+        if claims.get('auth_time', 0) > time.time() + self.leeway:
+            raise InvalidToken('Token was authenticated in the future')
+        return claims
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """
+    Return the process's token verifier, building it from settings on first use.
+
+    Returns:
+        TokenVerifier: The shared verifier.
+    """
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            source_class = import_string(getattr(settings, 'FIREBASE_KEY_SOURCE', DEFAULT_KEY_SOURCE))
+            _verifier = TokenVerifier(
+                source_class(**getattr(settings, 'FIREBASE_KEY_SOURCE_OPTIONS', {})),
+                getattr(settings, 'FIREBASE_PROJECT_ID', ''),
+                cache_size=getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 4096),
+                leeway=getattr(settings, 'FIREBASE_TOKEN_LEEWAY', 5),
+            )
+        return _verifier
+
+
+def check_project_id(app_configs=None, **kwargs):
+    """
+    System check that a Firebase project is configured for token verification.
+
+    Without one every login would fail, so startup fails instead.
+
+    Returns:
+        list: An Error if FIREBASE_PROJECT_ID is empty.
+    """
+    if getattr(settings, 'FIREBASE_PROJECT_ID', ''):
+        return []
+    return [checks.Error(
+        'FIREBASE_PROJECT_ID is empty, so no Firebase ID token can be verified.',
+        hint='Set MINDMATE_FIREBASE_PROJECT_ID or projectId in mindmate/firebase_config.py.',
+        id='mood_tracker.E001',
+    )]
+
+
+@receiver(setting_changed)
+def reset_verifier(setting, **kwargs):
+    """
+    Rebuild the verifier after a Firebase setting is overridden.
+
+    Args:
+        setting: Name of the changed setting.
+    """
+    global _verifier
+    if setting.startswith('FIREBASE_'):
+        with _verifier_lock:
+            _verifier = None
+
+
+def verify(id_token):
+    """
+    Verify a Firebase ID token with the shared verifier.
+
+    Args:
+        id_token: Encoded Firebase ID token.
+
+    Returns:
+        dict: The token's claims; ``sub`` is the Firebase uid.
+
+    Raises:
+        InvalidToken: If the token does not verify.
+    """
+    return get_verifier().verify(id_token)
+
+
+async def averify(id_token):
+    """
+    Async version of verify.
+
+    Args:
+        id_token: Encoded Firebase ID token.
+
+    Returns:
+        dict: The token's claims.
+
+    Raises:
+        InvalidToken: If the token does not verify.
+    """
+    return await get_verifier().averify(id_token)
@@ -1,10 +1,10 @@
 from django.urls import path, re_path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     # Token verification and FCM URLs
-    path('verify-token/', views.verify_token, name='verify_token'),
-    path('save-fcm-token/', views.save_fcm_token, name='save_fcm_token'),
+    path('verify-token/', async_views.verify_token, name='verify_token'),
+    path('save-fcm-token/', async_views.save_fcm_token, name='save_fcm_token'),
     path('firebase-messaging-sw.js', views.firebase_messaging_sw, name='firebase_messaging_sw'),
     # Authentication URLs
     path('', views.home, name='home'),
@@ -27,6 +27,8 @@ urlpatterns = [
     
     # Export URLs
     path('export/', views.export_data, name='export_data'),
+    path('export/<uuid:job_id>/', views.export_status, name='export_status'),
+    path('export/<uuid:job_id>/download/', views.export_download, name='export_download'),
     
     # Profile URL
     path('profile/', views.profile, name='profile'),
@@ -0,0 +1,237 @@
+"""
+Per-user data version stamps and HTTP conditional GET for read views.
+
+Every write that can change what a user sees (mood entries, journals,
+reminders, unlocked achievements and the profile) bumps the user's
+UserDataVersion row. Read views wrapped with ``conditional`` derive an
+ETag from that stamp and answer a matching If-None-Match with 304 Not
+Modified before the view runs, so a repeat poll costs one primary key
+lookup, or none while the stamp is cached. Async views get the same handling, with the stamp
+read through the async ORM before the view runs.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from rest_framework.request import Request
+
+from .models import UserDataVersion
+from .auth import get_request_user, aget_request_user
+
+
+def cache_key(user_id):
+    """
+    Build the cache key for a user's data version stamp.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        str: Cache key.
+    """
+    return f'data-version:{user_id}'
+
+
+def create(user_id):
+    """
+    Create the version row for a new user.
+
+    Args:
+        user_id: Primary key of the user.
+    """
+    UserDataVersion.objects.get_or_create(user_id=user_id)
+
+
+def bump(user_id):
+    """
+    Advance a user's data version after a write.
+
+    Runs inside the caller's transaction, so a rolled back write leaves the
+    version unchanged. The cached stamp is dropped immediately and again on
+    commit, so a read racing the write cannot re-cache the old stamp.
+
+    Args:
+        user_id: Primary key of the user.
+    """
+    bump_many([user_id])
+
+
+def bump_many(user_ids):
+    """
+    Advance the data version of several users with one UPDATE.
+
+    Users without a version row are skipped; get_stamp creates their row
+    the first time it is read, and no ETag can have been issued before that.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    keys = [cache_key(user_id) for user_id in user_ids]
+    UserDataVersion.objects.filter(user_id__in=user_ids).update(
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_stamp(user_id):
+    """
+    Return a user's current data version stamp.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        tuple: (version, updated_at datetime).
+    """
+    key = cache_key(user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = UserDataVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at').first()
+        if stamp is None:
+            row, _ = UserDataVersion.objects.get_or_create(user_id=user_id)
+            stamp = (row.version, row.updated_at)
+        cache.set(key, stamp, getattr(settings, 'DATA_VERSION_CACHE_TIMEOUT', 300))
+    return stamp
+
+
+async def aget_stamp(user_id):
+    """
+    Async version of get_stamp for async views.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        tuple: (version, updated_at datetime).
+    """
+    key = cache_key(user_id)
+    stamp = await cache.aget(key)
+    if stamp is None:
+        stamp = await UserDataVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at').afirst()
+        if stamp is None:
+            row, _ = await UserDataVersion.objects.aget_or_create(user_id=user_id)
+            stamp = (row.version, row.updated_at)
+        await cache.aset(key, stamp, getattr(settings, 'DATA_VERSION_CACHE_TIMEOUT', 300))
+    return stamp
+
+
+def _request_stamp(request):
+    """
+    Return the stamp for a request's user, computing it once per request.
+
+    No stamp is issued for anonymous requests, or for pages with pending
+    flash messages, which have to be rendered rather than revalidated.
+
+    Args:
+        request: Django HttpRequest or DRF Request.
+
+    Returns:
+        tuple: (user_id, version, updated_at), or None.
+    """
+    if not hasattr(request, 'mm_data_stamp'):
+        if isinstance(request, Request):
+            user = request.user if request.user.is_authenticated else None
+        else:
+            user = get_request_user(request)
+        if user is None or len(messages.get_messages(request)):
+            request.mm_data_stamp = None
+        else:
+            request.mm_data_stamp = (user.pk, *get_stamp(user.pk))
+    return request.mm_data_stamp
+
+
+async def _arequest_stamp(request):
+    """
+    Async version of _request_stamp, run before an async view.
+
+    Args:
+        request: Django HttpRequest.
+
+    Returns:
+        tuple: (user_id, version, updated_at), or None.
+    """
+    if not hasattr(request, 'mm_data_stamp'):
+        # Loads the session, so the messages check below does not query
+        user = await aget_request_user(request)
+        if user is None or len(messages.get_messages(request)):
+            request.mm_data_stamp = None
+        else:
+            request.mm_data_stamp = (user.pk, *await aget_stamp(user.pk))
+    return request.mm_data_stamp
+
+
+def request_etag(request, *args, **kwargs):
+    """
+    Compute the ETag for a read view from the user's data version.
+
+    Responses that depend on the current date (streaks, "last 30 days")
+    change at midnight without a write, so the date is part of the tag, as
+    is the CSRF token embedded in rendered forms.
+
+    Args:
+        request: Django HttpRequest or DRF Request.
+
+    Returns:
+        str: Hex digest, or None if the request gets no stamp.
+    """
+    stamp = _request_stamp(request)
+    if stamp is None:
+        return None
+    user_id, version, updated_at = stamp
+    today = timezone.now().date()
+    csrf_token = request.META.get('CSRF_COOKIE', '')
+    return hashlib.md5(
+        f'{user_id}:{version}:{updated_at.isoformat()}:{today.isoformat()}:{csrf_token}'.encode()
+    ).hexdigest()
+
+
+def conditional(view_func):
+    """
+    Decorate a GET view to support conditional requests on the data version.
+
+    Works on sync and async function views and, through
+    ``method_decorator``, on DRF viewset actions. Responses are marked
+    private and must be revalidated, so browsers and the SPA always ask,
+    and get a 304 while nothing changed. Only an ETag is emitted:
+    Last-Modified has one-second resolution, so a client revalidating with
+    If-Modified-Since after a write in the same second would get a stale 304.
+
+    Args:
+        view_func: View taking the request as its first argument.
+
+    Returns:
+        callable: The wrapped view.
+    """
+    conditional_view = condition(etag_func=request_etag)(view_func)
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # condition() calls the stamp functions synchronously, so fetch the stamp first
+            await _arequest_stamp(request)
+            response = await conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.has_header('ETag'):
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
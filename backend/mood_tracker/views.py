@@ -1,20 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, FileResponse
 from django.utils import timezone
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.utils.safestring import mark_safe
 import json
-import csv
 import datetime
+import logging
 from io import StringIO
 from django.db import models
 from functools import wraps
 import uuid
 
-from .models import User, MoodEntry, Journal, Reminder, Achievement, UserAchievement
+from .models import User, MoodEntry, DailyMoodRollup, Journal, Reminder, Job
 from .forms import SignUpForm, LoginForm, MoodEntryForm, JournalForm, ReminderForm, UserProfileForm
+from . import streaks, exports, jobs, search, downsampling, achievements as achievement_progress
+from .dashboard import DashboardSnapshot
+from .auth import get_request_user
+from .versioning import conditional
+from .pagination import paginate, PARTIAL_PARAM, MOOD_ENTRY_ORDERING, JOURNAL_ORDERING
+
+logger = logging.getLogger(__name__)
+
+# Rows per "Load More" page of the journal list and mood history table
+JOURNAL_PAGE_SIZE = 12
+MOOD_HISTORY_PAGE_SIZE = 20
+
+# Seconds between reloads of the export status page while the job runs
+EXPORT_STATUS_REFRESH_SECONDS = 2
 
 
 # Helper functions
@@ -28,9 +41,26 @@ def check_authenticated(request):
     Returns:
         bool: True if user_id exists in session, False otherwise.
     """
-    print('Debug - Session keys:', request.session.keys())
     return 'user_id' in request.session
 
+def render_page_fragment(request, template_name, context):
+    """
+    Render the rows of one "Load More" page without the surrounding layout.
+    
+    Args:
+        request: Django HttpRequest object.
+        template_name: Fragment template holding just the rows.
+        context: Template context, including ``next_page``.
+        
+    Returns:
+        HttpResponse: Rendered rows, with the following page's URL in the
+            X-Next-Page header when there is one.
+    """
+    response = render(request, template_name, context)
+    if context.get('next_page'):
+        response['X-Next-Page'] = context['next_page']
+    return response
+
 # Decorator for authentication
 def auth_required(view_func):
     """
@@ -51,7 +81,10 @@ def auth_required(view_func):
 
 def get_current_user(request):
     """
-    Retrieve the current authenticated user from the database.
+    Retrieve the current authenticated user.
+    
+    The user is resolved once per request (and usually served from the
+    per-process user cache) by CurrentUserMiddleware.
     
     Args:
         request: Django HttpRequest object containing session data.
@@ -59,19 +92,10 @@ def get_current_user(request):
     Returns:
         User: User object if found and authenticated, None otherwise.
     """
-    print('Debug - Checking current user')
-    if 'user_id' in request.session:
-        user_id = request.session['user_id']
-        print('Debug - Found user_id in session:', user_id)
-        try:
-            user = User.objects.get(uid=user_id)
-            print('Debug - Found user in database:', user.username)
-            return user
-        except User.DoesNotExist:
-            print('Debug - User not found in database for uid:', user_id)
-            return None
-    print('Debug - No user_id in session')
-    return None
+    user = get_request_user(request)
+    if user is None and 'user_id' in request.session:
+        logger.warning('Session references missing user %s', request.session['user_id'])
+    return user
 
 # View functions
 def home(request):
@@ -202,6 +226,7 @@ def logout(request):
     messages.success(request, logout_message)
     return redirect('home')
 
+@conditional
 def dashboard(request):
     """
     Display the main dashboard with mood data, statistics, and charts.
@@ -215,107 +240,22 @@ def dashboard(request):
     Returns:
         HttpResponse: Rendered dashboard page or redirect to login.
     """
-    print('Debug - Session:', request.session.items())
-    print('Debug - Is authenticated:', request.user.is_authenticated if hasattr(request, 'user') else 'No user attribute')
-    
     if not check_authenticated(request):
-        print('Debug - Not authenticated, redirecting to login')
+        logger.debug('Dashboard requested without a session, redirecting to login')
         return redirect('login')
     
     user = get_current_user(request)
-    print('Debug - Current user:', user.username if user else 'No user found')
     
     if not user:
-        print('Debug - No user, redirecting to logout')
+        logger.debug('Dashboard session has no matching user, redirecting to logout')
         return redirect('logout')
     
-    # Get recent mood entries and ensure demo data exists
-    today = timezone.now().date()
-    week_ago = today - datetime.timedelta(days=7)
-    
-    # Initialize empty data for new users
-    if not MoodEntry.objects.filter(user=user).exists():
-        # You can add code here to initialize default data for new users if needed
-        pass
-    
-    # Get recent mood entries, ordered by date and time
-    recent_moods = MoodEntry.objects.filter(
-        user=user
-    ).order_by('-date', '-time')[:5]
-    
-    # Get mood data for chart (last 7 days)
-    mood_data = MoodEntry.objects.filter(
-        user=user,
-        date__gte=week_ago,
-        date__lte=today
-    ).order_by('date', 'time')
-    
-    print('Debug - User:', user.username)
-    print('Debug - Date range:', week_ago, 'to', today)
-    print('Debug - Found mood entries:', mood_data.count())
-    
-    # Format data for Chart.js
-    dates = [entry.date.strftime('%Y-%m-%d') for entry in mood_data]
-    intensities = [entry.intensity for entry in mood_data]
-    moods = [entry.get_mood_display() for entry in mood_data]
-    
-    print('Debug - Chart Data:')
-    print('Dates:', dates)
-    print('Intensities:', intensities)
-    print('Moods:', moods)
-    
-    # Calculate statistics
-    total_journals = Journal.objects.filter(user=user).count()
-    
-    # Calculate day streak (consecutive days with mood entries)
-    day_streak = 0
-    current_date = today
-    while True:
-        if MoodEntry.objects.filter(user=user, date=current_date).exists():
-            day_streak += 1
-            current_date -= datetime.timedelta(days=1)
-        else:
-            break
-    
-    # Calculate weekly goal (percentage of days this week with mood entries)
-    days_this_week = (today.weekday() + 1)  # Monday = 0, so +1 for days passed
-    mood_days_this_week = MoodEntry.objects.filter(
-        user=user,
-        date__gte=week_ago,
-        date__lte=today
-    ).values('date').distinct().count()
-    weekly_goal = round((mood_days_this_week / max(days_this_week, 1)) * 100) if days_this_week > 0 else 0
-    
-    # Ensure we have data before creating the chart
-    if not dates:
-        print('Debug - No mood data found for chart')
-        chart_dates = json.dumps([])
-        chart_intensities = json.dumps([])
-        chart_moods = json.dumps([])
-    else:
-        try:
-            chart_dates = json.dumps(dates)
-            chart_intensities = json.dumps(intensities)
-            chart_moods = json.dumps(moods)
-            print('Debug - JSON encoded chart data:')
-            print('chart_dates:', chart_dates)
-            print('chart_intensities:', chart_intensities)
-            print('chart_moods:', chart_moods)
-        except Exception as e:
-            print('Debug - Error encoding chart data:', str(e))
-            chart_dates = json.dumps([])
-            chart_intensities = json.dumps([])
-            chart_moods = json.dumps([])
+    # Every widget is computed from one cached per-user snapshot
+    snapshot = DashboardSnapshot.for_user(user)
     
     context = {
         'user': user,
-        'recent_moods': recent_moods,
-        'chart_dates': chart_dates,
-        'chart_intensities': chart_intensities,
-        'chart_moods': chart_moods,
-        'total_journals': total_journals,
-        'day_streak': day_streak,
-        'weekly_goal': weekly_goal,
+        **snapshot.as_context(),
     }
     
     return render(request, 'mood_tracker/dashboard.html', context)
@@ -428,11 +368,16 @@ def view_journal(request, journal_id):
     
     return render(request, 'mood_tracker/view_journal.html', {'journal': journal})
 
+@conditional
 def journal_list(request):
     """
     Display a list of all journal entries for the authenticated user.
     
-    Shows journal entries ordered by creation date (newest first).
+    Shows journal entries ordered by creation date (newest first), one
+    keyset page at a time; ``cursor`` selects the page and ``partial``
+    returns only its cards for infinite scrolling. With a ``q`` query
+    parameter, shows only matching entries, best match first, each with a
+    highlighted snippet.
     
     Args:
         request: Django HttpRequest object.
@@ -447,16 +392,41 @@ def journal_list(request):
     if not user:
         return redirect('logout')
     
-    journals = Journal.objects.filter(user=user).order_by('-created_at')
-    
-    return render(request, 'mood_tracker/journal_list.html', {'journals': journals})
+    query = request.GET.get('q', '').strip()
+    next_page = None
+    if query:
+        hits = search.search(user, query, kinds=[search.KIND_JOURNAL], limit=100)
+        journals_by_id = Journal.objects.filter(user=user).in_bulk([hit['id'] for hit in hits])
+        journals = []
+        for hit in hits:
+            journal = journals_by_id.get(uuid.UUID(hit['id']))
+            if journal is not None:
+                journal.search_snippet = mark_safe(hit['snippet'])
+                journals.append(journal)
+    else:
+        journals, next_page = paginate(
+            request,
+            Journal.objects.filter(user=user).select_related('mood_entry'),
+            JOURNAL_ORDERING,
+            JOURNAL_PAGE_SIZE,
+        )
+    
+    context = {'journals': journals, 'query': query, 'next_page': next_page}
+    if request.GET.get(PARTIAL_PARAM):
+        return render_page_fragment(request, 'mood_tracker/partials/journal_cards.html', context)
+    return render(request, 'mood_tracker/journal_list.html', context)
 
+@conditional
 def mood_history(request):
     """
     Display mood history with charts and trend analysis.
     
     Shows mood entries over a specified date range with line charts
-    for trends and doughnut charts for mood distribution.
+    for trends and doughnut charts for mood distribution. The trend line
+    is downsampled to at most a few hundred points (``resolution`` picks
+    entry, day, week or month points; the default picks automatically).
+    The entry table is paged by keyset, newest first; ``cursor`` selects
+    the page and ``partial`` returns only its rows for infinite scrolling.
     
     Args:
         request: Django HttpRequest object.
@@ -489,29 +459,49 @@ def mood_history(request):
         user=user,
         date__gte=start_date,
         date__lte=end_date
-    ).order_by('date', 'time')
-    
-    # Format data for Chart.js line chart
-    dates = [entry.date.strftime('%Y-%m-%d') for entry in mood_entries]
-    intensities = [entry.intensity for entry in mood_entries]
-    moods = [entry.get_mood_display() for entry in mood_entries]  # This ensures we get the display value
-    
-    # Calculate mood distribution for doughnut chart
-    mood_counts = mood_entries.values('mood').annotate(
-        count=models.Count('mood')
-    ).order_by('mood')
+    )
+    table_entries, next_page = paginate(request, mood_entries, MOOD_ENTRY_ORDERING, MOOD_HISTORY_PAGE_SIZE)
+    if request.GET.get(PARTIAL_PARAM):
+        return render_page_fragment(
+            request,
+            'mood_tracker/partials/mood_rows.html',
+            {'mood_entries': table_entries, 'next_page': next_page},
+        )
+    
+    # Calculate mood distribution for doughnut chart from the daily rollups
+    summary = DailyMoodRollup.objects.filter(user=user).summary(start_date, end_date)
+    
+    # Format data for Chart.js line chart, downsampled to a bounded number of points
+    resolution = request.GET.get('resolution', 'auto')
+    if resolution not in downsampling.RESOLUTIONS:
+        resolution = 'auto'
+    resolution, points = downsampling.history_points(
+        user, start_date, end_date, resolution, total_entries=summary['total_entries']
+    )
+    dates = [point['date'] for point in points]
+    intensities = [point['average_mood'] for point in points]
+    moods = [point['mood_display'] for point in points]  # Display values for the chart tooltips
+    mood_display_names = dict(MoodEntry.MOOD_CHOICES)
     
     mood_labels = []
     mood_count_values = []
     
-    for mood_count in mood_counts:
-        mood_key = mood_count['mood']
-        mood_display = dict(MoodEntry.MOOD_CHOICES).get(mood_key, mood_key)
-        mood_labels.append(mood_display)
-        mood_count_values.append(mood_count['count'])
+    for mood_key, count in summary['mood_counts'].items():
+        mood_labels.append(mood_display_names.get(mood_key, mood_key))
+        mood_count_values.append(count)
+    
+    most_common_mood = None
+    if summary['mood_counts']:
+        most_common_key = max(summary['mood_counts'], key=summary['mood_counts'].get)
+        most_common_mood = mood_display_names.get(most_common_key)
     
     context = {
-        'mood_entries': mood_entries,
+        'mood_entries': table_entries,
+        'next_page': next_page,
+        'total_entries': summary['total_entries'],
+        'average_intensity': round(summary['average_intensity'], 1),
+        'most_common_mood': most_common_mood,
+        'day_streak': streaks.get_streak_stats(user)['current_streak'],
         'start_date': start_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
         'chart_dates': json.dumps(dates),
@@ -589,16 +579,20 @@ def delete_reminder(request, reminder_id):
 
 def export_data(request):
     """
-    Export user's mood and journal data in CSV format.
+    Queue an export of the user's mood and journal data.
     
     Allows users to download their data for backup or analysis purposes.
-    Supports exporting mood entries or journal entries separately.
+    Supports CSV or NDJSON (``type``) for mood entries, journal entries or
+    both combined (``data`` of mood, journal or all). The file is written by
+    a background worker; the user is sent to a page that polls the job and
+    links the download once it is ready.
     
     Args:
         request: Django HttpRequest object.
         
     Returns:
-        HttpResponse: CSV file download or redirect.
+        HttpResponseRedirect: To the export status page, or back to the
+            dashboard on bad parameters.
     """
     if not check_authenticated(request):
         return redirect('login')
@@ -610,53 +604,69 @@ def export_data(request):
     export_type = request.GET.get('type', 'csv')
     data_type = request.GET.get('data', 'mood')
     
-    if data_type == 'mood':
-        # Export mood data
-        mood_entries = MoodEntry.objects.filter(user=user).order_by('date', 'time')
+    try:
+        exports.validate(data_type, export_type)
+    except ValueError:
+        messages.error(request, 'Invalid export parameters')
+        return redirect('dashboard')
+    
+    job, _ = jobs.enqueue('export', user, {'data': data_type, 'format': export_type})
+    return redirect('export_status', job_id=job.pk)
+
+def export_status(request, job_id):
+    """
+    Show the progress of a queued export, refreshing until it finishes.
+    
+    Args:
+        request: Django HttpRequest object.
+        job_id: UUID of the export job.
         
-        if export_type == 'csv':
-            # Create CSV file
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="mood_data_{timezone.now().strftime("%Y%m%d")}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Date', 'Time', 'Mood', 'Intensity', 'Notes'])
-            
-            for entry in mood_entries:
-                writer.writerow([
-                    entry.date,
-                    entry.time,
-                    entry.get_mood_display(),
-                    entry.intensity,
-                    entry.notes or ''
-                ])
-            
-            return response
+    Returns:
+        HttpResponse: Rendered status page or redirect.
+    """
+    if not check_authenticated(request):
+        return redirect('login')
     
-    elif data_type == 'journal':
-        # Export journal data
-        journals = Journal.objects.filter(user=user).order_by('created_at')
+    user = get_current_user(request)
+    if not user:
+        return redirect('logout')
+    
+    job = get_object_or_404(Job, id=job_id, user=user, kind='export')
+    context = {
+        'job': job,
+        'refresh_seconds': EXPORT_STATUS_REFRESH_SECONDS,
+    }
+    return render(request, 'mood_tracker/export_status.html', context)
+
+def export_download(request, job_id):
+    """
+    Download the file of a finished export.
+    
+    Args:
+        request: Django HttpRequest object.
+        job_id: UUID of the export job.
         
-        if export_type == 'csv':
-            # Create CSV file
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="journal_data_{timezone.now().strftime("%Y%m%d")}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Date', 'Title', 'Content'])
-            
-            for journal in journals:
-                writer.writerow([
-                    journal.created_at.date(),
-                    journal.title or '',
-                    journal.content
-                ])
-            
-            return response
+    Returns:
+        FileResponse: The export as an attachment, or redirect to the status
+            page while it is not ready.
+    """
+    if not check_authenticated(request):
+        return redirect('login')
     
-    # If we get here, something went wrong
-    messages.error(request, 'Invalid export parameters')
-    return redirect('dashboard')
+    user = get_current_user(request)
+    if not user:
+        return redirect('logout')
+    
+    job = get_object_or_404(Job, id=job_id, user=user, kind='export')
+    if job.status != Job.DONE or not job.result_file:
+        return redirect('export_status', job_id=job.pk)
+    
+    return FileResponse(
+        job.result_file.open('rb'),
+        as_attachment=True,
+        filename=job.result['filename'],
+        content_type=job.result['content_type'],
+    )
 
 def profile(request):
     """
@@ -690,18 +700,15 @@ def profile(request):
     else:
         form = UserProfileForm(instance=user)
     
-    # Get statistics
-    total_entries = MoodEntry.objects.filter(user=user).count()
+    # Get statistics from the daily rollups
+    summary = DailyMoodRollup.objects.filter(user=user).summary()
+    total_entries = summary['total_entries']
     total_journals = Journal.objects.filter(user=user).count()
     
     # Get most common mood
-    mood_counts = MoodEntry.objects.filter(user=user).values('mood').annotate(
-        count=models.Count('mood')
-    ).order_by('-count')
-    
     most_common_mood = None
-    if mood_counts:
-        most_common_mood_key = mood_counts[0]['mood']
+    if summary['mood_counts']:
+        most_common_mood_key = max(summary['mood_counts'], key=summary['mood_counts'].get)
         most_common_mood = dict(MoodEntry.MOOD_CHOICES).get(most_common_mood_key)
     
     # Get recent activities (mood entries and journals)
@@ -743,75 +750,6 @@ def profile(request):
     
     return render(request, 'mood_tracker/profile.html', context)
 
-@csrf_exempt
-@require_POST
-def verify_token(request):
-    """
-    Verify Firebase ID token and create user session.
-    
-    Validates the provided Firebase ID token and stores user
-    information in the session for authentication.
-    
-    Args:
-        request: Django HttpRequest object with JSON body containing token.
-        
-    Returns:
-        JsonResponse: Success/failure status with error details.
-    """
-    try:
-        data = json.loads(request.body)
-        id_token = data.get('token')
-        
-        if not id_token:
-            return JsonResponse({'success': False, 'error': 'No token provided'}, status=400)
-        
-        # Verify the token with Firebase
-        decoded_token = auth.get_account_info(id_token)
-        user_id = decoded_token['users'][0]['localId']
-        
-        # Store token in session
-        request.session['id_token'] = id_token
-        request.session['user_id'] = user_id
-        
-        return JsonResponse({'success': True})
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=400)
-
-@csrf_exempt
-@require_POST
-@auth_required
-def save_fcm_token(request):
-    """
-    Save Firebase Cloud Messaging token for push notifications.
-    
-    Stores the FCM token in the user's profile to enable
-    push notifications for mood tracking reminders.
-    
-    Args:
-        request: Django HttpRequest object with JSON body containing token.
-        
-    Returns:
-        JsonResponse: Success/failure status with error details.
-    """
-    try:
-        data = json.loads(request.body)
-        token = data.get('token')
-        
-        if not token:
-            return JsonResponse({'success': False, 'error': 'No token provided'}, status=400)
-        
-        user = get_current_user(request)
-        if not user:
-            return JsonResponse({'success': False, 'error': 'User not found'}, status=404)
-        
-        # Save the FCM token to the user's record
-        user.fcm_token = token
-        user.save()
-        
-        return JsonResponse({'success': True})
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=400)
-
 def firebase_messaging_sw(request):
     """
     Serve the Firebase Cloud Messaging service worker file.
@@ -835,6 +773,7 @@ def firebase_messaging_sw(request):
         return HttpResponse('Service worker not found', status=404)
 
 @auth_required
+@conditional
 def achievements(request):
     """
     Display all achievements with user's unlock status and progress.
@@ -852,94 +791,11 @@ def achievements(request):
     if not user:
         return redirect('login')
     
-    # Get all achievements
-    all_achievements = Achievement.objects.filter(is_active=True)
-    
-    # Get user's unlocked achievements
-    user_achievements = UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True)
-    
-    # Calculate user's current progress for each achievement type
-    user_stats = {
-        'mood_count': MoodEntry.objects.filter(user=user).count(),
-        'journal_count': Journal.objects.filter(user=user).count(),
-        'mood_streak': calculate_mood_streak(user),
-        'consistency': calculate_consistency(user),
-    }
-    
-    # Prepare achievement data with unlock status and progress
-    achievement_data = []
-    for achievement in all_achievements:
-        is_unlocked = achievement.id in user_achievements
-        current_progress = user_stats.get(achievement.achievement_type, 0)
-        progress_percentage = min(100, (current_progress / achievement.requirement_value) * 100) if achievement.requirement_value > 0 else 0
-        
-        achievement_data.append({
-            'achievement': achievement,
-            'is_unlocked': is_unlocked,
-            'current_progress': current_progress,
-            'progress_percentage': progress_percentage,
-            'unlocked_at': UserAchievement.objects.filter(user=user, achievement=achievement).first().unlocked_at if is_unlocked else None
-        })
-    
-    context = {
-        'achievement_data': achievement_data,
-        'user': user,
-        'total_achievements': len(all_achievements),
-        'unlocked_count': len(user_achievements),
-    }
+    # Cached progress is shared between requests, so it is copied rather than mutated
+    context = {**achievement_progress.cached_progress(user), 'user': user}
     
     return render(request, 'mood_tracker/achievements.html', context)
 
-def calculate_mood_streak(user):
-    """
-    Calculate the current consecutive day streak of mood entries.
-    
-    Counts how many consecutive days (starting from today) the user
-    has recorded at least one mood entry.
-    
-    Args:
-        user: User object to calculate streak for.
-        
-    Returns:
-        int: Number of consecutive days with mood entries.
-    """
-    mood_entries = MoodEntry.objects.filter(user=user).order_by('-date')
-    if not mood_entries:
-        return 0
-    
-    streak = 0
-    current_date = timezone.now().date()
-    
-    for entry in mood_entries:
-        if entry.date == current_date:
-            streak += 1
-            current_date -= datetime.timedelta(days=1)
-        else:
-            break
-    
-    return streak
-
-def calculate_consistency(user):
-    """
-    Calculate user's mood tracking consistency over the last 30 days.
-    
-    Counts the number of unique days in the last 30 days where
-    the user recorded at least one mood entry.
-    
-    Args:
-        user: User object to calculate consistency for.
-        
-    Returns:
-        int: Number of days with mood entries in the last 30 days.
-    """
-    thirty_days_ago = timezone.now().date() - datetime.timedelta(days=30)
-    mood_dates = MoodEntry.objects.filter(
-        user=user, 
-        date__gte=thirty_days_ago
-    ).values_list('date', flat=True).distinct()
-    
-    return len(mood_dates)
-
 def vite_client(request):
     """
     Handle Vite client requests to prevent 404 errors during development.